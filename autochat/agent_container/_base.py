@@ -26,6 +26,7 @@ class AgentContainer:
             group_topic_type: str | None = None,
             memory_type: MemoryType = MemoryType.Window,
             memory_window_size: int = 20,
+            memory_max_tokens: int | None = None,
             **kwargs
     ):
         # class
@@ -36,6 +37,7 @@ class AgentContainer:
         self.description = description
         self.memory_type = memory_type
         self.memory_window_size = memory_window_size
+        self.memory_max_tokens = memory_max_tokens
         self.agent_arguments: dict[str, Any] = {}
 
         # factory
@@ -96,16 +98,32 @@ class AgentContainer:
                 agent_topic_type=self.agent_topic_type,
                 memory_type=self.memory_type,
                 memory_window_size=self.memory_window_size,
+                memory_max_tokens=self.memory_max_tokens,
                 **self.agent_arguments
             )
 
         return _factory
 
-    async def register(self, runtime: AgentRuntime, **kwargs):
+    async def register(
+            self,
+            runtime: AgentRuntime,
+            on_create: Callable[[BaseAgent], None] | None = None,
+            **kwargs
+    ):
+        """Register the agent type, ``on_create`` is called with each agent the runtime creates."""
+        factory = self.create_factory()
+        if on_create is not None:
+            create_agent = factory
+
+            def factory() -> BaseAgent:
+                agent = create_agent()
+                on_create(agent)
+                return agent
+
         await self.agent_class.register(
             runtime=runtime,
             type=self.agent_type,
-            factory=self.create_factory()
+            factory=factory
         )
         await runtime.add_subscription(
             TypeSubscription(topic_type=self.agent_topic_type, agent_type=self.agent_type))
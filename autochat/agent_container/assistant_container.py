@@ -7,8 +7,11 @@ from autogen_ext.models import OpenAIChatCompletionClient
 from autogen_core.components.models import SystemMessage, ChatCompletionClient
 from autochat.utils.file_utils import load_json, load_yaml
 from autochat.utils.utils import get_function
-from autochat.tools import Action, FunctionTool, Tool
+from autochat.utils.prompt_template import SystemPromptTemplate
+from autochat.model_clients import LLMCache, CachedChatCompletionClient, SingleFlightChatCompletionClient
+from autochat.tools import Action, ExecutorFunctionTool, Tool, ToolBundle, ToolExecutorType, ToolProjection, ToolSelector
 from autochat.tools.action import ActionAuthentication
+from autochat.tools.action.response_reader import DEFAULT_MAX_RESPONSE_BYTES
 
 from autochat.agents import AssistantAgent
 
@@ -18,6 +21,14 @@ from ._base import AgentContainer
 _logger = logging.getLogger(__name__)
 
 
+def _load_openapi(path: str) -> dict[str, Any]:
+    if path.endswith(".json"):
+        return load_json(path)
+    elif path.endswith(".yaml") or path.endswith(".yml"):
+        return load_yaml(path)
+    raise ValueError(f"Tool definition not support: {path}")
+
+
 class AssistantContainer(AgentContainer):
     def __init__(
             self,
@@ -27,18 +38,45 @@ class AssistantContainer(AgentContainer):
             handoff_tools: list[Tool] | None = None,
             tool_result_as_system_variable: bool = True,
             next_receive_agent_topic: str = "agent",
+            llm_cache: LLMCache | dict[str, Any] | None = None,
+            single_flight: bool = False,
+            tool_selector: ToolSelector | dict[str, Any] | None = None,
             **kwargs
     ):
         super().__init__(**kwargs)
         self.system_message = system_message or []
+        self.system_prompt_template = SystemPromptTemplate.from_system_message(self.system_message)
         self.model_client = model_client  or OpenAIChatCompletionClient(model="gpt-4o-mini")
+
+        # opt-in coalescing of identical in-flight requests
+        if single_flight:
+            self.model_client = SingleFlightChatCompletionClient(self.model_client, namespace=self.name)
+
+        # opt-in response cache around the model client
+        if isinstance(llm_cache, dict):
+            llm_cache = LLMCache(**{"name": self.name, **llm_cache})
+        if llm_cache is not None:
+            self.model_client = CachedChatCompletionClient(self.model_client, cache=llm_cache, namespace=self.name)
         self.tools = tools
         self.handoff_tools = handoff_tools or []
+        # opt-in selection of the relevant tools, the index is shared by all agent instances
+        if isinstance(tool_selector, dict):
+            tool_selector = ToolSelector(**{"name": self.name, **tool_selector})
+        self.tool_selector = tool_selector
         self.tool_result_as_system_variable = tool_result_as_system_variable
         self.next_receive_agent_topic = next_receive_agent_topic
+        self._tool_bundle: ToolBundle | None = None
+
+    @property
+    def tool_bundle(self) -> ToolBundle:
+        """Tools compiled once and shared by all agent instances, rebuilt when the tool set changes."""
+        if self._tool_bundle is None:
+            self._tool_bundle = ToolBundle(self.tools or [], self.handoff_tools)
+        return self._tool_bundle
 
     def add_handoff_tool(self, tool: Tool):
         self.handoff_tools.append(tool)
+        self._tool_bundle = None
 
     def create_factory(self) -> Callable[[], AssistantAgent]:
         def _factory() -> AssistantAgent:
@@ -51,12 +89,15 @@ class AssistantContainer(AgentContainer):
                 agent_topic_type=self.agent_topic_type,
                 memory_type=self.memory_type,
                 memory_window_size=self.memory_window_size,
-                system_message=self.system_message,
+                memory_max_tokens=self.memory_max_tokens,
+                system_message=self.system_prompt_template,
                 model_client=self.model_client,
                 tools=self.tools,
                 handoff_tools=self.handoff_tools,
+                tool_bundle=self.tool_bundle,
                 next_receive_agent_topic=self.next_receive_agent_topic,
                 tool_result_as_system_variable=self.tool_result_as_system_variable,
+                tool_selector=self.tool_selector,
                 **self.agent_arguments
             )
 
@@ -89,35 +130,73 @@ class AssistantContainer(AgentContainer):
         memory_config = config.pop("memory", {})
         memory_type = memory_config.get("type", "zero")
         memory_window_size = memory_config.get("max_messages", 20)
+        memory_max_tokens = memory_config.get("max_tokens", None)
 
         # tools
         tools: dict[str, Any] = config.pop("tools", {})
 
         _tools: [Tool] = []
+        sequential_tools: list[str] = config.pop("sequential_tools", [])
+        # {<tool name>: {"include": [...], "exclude": [...], "max_list_items": 10, "max_string_length": 500}}
+        tool_projections: dict[str, Any] = config.pop("tool_projections", {})
 
         for tool_name, tool_def in tools.items():
             if isinstance(tool_def, str):
-                if tool_def.endswith(".json"):
-                    openapi_json = load_json(tool_def)
-                elif tool_def.endswith(".yaml") or tool_def.endswith(".yml"):
-                    openapi_json = load_yaml(tool_def)
-                else:
-                    raise ValueError(f"Tool definition not support: {tool_def}")
+                openapi_json = _load_openapi(tool_def)
 
                 _authentication = kwargs.get("authentication", {})
                 authentication = ActionAuthentication(**_authentication)
-                tool = Action.create(openapi_json, authentication=authentication)
+                # every operation of the document is a tool
+                _tools.extend(Action.from_openapi(openapi_json, authentication=authentication))
+                continue
+            elif isinstance(tool_def, dict) and "openapi" in tool_def:
+                # {"openapi": <path or document>, "operations": [...], "cache": {"ttl": 300},
+                #  "max_response_bytes": 65536, "response_fields": {<action name>: [<field path>, ...]},
+                #  "projection": <projection of every action>, "projections": {<action name>: <projection>}}
+                openapi_json = tool_def["openapi"]
+                if isinstance(openapi_json, str):
+                    openapi_json = _load_openapi(openapi_json)
+
+                _authentication = tool_def.get("authentication") or kwargs.get("authentication", {})
+                authentication = ActionAuthentication(**_authentication)
+                actions = Action.from_openapi(
+                    openapi_json,
+                    authentication=authentication,
+                    headers=tool_def.get("headers"),
+                    operations=tool_def.get("operations"),
+                    response_cache=tool_def.get("cache"),
+                    max_response_bytes=tool_def.get("max_response_bytes", DEFAULT_MAX_RESPONSE_BYTES),
+                    response_fields=tool_def.get("response_fields"),
+                )
+                projections = tool_def.get("projections", {})
+                for action in actions:
+                    projection = projections.get(action.name, tool_def.get("projection"))
+                    if projection is not None:
+                        tool_projections[action.name] = ToolProjection.from_config(projection)
+                _tools.extend(actions)
+                continue
             elif isinstance(tool_def, dict):
                 func_name = tool_def.get("func_name")
                 package = tool_def.get("package")
                 description = tool_def.get("description", tool_name)
                 func = get_function(module_name=package, function_name=func_name)
 
-                tool = FunctionTool(
+                # synchronous functions run on the shared thread pool by default,
+                # "executor": "inline" | "thread" | "process", "timeout": seconds
+                tool = ExecutorFunctionTool(
                     name=tool_name,
                     func=func,
-                    description=description
+                    description=description,
+                    executor=tool_def.get("executor", ToolExecutorType.THREAD),
+                    timeout=tool_def.get("timeout"),
                 )
+
+                # tool must not run concurrently with other tool calls
+                if tool_def.get("sequential", False):
+                    sequential_tools.append(tool.name)
+
+                if tool_def.get("projection") is not None:
+                    tool_projections[tool.name] = ToolProjection.from_config(tool_def["projection"])
             else:
                 raise ValueError(f"Tool definition not support: {tool_def}")
 
@@ -130,7 +209,10 @@ class AssistantContainer(AgentContainer):
             system_message=system_message,
             memory_type=memory_type,
             memory_window_size=memory_window_size,
+            memory_max_tokens=memory_max_tokens,
             tools=_tools,
+            sequential_tools=sequential_tools,
+            tool_projections=tool_projections,
             **config,
             **kwargs
         )
\ No newline at end of file
@@ -1,8 +1,9 @@
 import logging
 
-from typing import Callable
+from typing import Any, Callable, Mapping
 from autochat.tools import Tool
 from autochat.agents import MasterAgent
+from autochat.agents.routing import HandoffRouter
 from .assistant_container import AssistantContainer
 
 
@@ -13,28 +14,39 @@ class MasterContainer(AssistantContainer):
     def __init__(
             self,
             outer_handoff_tools: list[Tool] | None = None,
+            pre_router: HandoffRouter | Mapping[str, Any] | None = None,
             **kwargs
     ):
         super().__init__(**kwargs)
         self.outer_handoff_tools = outer_handoff_tools or []
+        # the index is built once and shared by the agents of all the sessions
+        self.pre_router = HandoffRouter.from_config(pre_router) if pre_router is not None else None
 
     def add_outer_handoff_tool(self, tool: Tool):
         self.outer_handoff_tools.append(tool)
+        self._tool_bundle = None
 
     def create_factory(self) -> Callable[[], MasterAgent]:
         def _factory() -> MasterAgent:
             return self.agent_class(
                 name=self.name,
                 description=self.description,
-                agent_topic=self._agent_topic_type,
-                system_message=self.system_message,
+                proxy_topic_type=self.proxy_topic_type,
+                master_topic_type=self.master_topic_type,
+                group_topic_type=self.group_topic_type,
+                agent_topic_type=self.agent_topic_type,
+                system_message=self.system_prompt_template,
                 model_client=self.model_client,
                 memory_type=self.memory_type,
                 memory_window_size=self.memory_window_size,
+                memory_max_tokens=self.memory_max_tokens,
                 tool_result_as_system_variable=self.tool_result_as_system_variable,
                 tools=self.tools,
                 handoff_tools=self.handoff_tools,
+                tool_bundle=self.tool_bundle,
                 outer_handoff_tools=self.outer_handoff_tools,
+                pre_router=self.pre_router,
+                tool_selector=self.tool_selector,
                 **self.agent_arguments
             )
 
@@ -37,6 +37,7 @@ class ProxyContainer(AgentContainer):
                 agent_topic_type=self.agent_topic_type,
                 memory_type=self.memory_type,
                 memory_window_size=self.memory_window_size,
+                memory_max_tokens=self.memory_max_tokens,
                 inner_topic_type=self.inner_topic_type,
                 outer_topic_types=self.outer_topic_types,
                 **self.agent_arguments
@@ -3,6 +3,7 @@ from .ai_agent import AIAgent
 from .proxy_agent import ProxyAgent
 from .assistant_agent import AssistantAgent
 from .master_agent import MasterAgent
+from .routing import HandoffRouter
 
 
 __all__ = [
@@ -10,5 +11,6 @@ __all__ = [
     "AIAgent",
     "ProxyAgent",
     "AssistantAgent",
-    "MasterAgent"
+    "MasterAgent",
+    "HandoffRouter",
 ]
\ No newline at end of file
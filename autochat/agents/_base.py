@@ -1,12 +1,13 @@
 import asyncio
 
-from typing import Any
+from typing import Any, Callable, Mapping
 import logging
 from autogen_core.base import MessageContext, TopicId
 from autogen_core.components import RoutedAgent
 from autogen_core.components import message_handler
 
 from autochat.utils import print_utils
+from autochat.utils.tracing import get_tracer
 
 from autochat.models import Memory, MemoryType
 from autochat.models.messages import ResetMessage
@@ -74,6 +75,7 @@ class BaseAgent(SequentialRoutedAgent):
             agent_topic_type: str | None = None,
             memory_type: MemoryType = MemoryType.Window,
             memory_window_size: int = 20,
+            memory_max_tokens: int | None = None,
             debug: bool = True,
             **kwargs
     ):
@@ -86,10 +88,24 @@ class BaseAgent(SequentialRoutedAgent):
         self._agent_topic_type = agent_topic_type
 
         self._memory = Memory(memory_type=memory_type, window_size=memory_window_size)
+        self._memory_type = memory_type
+        self._memory_window_size = memory_window_size
+        self._memory_max_tokens = memory_max_tokens
 
         self._color_show = print_utils.color_cyan
         self.debug = debug
 
+        # called when a message handler fails, the runtime only logs the error
+        self.on_error: Callable[["BaseAgent", Exception], None] | None = None
+
+    async def on_message(self, message: Any, ctx: MessageContext) -> Any | None:
+        try:
+            return await super().on_message(message, ctx)
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(self, e)
+            raise
+
     @property
     def key(self):
         return self.id.key
@@ -146,6 +162,23 @@ class BaseAgent(SequentialRoutedAgent):
     def show_name(self):
         return self._color_show(self.name.upper())
 
+    def trace(self, event: str, message: Any, **fields: Any) -> None:
+        """Log a hop of the message through this agent, printed in debug mode and recorded by the tracer."""
+        if self.debug:
+            print_utils.print_logs(f"{self.name} {event}", message, debug=True)
+
+        tracer = get_tracer()
+        if tracer.enabled:
+            tracer.record(session_id=self.key, source=self.name, event=event, message=message, **fields)
+
+    def save_state(self) -> Mapping[str, Any]:
+        """The per-session state of the agent, plain JSON values restored by :meth:`load_state`
+        when the session is resumed from a checkpoint, see :class:`autochat.tasks.SQLiteCheckpointStore`."""
+        return {}
+
+    def load_state(self, state: Mapping[str, Any]) -> None:
+        pass
+
     @message_handler
     async def handle_reset(self, message: ResetMessage, ctx: MessageContext) -> None:
         # Reset the group chat manager.
@@ -1,42 +1,69 @@
-from typing import List, Any, Mapping
+from typing import List, Any, Collection, Mapping
+import asyncio
 import logging
 import json
-import copy
 from autogen_core.base import MessageContext, TopicId, CancellationToken
 from autogen_core.components.models import (
     ChatCompletionClient,
+    CreateResult,
     SystemMessage as LLMSystemMessage,
     FunctionExecutionResult as LLMFunctionExecutionResult,
     FunctionExecutionResultMessage as LLMFunctionExecutionResultMessage,
     AssistantMessage as LLMAssistantMessage,
     LLMMessage
 )
-from autogen_core.components.tools import Tool
+from autogen_core.components.tools import Tool, ToolSchema
 from autogen_core.components import FunctionCall, message_handler
 from openai import BaseModel
 
 from autochat.models.messages import UserMessage, AssistantResponse, HandoffMessage, ResetMessage
-from autochat.models import LLMResult
+from autochat.models import LLMResult, ContextWindow, MemoryType
+from autochat.tools.bundle import ToolBundle
+from autochat.tools.projection import ToolProjection
+from autochat.tools.selector import ToolSelector
 
 from autochat.agents._base import BaseAgent
 from autochat.utils import print_utils
-from autochat.utils.utils import parser_assistant_message, build_system_prompt
+from autochat.utils.utils import parser_assistant_message
+from autochat.utils.prompt_template import SystemPromptTemplate
+from autochat.utils.metrics import get_metrics
+from autochat.utils.deadline import remaining_time, deadline_scope
+from autochat.utils.response_parser import AssistantResponseParser
 
 
 _logger = logging.getLogger(__name__)
 
 
+def _discard_task(task: asyncio.Task) -> None:
+    """Cancel a task whose result is not needed, its error (if it failed first) is logged
+    instead of being reported as never retrieved."""
+    def _retrieve(done: asyncio.Task) -> None:
+        if not done.cancelled() and done.exception() is not None:
+            _logger.debug(f"Discarded task failed: {done.exception()!r}")
+
+    task.cancel()
+    task.add_done_callback(_retrieve)
+
+
 class AIAgent(BaseAgent):
 
     def __init__(
             self,
-            system_message: LLMSystemMessage | list[LLMSystemMessage] | str | list[str],
+            system_message: SystemPromptTemplate | LLMSystemMessage | list[LLMSystemMessage] | str | list[str],
             model_client: ChatCompletionClient,
             tools: List[Tool] | None = None,
             handoff_tools: List[Tool] | None = None,
+            tool_bundle: ToolBundle | None = None,
             next_receive_agent_topic: str = "agent", # [self, proxy, master, other]
             tool_result_as_system_variable: bool = True,
             tool_result_save_as_metadata: bool = True,
+            parallel_tool_calls: bool = False,
+            max_concurrent_tool_calls: int = 4,
+            sequential_tools: List[str] | None = None,
+            stream: bool = False,
+            speculative_new_conversation: bool = False,
+            tool_projections: Mapping[str, ToolProjection | dict[str, Any]] | None = None,
+            tool_selector: ToolSelector | dict[str, Any] | None = None,
             **kwargs
     ):
         # preprocess init
@@ -46,9 +73,11 @@ class AIAgent(BaseAgent):
         super().__init__(**kwargs)
 
         self._system_message = system_message
+        self._system_prompt = SystemPromptTemplate.from_system_message(system_message)
         self._model_client = model_client
-        self._tools = tools
-        self._handoff_tools = handoff_tools
+        self._tool_bundle = tool_bundle or ToolBundle(tools, handoff_tools)
+        self._tools = list(self._tool_bundle.tools)
+        self._handoff_tools = list(self._tool_bundle.handoff_tools)
 
         if next_receive_agent_topic == "agent":
             self._next_receive_agent_topic = self.type
@@ -63,28 +92,122 @@ class AIAgent(BaseAgent):
         self.tool_result_as_system_variable = tool_result_as_system_variable
         self.tool_result_save_as_metadata = tool_result_save_as_metadata
 
-    def _parser_system_message(self, system_variables: dict[str, Any] | None = None):
-        system_message = copy.copy(self._system_message)
-        system_variables = system_variables or {}
+        # concurrent tool execution
+        self.parallel_tool_calls = parallel_tool_calls
+        self.sequential_tools = set(sequential_tools or [])
+        self._tool_semaphore = asyncio.Semaphore(max(1, max_concurrent_tool_calls))
 
-        if not isinstance(system_message, list):
-            system_message = [system_message]
+        # stream text chunks of completions to the proxy
+        self.stream = stream
 
-        system_prompt_template: list[str] = []
+        # start the truncated history call together with the full history call
+        self.speculative_new_conversation = speculative_new_conversation
 
-        for message in system_message:
-            if isinstance(message, LLMSystemMessage):
-                _message = message.content
-            elif isinstance(message, str):
-                _message = message
-            else:
-                raise TypeError(f"Expected type [str | SystemMessage] but got {type(message)}")
+        # tool results are projected by tool name before they reach the prompt and the system variables
+        self.tool_projections: dict[str, ToolProjection] = {
+            name: ToolProjection.from_config(projection) for name, projection in (tool_projections or {}).items()
+        }
+
+        # only the tools relevant to the conversation are sent to the model
+        self.tool_selector = ToolSelector.from_config(tool_selector) if tool_selector is not None else None
+
+        # token budgeted history, enabled by `memory.max_tokens`
+        self._context_window: ContextWindow | None = None
+        if self._memory_max_tokens:
+            self._context_window = ContextWindow(
+                max_tokens=self._memory_max_tokens,
+                max_messages=self._memory_window_size if self._memory_type == MemoryType.Window else None,
+                token_counter=self._count_message_tokens
+            )
+
+    def save_state(self) -> Mapping[str, Any]:
+        return {**super().save_state(), "state": self.state}
+
+    def load_state(self, state: Mapping[str, Any]) -> None:
+        super().load_state(state)
+        self.state = dict(state.get("state", {}))
 
-            system_prompt_template.append(_message)
+    def _count_message_tokens(self, message: LLMMessage) -> int:
+        return self._model_client.count_tokens([message])
 
-        _system_message = build_system_prompt(system_prompt_template, system_variables)
+    def _parser_system_message(self, system_variables: dict[str, Any] | None = None):
+        return LLMSystemMessage(content=self._system_prompt.render(system_variables))
+
+    async def create_completion(
+            self,
+            messages: list[LLMMessage],
+            tools: list[Tool | ToolSchema],
+            json_output: bool | None = None,
+            extra_create_args: Mapping[str, Any] = None,
+            cancellation_token: CancellationToken | None = None,
+            response_parser: AssistantResponseParser | None = None,
+    ) -> CreateResult:
+        """Call the model client. In streaming mode, the chunks are fed to ``response_parser``
+        while the completion is generated and the response text it parses out is published to
+        the proxy as partial :class:`AssistantResponse`. A completion asking for a new conversation
+        is retried, so its text is held back from then on and a retract chunk withdraws the text
+        already published."""
+        if not self.stream:
+            return await self._model_client.create(
+                messages=messages,
+                tools=tools,
+                cancellation_token=cancellation_token,
+                json_output=json_output,
+                extra_create_args=extra_create_args
+            )
 
-        return LLMSystemMessage(content=_system_message)
+        result: CreateResult | None = None
+        published = False
+        held_back = False
+        async for chunk in self._model_client.create_stream(
+            messages=messages,
+            tools=tools,
+            cancellation_token=cancellation_token,
+            json_output=json_output,
+            extra_create_args=extra_create_args
+        ):
+            if isinstance(chunk, CreateResult):
+                result = chunk
+            elif chunk and response_parser is None:
+                await self.publish_partial_response(chunk, cancellation_token=cancellation_token)
+            elif chunk and not held_back:
+                response_parser.feed(chunk)
+                if response_parser.has_flag("new_conversation"):
+                    held_back = True
+                    if published:
+                        await self.publish_partial_response("", retract=True, cancellation_token=cancellation_token)
+                    continue
+                visible = response_parser.take_visible()
+                if visible:
+                    published = True
+                    await self.publish_partial_response(visible, cancellation_token=cancellation_token)
+            elif chunk:
+                response_parser.feed(chunk)
+
+        if result is None:
+            raise RuntimeError("The model client stream ended without a final result.")
+
+        if response_parser is not None and not held_back:
+            visible = response_parser.take_visible(final=True)
+            if visible:
+                await self.publish_partial_response(visible, cancellation_token=cancellation_token)
+
+        return result
+
+    async def publish_partial_response(
+            self,
+            content: str,
+            retract: bool = False,
+            cancellation_token: CancellationToken | None = None
+    ) -> None:
+        chunk = AssistantResponse(
+            content=content,
+            source=self.type,
+            partial=True,
+            path=[self.name],
+            metadata={"retract": True} if retract else {}
+        )
+        await self.publish_message(message=chunk, topic_id=self.proxy_topic, cancellation_token=cancellation_token)
 
     async def call_llm(
             self,
@@ -93,7 +216,7 @@ class AIAgent(BaseAgent):
             extra_create_args: Mapping[str, Any] = None,
             cancellation_token: CancellationToken | None = None,
             system_variables: dict[str, Any] = None,
-            tools: list[Tool] = None
+            tools: list[Tool | ToolSchema] = None
     ) -> LLMResult:
         tools = tools or []
 
@@ -102,19 +225,29 @@ class AIAgent(BaseAgent):
 
         system_message = self._parser_system_message(system_variables)
 
-        result = await self._model_client.create(
+        if self._context_window is not None:
+            messages = self._context_window.apply(messages)
+
+        # a streamed completion is parsed chunk by chunk as it arrives
+        response_parser = AssistantResponseParser() if self.stream else None
+
+        result = await self.create_completion(
             messages=[system_message] + messages,
             tools=tools,
             cancellation_token=cancellation_token,
             json_output=json_output,
-            extra_create_args=extra_create_args
+            extra_create_args=extra_create_args,
+            response_parser=response_parser
         )
 
         metadata = {}
 
         # parser output
         if isinstance(result.content, str):
-            parsed_content = parser_assistant_message(result.content)
+            if response_parser is not None and response_parser.fed_length == len(result.content):
+                parsed_content = response_parser.close()
+            else:
+                parsed_content = parser_assistant_message(result.content)
             result.content = parsed_content["response"]
             parsed_content.pop("response")
             metadata.update(parsed_content)
@@ -137,9 +270,19 @@ class AIAgent(BaseAgent):
             extra_create_args: Mapping[str, Any] = None,
             cancellation_token: CancellationToken | None = None,
             system_variables: dict[str, Any] = None,
-            tools: list[Tool] = None
+            tools: list[Tool | ToolSchema] = None
     ) -> tuple[LLMResult, list[LLMMessage]]:
 
+        if self.speculative_new_conversation and not self.stream and len(messages) > 1:
+            return await self.call_llm_speculative_new_conversation(
+                messages=messages,
+                json_output=json_output,
+                extra_create_args=extra_create_args,
+                cancellation_token=cancellation_token,
+                system_variables=system_variables,
+                tools=tools
+            )
+
         llm_result = await self.call_llm(
             messages=messages,
             json_output=json_output,
@@ -166,12 +309,138 @@ class AIAgent(BaseAgent):
 
         return llm_result, messages
 
+    async def call_llm_speculative_new_conversation(
+            self,
+            messages: list[LLMMessage],
+            json_output: bool | None = None,
+            extra_create_args: Mapping[str, Any] = None,
+            cancellation_token: CancellationToken | None = None,
+            system_variables: dict[str, Any] = None,
+            tools: list[Tool | ToolSchema] = None
+    ) -> tuple[LLMResult, list[LLMMessage]]:
+        """Same as :meth:`call_llm_with_retry_new_conversation` but the call with only the last
+        message runs concurrently with the full history call, the unneeded one is cancelled.
+
+        Counters ``started``, ``paid_off`` and ``wasted`` are reported in
+        ``get_metrics(f"speculation.{agent_type}")``."""
+        metrics = get_metrics(f"speculation.{self.type}")
+        truncated_messages = [messages[-1]]
+
+        call_kwargs = dict(
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            system_variables=system_variables,
+            cancellation_token=cancellation_token,
+            tools=tools
+        )
+        full_task = asyncio.create_task(self.call_llm(messages=messages, **call_kwargs))
+        truncated_task = asyncio.create_task(self.call_llm(messages=truncated_messages, **call_kwargs))
+        metrics.incr("started")
+
+        try:
+            llm_result = await full_task
+        except BaseException:
+            _discard_task(truncated_task)
+            raise
+
+        if not llm_result.metadata.get("new_conversation", None):
+            _discard_task(truncated_task)
+            metrics.incr("wasted")
+            return llm_result, messages
+
+        llm_result = await truncated_task
+        llm_result.metadata["reset_history"] = True
+        metrics.incr("paid_off")
+
+        return llm_result, truncated_messages
+
     def get_tools(self, message: UserMessage | HandoffMessage, ctx: MessageContext):
+        if self.tool_selector is not None and isinstance(message.content, list):
+            return self.tool_selector.select(self._tools, message.content)
         return self._tools
 
     def get_handoff_tools(self, message: UserMessage | HandoffMessage, ctx: MessageContext):
         return self._handoff_tools
 
+    def get_tool_bundle(self, message: UserMessage | HandoffMessage, ctx: MessageContext) -> ToolBundle:
+        tools = self.get_tools(message=message, ctx=ctx)
+        handoff_tools = self.get_handoff_tools(message=message, ctx=ctx)
+        return self._tool_bundle.subset(tools, handoff_tools)
+
+    async def _run_tool_call(self, tool: Tool, arguments: Mapping[str, Any], cancellation_token: CancellationToken) -> Any:
+        async with self._tool_semaphore:
+            return await tool.run_json(arguments, cancellation_token)
+
+    async def execute_tool_calls(
+            self,
+            calls: list[FunctionCall],
+            tools_map: Mapping[str, Tool],
+            cancellation_token: CancellationToken | None = None,
+            barriers: Collection[str] = (),
+    ) -> list[Any]:
+        """Execute tool calls and return their results in call order.
+
+        When ``parallel_tool_calls`` is enabled the calls run concurrently, at most
+        ``max_concurrent_tool_calls`` at a time. A tool listed in ``sequential_tools`` or
+        ``barriers`` starts after every call before it finished and runs alone. A failing
+        call doesn't cancel the others, the error of the first failed call (in call order)
+        is raised once the concurrent calls finished."""
+        cancellation_token = cancellation_token or CancellationToken()
+
+        if not self.parallel_tool_calls or len(calls) < 2:
+            return [
+                await tools_map[call.name].run_json(json.loads(call.arguments), cancellation_token)
+                for call in calls
+            ]
+
+        results: list[Any] = [None] * len(calls)
+        pending: list[int] = []
+
+        async def run_call(index: int) -> Any:
+            call = calls[index]
+            return await self._run_tool_call(tools_map[call.name], json.loads(call.arguments), cancellation_token)
+
+        async def run_pending() -> None:
+            if not pending:
+                return
+            outcomes = await asyncio.gather(*(run_call(index) for index in pending), return_exceptions=True)
+            for index, outcome in zip(pending, outcomes):
+                if isinstance(outcome, BaseException):
+                    raise outcome
+                results[index] = outcome
+            pending.clear()
+
+        for index, call in enumerate(calls):
+            if call.name in self.sequential_tools or call.name in barriers:
+                await run_pending()
+                results[index] = await tools_map[call.name].run_json(json.loads(call.arguments), cancellation_token)
+            else:
+                pending.append(index)
+
+        await run_pending()
+
+        return results
+
+    def project_tool_result(self, tool: Tool, result: Any) -> tuple[Any, str]:
+        """Apply the projection of the tool to its result, return it with its text for the model.
+
+        The saved characters are reported in ``get_metrics(f"tool_projection.{tool_name}")``,
+        ``tokens_saved`` is estimated as 4 characters a token."""
+        projection = self.tool_projections.get(tool.name)
+        if projection is None:
+            return result, tool.return_value_as_string(result)
+
+        original_length = len(tool.return_value_as_string(result))
+        result = projection.apply(result)
+        result_as_str = tool.return_value_as_string(result)
+
+        metrics = get_metrics(f"tool_projection.{tool.name}")
+        metrics.incr("calls")
+        metrics.incr("chars_before", original_length)
+        metrics.incr("chars_after", len(result_as_str))
+        metrics.incr("tokens_saved", max(0, original_length - len(result_as_str)) // 4)
+        return result, result_as_str
+
     async def run_llm_loop(
             self,
             messages: list[LLMMessage],
@@ -181,24 +450,28 @@ class AIAgent(BaseAgent):
             system_variables: dict[str, Any] = None,
             tools: list[Tool] = None,
             handoff_tools: list[Tool] = None,
+            tool_bundle: ToolBundle | None = None,
             **kwargs
     ):
         """Basic run LLM loops."""
-        tools = tools or []
-        tools_map = {tool.name: tool for tool in tools}
-        handoff_tools = handoff_tools or []
-        handoff_tools_map = {tool.name: tool for tool in handoff_tools}
+        if tool_bundle is None:
+            tool_bundle = self._tool_bundle.subset(tools or [], handoff_tools or [])
+        tools_map = tool_bundle.tools_map
+        handoff_tools_map = tool_bundle.handoff_tools_map
         tool_results = {}
         reset_history = False
 
         handoffs: list[str] = []
+        # the tools called in this turn, always offered again when the tools are selected
+        called_tools: set[str] = set()
 
         llm_result, messages = await self.call_llm_with_retry_new_conversation(
             messages=messages,
-            tools=tools + handoff_tools,
+            tools=tool_bundle.schemas,
             json_output=json_output,
             extra_create_args=extra_create_args,
-            system_variables=system_variables
+            system_variables=system_variables,
+            cancellation_token=cancellation_token
         )
         reset_history = llm_result.metadata.get("reset_history", False)
 
@@ -206,29 +479,42 @@ class AIAgent(BaseAgent):
         while isinstance(llm_result.content, list) and all(isinstance(m, FunctionCall) for m in llm_result.content):
             tool_call_results: List[LLMFunctionExecutionResult] = []
 
-            # Process each function call.
+            # Execute the tool and handoff calls, results come back in call order.
+            # A handoff call runs alone, after the calls before it, as the calls used to run one by one.
+            calls = [call for call in llm_result.content if call.name in tools_map or call.name in handoff_tools_map]
+            results = await self.execute_tool_calls(
+                calls,
+                {**handoff_tools_map, **tools_map},
+                cancellation_token,
+                barriers=handoff_tools_map.keys(),
+            )
+
+            call_results = iter(results)
             for call in llm_result.content:
-                arguments = json.loads(call.arguments)
-                # if call is normal tool
-                if call.name in tools_map:
-                    result = await tools_map[call.name].run_json(arguments, cancellation_token)
-                    result_as_str = tools_map[call.name].return_value_as_string(result)
-                    tool_call_results.append(LLMFunctionExecutionResult(call_id=call.id, content=result_as_str))
-                    tool_results[call.name] = result
-
-                    if self.tool_result_as_system_variable:
-                        if isinstance(result, BaseModel):
-                            system_variables.update(result.model_dump())
-                        elif isinstance(result, dict):
-                            system_variables.update(result)
-
-                # if call is handoff tool
-                elif call.name in handoff_tools_map:
-                    # Execute the tool to get the handoff agent's topic type.
-                    result = await handoff_tools_map[call.name].run_json(arguments, cancellation_token)
-                    topic_type = handoff_tools_map[call.name].return_value_as_string(result)
-
-                    handoffs.append(topic_type)
+                if call.name not in tools_map and call.name not in handoff_tools_map:
+                    # a tool that is not offered gets an error result, so the model can recover
+                    _logger.warning(f"{self.name} called the unknown tool {call.name}")
+                    tool_call_results.append(
+                        LLMFunctionExecutionResult(call_id=call.id, content=f"Error: unknown tool {call.name}")
+                    )
+                    continue
+
+                result = next(call_results)
+                if call.name not in tools_map:
+                    # the handoff tool returns the handoff agent's topic type
+                    handoffs.append(handoff_tools_map[call.name].return_value_as_string(result))
+                    continue
+
+                result, result_as_str = self.project_tool_result(tools_map[call.name], result)
+                tool_call_results.append(LLMFunctionExecutionResult(call_id=call.id, content=result_as_str))
+                tool_results[call.name] = result
+                called_tools.add(call.name)
+
+                if self.tool_result_as_system_variable:
+                    if isinstance(result, BaseModel):
+                        system_variables.update(result.model_dump())
+                    elif isinstance(result, dict):
+                        system_variables.update(result)
 
             if len(handoffs) > 0:
                 # If have handoff tool then break and handoff to other agent
@@ -243,13 +529,23 @@ class AIAgent(BaseAgent):
                         LLMFunctionExecutionResultMessage(content=tool_call_results),
                     ]
                 )
+                # the tools are chosen again for the conversation with the tool results
+                if self.tool_selector is not None:
+                    tool_bundle = self._tool_bundle.subset(
+                        self.tool_selector.select(self._tools, messages, keep=called_tools), tool_bundle.handoff_tools
+                    )
+                    tools_map = tool_bundle.tools_map
                 llm_result = await self.call_llm(
                     messages=messages,
-                    tools=tools,
+                    tools=tool_bundle.tool_schemas,
                     json_output=json_output,
                     extra_create_args=extra_create_args,
-                    system_variables=system_variables
+                    system_variables=system_variables,
+                    cancellation_token=cancellation_token
                 )
+            else:
+                # nothing to send back, e.g. an empty list of calls
+                break
 
         if self.tool_result_save_as_metadata:
             llm_result.metadata["tool_results"] = tool_results
@@ -277,20 +573,26 @@ class AIAgent(BaseAgent):
 
         message.path.append(self.name)
 
-        print_utils.print_logs(f"{self.name} Receive message from {message.source.upper()}", message, trace_messages=message.traces, debug=self.debug)
+        self.trace(f"Receive message from {message.source.upper()}", message)
 
-        tools = self.get_tools(message=message, ctx=ctx)
-        handoff_tools = self.get_handoff_tools(message=message, ctx=ctx)
+        tool_bundle = self.get_tool_bundle(message=message, ctx=ctx)
 
         system_variables = message.metadata.get("system_variables", {})
 
-        output = await self.run_llm_loop(
-            messages=message.content,
-            tools=tools,
-            handoff_tools=handoff_tools,
-            system_variables=system_variables,
-            cancellation_token=ctx.cancellation_token
-        )
+        # the remaining time budget of the turn bounds every LLM and tool call of the loop
+        try:
+            async with asyncio.timeout(remaining_time(message.deadline)):
+                with deadline_scope(message.deadline):
+                    output = await self.run_llm_loop(
+                        messages=message.content,
+                        tool_bundle=tool_bundle,
+                        system_variables=system_variables,
+                        cancellation_token=ctx.cancellation_token
+                    )
+        except TimeoutError:
+            _logger.warning(f"{self.name} stopped handling message {message.id}: the turn deadline has passed")
+            ctx.cancellation_token.cancel()
+            return
 
         llm_result = output.get("llm_result")
         handoffs: list[str] = output.get("handoffs", [])
@@ -309,12 +611,13 @@ class AIAgent(BaseAgent):
             handoff_message = HandoffMessage(
                     target=handoff,
                     message=message,
-                    source=self.type
+                    source=self.type,
+                    deadline=message.deadline
             )
 
-            print_utils.print_logs(f"{self.name} Handoff to {handoff}", message, trace_messages=message.traces, debug=self.debug)
+            self.trace(f"Handoff to {handoff}", message)
             target_topic = TopicId(type=handoff, source=self.key)
-            await self.publish_message(handoff_message, topic_id=target_topic)
+            await self.publish_message(handoff_message, topic_id=target_topic, cancellation_token=ctx.cancellation_token)
             return
 
         message.content.append(LLMAssistantMessage(content=llm_result.content, source=self.id.type))
@@ -324,14 +627,15 @@ class AIAgent(BaseAgent):
             inner_handle_topic=self.get_next_receive_agent_topic(llm_result=llm_result),
             source=self.type,
             metadata=llm_result.metadata,
-            traces=message.traces,
-            path=[self.name]
+            path=[self.name],
+            deadline=message.deadline
         )
-        print_utils.print_logs(f"{self.name} Publish response to Topic {self.proxy_topic.type}", message_response, trace_messages=message_response.traces, debug=self.debug)
+        self.trace(f"Publish response to Topic {self.proxy_topic.type}", message_response)
 
         await self.publish_message(
             message=message_response,
-            topic_id=self.proxy_topic
+            topic_id=self.proxy_topic,
+            cancellation_token=ctx.cancellation_token
         )
 
     async def reset(self, message: ResetMessage, ctx: MessageContext) -> None:
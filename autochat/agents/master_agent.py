@@ -1,21 +1,38 @@
 import logging
-from autogen_core.base import MessageContext
+from typing import Any, Mapping
 
+from autogen_core.base import MessageContext, CancellationToken
+from autogen_core.components import FunctionCall
+from autogen_core.components.models import LLMMessage, RequestUsage, UserMessage as LLMUserMessage
+
+from autochat.models import LLMResult
 from autochat.models.messages import UserMessage, HandoffMessage, ResetMessage
 from autochat.agents import AIAgent
+from autochat.agents.routing import HandoffRouter
+from autochat.tools.bundle import ToolBundle
+from autochat.utils.metrics import Metrics, get_metrics
 from autochat.utils.utils import get_handoff_tool_name
 
 _logger = logging.getLogger(__name__)
 
 
 class MasterAgent(AIAgent):
+    """An agent routing the conversation to the participants of its group.
+
+    With a ``pre_router`` the handoff of a user message is chosen without calling the model
+    when the router is confident, see :class:`HandoffRouter`. The routed turns and the turns
+    left to the model are counted in ``get_metrics(f"pre_router.{name}")``.
+    """
     def __init__(
             self,
             outer_handoff_tools: list[str] | None = None,
+            pre_router: HandoffRouter | Mapping[str, Any] | None = None,
             **kwargs
     ):
         super().__init__(**kwargs)
         self.outer_handoff_tools = outer_handoff_tools or []
+        self.pre_router = HandoffRouter.from_config(pre_router) if pre_router is not None else None
+        self.pre_router_metrics: Metrics = get_metrics(f"pre_router.{self.name}")
 
     def get_handoff_tools(self, message: UserMessage | HandoffMessage, ctx: MessageContext):
         prevent_handoff_tools = [get_handoff_tool_name(agent_name=name) for name in message.path]
@@ -28,5 +45,63 @@ class MasterAgent(AIAgent):
 
         return call_handoff_tools
 
+    def pre_route(self, messages: list[LLMMessage], tool_bundle: ToolBundle) -> LLMResult | None:
+        """The handoff call chosen by the pre-router for the last user message,
+        ``None`` to let the model choose."""
+        if not messages or not isinstance(messages[-1], LLMUserMessage):
+            return None
+        content = messages[-1].content
+        text = content if isinstance(content, str) else " ".join(part for part in content if isinstance(part, str))
+        if not text.strip():
+            return None
+
+        # only the handoffs of the turn, the agents the message went through are excluded
+        targets = {
+            get_handoff_tool_name(agent_name=target): target for target in self.pre_router.targets
+        }
+        available = {targets[name] for name in tool_bundle.handoff_tools_map if name in targets}
+
+        self.pre_router_metrics.incr("turns")
+        target, score = self.pre_router.route(text, targets=available)
+        if target is None:
+            self.pre_router_metrics.incr("model_routed")
+            return None
+
+        self.pre_router_metrics.incr("routed")
+        self.pre_router_metrics.incr(f"routed.{target}")
+        self.trace(f"Pre-route to {target} (score {score:.2f})", messages[-1])
+        return LLMResult(
+            content=[FunctionCall(id="pre_route", arguments="{}", name=get_handoff_tool_name(agent_name=target))],
+            finish_reason="function_calls",
+            usage=RequestUsage(prompt_tokens=0, completion_tokens=0),
+            cached=False,
+            metadata={"pre_routed": True, "pre_route_score": score},
+        )
+
+    async def run_llm_loop(
+            self,
+            messages: list[LLMMessage],
+            cancellation_token: CancellationToken | None = None,
+            tool_bundle: ToolBundle | None = None,
+            **kwargs
+    ):
+        if self.pre_router is not None and tool_bundle is not None:
+            llm_result = self.pre_route(messages, tool_bundle)
+            if llm_result is not None:
+                handoff_tool = tool_bundle.handoff_tools_map[llm_result.content[0].name]
+                result = await handoff_tool.run_json({}, cancellation_token or CancellationToken())
+                return {
+                    "llm_result": llm_result,
+                    "handoffs": [handoff_tool.return_value_as_string(result)],
+                    "messages": messages,
+                }
+
+        return await super().run_llm_loop(
+            messages=messages,
+            cancellation_token=cancellation_token,
+            tool_bundle=tool_bundle,
+            **kwargs
+        )
+
     async def reset(self, message: ResetMessage, ctx: MessageContext) -> None:
         pass
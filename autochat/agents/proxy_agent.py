@@ -1,11 +1,11 @@
 import logging
+from typing import Any, Mapping
 
 from autogen_core.base import MessageContext, TopicId
 from autogen_core.components import message_handler
 
 from autochat.models.messages import UserMessage, AssistantResponse, ResetMessage, HandoffMessage
 from autochat.agents._base import BaseAgent
-from autochat.utils import print_utils
 
 _logger = logging.getLogger(__name__)
 
@@ -49,6 +49,15 @@ class ProxyAgent(BaseAgent):
     def outer_topics(self) -> list[TopicId]:
         return [TopicId(type=_outer_topic, source=self.key) for _outer_topic in self.outer_topic_type]
 
+    def save_state(self) -> Mapping[str, Any]:
+        # the agent handling the conversation, routing is sticky across turns
+        return {**super().save_state(), "inner_topic_type": self._inner_topic_type}
+
+    def load_state(self, state: Mapping[str, Any]) -> None:
+        super().load_state(state)
+        if state.get("inner_topic_type"):
+            self._inner_topic_type = state["inner_topic_type"]
+
     @message_handler
     async def handle_outer_message(self, message: UserMessage | HandoffMessage, ctx: MessageContext) -> None:
         if isinstance(message, HandoffMessage):
@@ -58,30 +67,38 @@ class ProxyAgent(BaseAgent):
         message.path.append(self.name)
 
         """Transfer message from outer group to current handling Agent"""
-        print_utils.print_logs(f"{self.name} Receive message from {message.source.upper()}", message, trace_messages=message.traces, debug=self.debug)
+        self.trace(f"Receive message from {message.source.upper()}", message)
         message.source = self.type
 
-        print_utils.print_logs(f"{self.name} Redirect message to Topic [{self.inner_topic.type}]", message, trace_messages=message.traces, debug=self.debug)
+        self.trace(f"Redirect message to Topic [{self.inner_topic.type}]", message)
         await self.publish_message(
             message=message,
-            topic_id=self.inner_topic
+            topic_id=self.inner_topic,
+            cancellation_token=ctx.cancellation_token
         )
 
     @message_handler
     async def handle_inner_response(self, message: AssistantResponse, ctx: MessageContext) -> None:
         """Handle assistant response from agent in group"""
+        if message.partial:
+            # streaming chunk: forward as is and keep the routing state unchanged
+            for output_topic in self.outer_topics:
+                message.source = self.type
+                await self.publish_message(message, topic_id=output_topic, cancellation_token=ctx.cancellation_token)
+            return
+
         message.path.append(self.name)
 
-        print_utils.print_logs(f"{self.name} Receive response from {message.source.upper()}", message, trace_messages=message.traces, debug=self.debug)
+        self.trace(f"Receive response from {message.source.upper()}", message)
         if message.inner_handle_topic:
             self.inner_topic_type = message.inner_handle_topic
 
         # publish response to outer group
         for output_topic in self.outer_topics:
-            print_utils.print_logs(f"{self.name} Redirect response to Topic [{output_topic.type}]", message, trace_messages=message.traces, debug=self.debug)
+            self.trace(f"Redirect response to Topic [{output_topic.type}]", message)
             message.inner_handle_topic = self.agent_topic_type
             message.source = self.type
-            await self.publish_message(message, topic_id=output_topic)
+            await self.publish_message(message, topic_id=output_topic, cancellation_token=ctx.cancellation_token)
 
     async def reset(self, message: ResetMessage, ctx: MessageContext) -> None:
         await self.publish_message(message, topic_id=self.group_topic)
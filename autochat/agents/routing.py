@@ -0,0 +1,154 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Collection, Mapping, Sequence
+
+from autochat.utils.string_utils import no_accent_vietnamese, vn_jaro_score
+
+
+__all__ = [
+    "HandoffRouter",
+]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(no_accent_vietnamese(text.lower()).split())
+
+
+class HandoffRouter:
+    """Choose the handoff of a user message without calling the model.
+
+    Each target, the ``<name>`` of a ``handoff_to_<name>`` tool, has example utterances and
+    keywords. A message that contains the keywords of a single target goes to that target.
+    Otherwise the message is scored against the examples of each target and goes to the best
+    one when its score reaches ``threshold`` and beats the second best by ``margin``,
+    else the model decides. Text is compared lower case and without Vietnamese accents.
+
+    ``tfidf`` scores are cosine similarities of character n-gram TF-IDF vectors, computed
+    against all the examples at once with an inverted index. ``jaro`` scores are the best
+    :func:`vn_jaro_score` of the whole message and an example, for short messages.
+
+    :param routes: the example utterances of each target
+    :param keywords: the keywords of each target
+    :param threshold: the lowest score to route without the model
+    :param margin: the lowest difference between the scores of the two best targets
+    :param matcher: ``tfidf`` or ``jaro``
+    :param ngram_range: the lengths of the character n-grams of ``tfidf``
+    """
+
+    def __init__(
+            self,
+            routes: Mapping[str, Sequence[str]] | None = None,
+            keywords: Mapping[str, Sequence[str]] | None = None,
+            threshold: float = 0.6,
+            margin: float = 0.1,
+            matcher: str = "tfidf",
+            ngram_range: tuple[int, int] = (2, 4),
+    ):
+        if matcher not in ("tfidf", "jaro"):
+            raise ValueError(f"Unknown matcher {matcher}, expected tfidf or jaro")
+
+        self.threshold = threshold
+        self.margin = margin
+        self.matcher = matcher
+        self.ngram_range = tuple(ngram_range)
+
+        self._targets: list[str] = []
+        self._examples: list[str] = []
+        for target, examples in (routes or {}).items():
+            for example in examples:
+                self._targets.append(target)
+                self._examples.append(_normalize(example))
+
+        self._keywords: dict[str, re.Pattern] = {}
+        for target, words in (keywords or {}).items():
+            words = [re.escape(_normalize(word)) for word in words if word.strip()]
+            if words:
+                self._keywords[target] = re.compile(r"(?<!\w)(?:" + "|".join(words) + r")(?!\w)")
+
+        self._build_index()
+
+    @classmethod
+    def from_config(cls, config: "HandoffRouter | Mapping[str, Any]") -> "HandoffRouter":
+        """``{"routes": {<target>: [<example>, ...]}, "keywords": {<target>: [<keyword>, ...]},
+        "threshold": 0.6, "margin": 0.1, "matcher": "tfidf"}``"""
+        if isinstance(config, HandoffRouter):
+            return config
+        return cls(**config)
+
+    @property
+    def targets(self) -> set[str]:
+        return set(self._targets) | set(self._keywords)
+
+    def _ngrams(self, text: str) -> Counter:
+        text = f" {text} "
+        low, high = self.ngram_range
+        return Counter(text[i:i + n] for n in range(low, high + 1) for i in range(len(text) - n + 1))
+
+    def _weights(self, counts: Counter) -> dict[str, float]:
+        """The l2 normalized TF-IDF vector, n-grams that no example has weigh as the rarest ones."""
+        weights = {gram: (1 + math.log(count)) * self._idf.get(gram, self._max_idf) for gram, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        return {gram: weight / norm for gram, weight in weights.items()}
+
+    def _build_index(self) -> None:
+        self._postings: dict[str, list[tuple[int, float]]] = {}
+        self._idf: dict[str, float] = {}
+        self._max_idf = 1.0
+        if self.matcher != "tfidf" or not self._examples:
+            return
+
+        counts = [self._ngrams(example) for example in self._examples]
+        document_frequency = Counter(gram for example_counts in counts for gram in example_counts)
+        total = len(counts)
+        self._idf = {gram: math.log((1 + total) / (1 + df)) + 1 for gram, df in document_frequency.items()}
+        self._max_idf = math.log(1 + total) + 1
+
+        for index, example_counts in enumerate(counts):
+            for gram, weight in self._weights(example_counts).items():
+                self._postings.setdefault(gram, []).append((index, weight))
+
+    def scores(self, text: str, targets: Collection[str] | None = None) -> dict[str, float]:
+        """The score of each target, the best of its examples."""
+        return self._scores(_normalize(text), targets)
+
+    def _scores(self, text: str, targets: Collection[str] | None) -> dict[str, float]:
+        example_scores: dict[int, float] = {}
+        if self.matcher == "tfidf":
+            for gram, weight in self._weights(self._ngrams(text)).items():
+                for index, example_weight in self._postings.get(gram, ()):
+                    example_scores[index] = example_scores.get(index, 0.0) + weight * example_weight
+        else:
+            for index, example in enumerate(self._examples):
+                if targets is None or self._targets[index] in targets:
+                    example_scores[index] = vn_jaro_score(text, example)
+
+        scores: dict[str, float] = {}
+        for index, score in example_scores.items():
+            target = self._targets[index]
+            if (targets is None or target in targets) and score > scores.get(target, 0.0):
+                scores[target] = score
+        return scores
+
+    def route(self, text: str, targets: Collection[str] | None = None) -> tuple[str | None, float]:
+        """The target of the message and its score, ``None`` if the model should decide.
+
+        :param targets: the targets that can be chosen, all by default
+        """
+        normalized = _normalize(text)
+        matched = [
+            target for target, pattern in self._keywords.items()
+            if (targets is None or target in targets) and pattern.search(normalized)
+        ]
+        if len(matched) == 1:
+            return matched[0], 1.0
+
+        scores = sorted(self._scores(normalized, targets).items(), key=lambda item: item[1], reverse=True)
+        if not scores:
+            return None, 0.0
+
+        target, best = scores[0]
+        second = scores[1][1] if len(scores) > 1 else 0.0
+        if best >= self.threshold and best - second >= self.margin:
+            return target, best
+        return None, best
@@ -66,12 +66,12 @@ class BaseGroupChat(BaseGroup):
 
     async def register(self, runtime: AgentRuntime, **kwargs):
         # register proxy agent
-        await self.proxy.register(runtime=runtime)
+        await self.proxy.register(runtime=runtime, **kwargs)
 
         # register master agent
-        await self.master.register(runtime=runtime)
+        await self.master.register(runtime=runtime, **kwargs)
 
         # register participant agent
         for participant in self.participants:
-            await participant.register(runtime=runtime)
+            await participant.register(runtime=runtime, **kwargs)
 
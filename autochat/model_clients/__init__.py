@@ -0,0 +1,13 @@
+from ._base import ChatCompletionClientWrapper, client_create_args, request_key
+from .cached_client import LLMCache, CachedChatCompletionClient
+from .single_flight_client import SingleFlightChatCompletionClient
+
+
+__all__ = [
+    "ChatCompletionClientWrapper",
+    "client_create_args",
+    "request_key",
+    "LLMCache",
+    "CachedChatCompletionClient",
+    "SingleFlightChatCompletionClient"
+]
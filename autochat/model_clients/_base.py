@@ -0,0 +1,124 @@
+from typing import Any, AsyncGenerator, Mapping, Optional, Sequence, Union
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    RequestUsage,
+)
+from autogen_core.components.tools import Tool, ToolSchema
+
+from autochat.utils.serialization import canonical_hash
+
+
+def request_key(
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = (),
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] | None = None,
+        namespace: str | None = None,
+        create_args: Mapping[str, Any] | None = None,
+) -> str:
+    """Canonical hash of a completion request, ``create_args`` are the default arguments of
+    the client (the model name, temperature, ...)."""
+    return canonical_hash({
+        "namespace": namespace,
+        "create_args": create_args or {},
+        "messages": messages,
+        "tools": tools,
+        "json_output": json_output,
+        "extra_create_args": extra_create_args or {},
+    })
+
+
+def client_create_args(client: ChatCompletionClient) -> dict[str, Any]:
+    """The default create arguments of a model client, e.g. ``{"model": "gpt-4o", "temperature": 0}``.
+
+    The autogen OpenAI clients keep them in ``_create_args``, other clients have none."""
+    if isinstance(client, ChatCompletionClientWrapper):
+        return dict(client.create_args)
+    return dict(getattr(client, "_create_args", None) or {})
+
+
+class ChatCompletionClientWrapper(ChatCompletionClient):
+    """A model client that delegates to another model client.
+
+    ``create_args`` are the default create arguments of the wrapped client, part of the
+    request keys so that clients of different models never share a key. They are read from
+    the wrapped client by default, see :func:`client_create_args`.
+    """
+
+    def __init__(
+            self,
+            client: ChatCompletionClient,
+            namespace: str | None = None,
+            create_args: Mapping[str, Any] | None = None,
+    ):
+        self._client = client
+        self.namespace = namespace
+        self.create_args = dict(create_args) if create_args is not None else client_create_args(client)
+
+    @property
+    def client(self) -> ChatCompletionClient:
+        return self._client
+
+    def request_key(
+            self,
+            messages: Sequence[LLMMessage],
+            tools: Sequence[Tool | ToolSchema] = (),
+            json_output: Optional[bool] = None,
+            extra_create_args: Mapping[str, Any] | None = None,
+    ) -> str:
+        return request_key(
+            messages, tools, json_output, extra_create_args, namespace=self.namespace, create_args=self.create_args
+        )
+
+    async def create(
+            self,
+            messages: Sequence[LLMMessage],
+            tools: Sequence[Tool | ToolSchema] = [],
+            json_output: Optional[bool] = None,
+            extra_create_args: Mapping[str, Any] = {},
+            cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        return await self._client.create(
+            messages=messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+
+    def create_stream(
+            self,
+            messages: Sequence[LLMMessage],
+            tools: Sequence[Tool | ToolSchema] = [],
+            json_output: Optional[bool] = None,
+            extra_create_args: Mapping[str, Any] = {},
+            cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        return self._client.create_stream(
+            messages=messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+
+    def actual_usage(self) -> RequestUsage:
+        return self._client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._client.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.count_tokens(messages, tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.remaining_tokens(messages, tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return self._client.capabilities
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Mapping, Optional, Sequence, Union
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import ChatCompletionClient, CreateResult, LLMMessage
+from autogen_core.components.tools import Tool, ToolSchema
+
+from autochat.utils.metrics import Metrics, get_metrics
+from autochat.utils.serialization import create_result_to_dict, create_result_from_dict
+
+from ._base import ChatCompletionClientWrapper
+
+_logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "LLMCache",
+    "CachedChatCompletionClient",
+]
+
+
+class _SQLiteCacheStore:
+    """On-disk cache tier, the database file can be shared by several worker processes."""
+
+    def __init__(self, path: str, purge_interval: int = 1000):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> tuple[dict[str, Any], float | None] | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: dict[str, Any], expires_at: float | None) -> None:
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at),
+            )
+            self._writes += 1
+            if self._writes % self.purge_interval == 0:
+                connection.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class LLMCache:
+    """Two-tier cache of completion results.
+
+    The first tier is an in-process LRU bounded by ``max_size`` entries, the optional second
+    tier is a SQLite database at ``sqlite_path``. Entries expire after ``ttl`` seconds
+    (``None`` to never expire). Counters are reported in ``get_metrics(f"llm_cache.{name}")``.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 1024,
+            ttl: float | None = 3600,
+            sqlite_path: str | None = None,
+            name: str = "default",
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+
+        self._memory: OrderedDict[str, tuple[dict[str, Any], float | None]] = OrderedDict()
+        self._disk = _SQLiteCacheStore(sqlite_path) if sqlite_path else None
+        self.metrics: Metrics = get_metrics(f"llm_cache.{name}")
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return self.metrics.snapshot()
+
+    def _set_memory(self, key: str, value: dict[str, Any], expires_at: float | None) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.metrics.incr("evictions")
+        self.metrics.set("size", len(self._memory))
+
+    async def get(self, key: str) -> CreateResult | None:
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.metrics.incr("hits")
+                self.metrics.incr("memory_hits")
+                return create_result_from_dict(value, cached=True)
+
+            del self._memory[key]
+            self.metrics.incr("expirations")
+
+        if self._disk is not None:
+            entry = await asyncio.to_thread(self._disk.get, key)
+            if entry is not None:
+                value, expires_at = entry
+                self._set_memory(key, value, expires_at)
+                self.metrics.incr("hits")
+                self.metrics.incr("disk_hits")
+                return create_result_from_dict(value, cached=True)
+
+        self.metrics.incr("misses")
+        return None
+
+    async def set(self, key: str, result: CreateResult) -> None:
+        value = create_result_to_dict(result)
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+
+        self._set_memory(key, value, expires_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, value, expires_at)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self.metrics.set("size", 0)
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+
+class CachedChatCompletionClient(ChatCompletionClientWrapper):
+    """A model client that answers repeated requests from an :class:`LLMCache`.
+
+    The cache key is a canonical hash of the model and default create arguments of the client,
+    the messages (including the system message), the tool schemas, ``json_output`` and
+    ``extra_create_args``. Results served from the cache have ``cached=True``.
+    """
+
+    def __init__(
+            self,
+            client: ChatCompletionClient,
+            cache: LLMCache | None = None,
+            namespace: str | None = None,
+            create_args: Mapping[str, Any] | None = None,
+    ):
+        super().__init__(client=client, namespace=namespace, create_args=create_args)
+        self.cache = cache or LLMCache()
+
+    async def create(
+            self,
+            messages: Sequence[LLMMessage],
+            tools: Sequence[Tool | ToolSchema] = [],
+            json_output: Optional[bool] = None,
+            extra_create_args: Mapping[str, Any] = {},
+            cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        key = self.request_key(messages, tools, json_output, extra_create_args)
+
+        result = await self.cache.get(key)
+        if result is not None:
+            return result
+
+        result = await self._client.create(
+            messages=messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+        await self.cache.set(key, result)
+
+        return result
+
+    async def create_stream(
+            self,
+            messages: Sequence[LLMMessage],
+            tools: Sequence[Tool | ToolSchema] = [],
+            json_output: Optional[bool] = None,
+            extra_create_args: Mapping[str, Any] = {},
+            cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        key = self.request_key(messages, tools, json_output, extra_create_args)
+
+        result = await self.cache.get(key)
+        if result is not None:
+            if isinstance(result.content, str):
+                yield result.content
+            yield result
+            return
+
+        async for chunk in self._client.create_stream(
+            messages=messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        ):
+            if isinstance(chunk, CreateResult):
+                await self.cache.set(key, chunk)
+            yield chunk
@@ -0,0 +1,119 @@
+import asyncio
+import copy
+import logging
+from typing import Any, Mapping, Optional, Sequence
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import ChatCompletionClient, CreateResult, LLMMessage
+from autogen_core.components.tools import Tool, ToolSchema
+
+from autochat.utils.metrics import Metrics, get_metrics
+
+from ._base import ChatCompletionClientWrapper
+
+_logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "SingleFlightChatCompletionClient",
+]
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task, cancellation_token: CancellationToken):
+        self.task = task
+        self.cancellation_token = cancellation_token
+        self.waiters = 0
+
+
+class SingleFlightChatCompletionClient(ChatCompletionClientWrapper):
+    """A model client that coalesces identical in-flight ``create`` requests.
+
+    Concurrent requests with the same canonical key share one upstream call and each
+    caller receives its own deep copy of the result. Cancelling a caller only cancels its
+    wait; the upstream call is cancelled once no caller is waiting for it anymore.
+    Streaming requests are passed through.
+    """
+
+    def __init__(
+            self,
+            client: ChatCompletionClient,
+            namespace: str | None = None,
+            create_args: Mapping[str, Any] | None = None,
+    ):
+        super().__init__(client=client, namespace=namespace, create_args=create_args)
+        self._in_flight: dict[str, _Flight] = {}
+        self.metrics: Metrics = get_metrics(f"single_flight.{namespace or 'default'}")
+
+    def _start_flight(
+            self,
+            key: str,
+            messages: Sequence[LLMMessage],
+            tools: Sequence[Tool | ToolSchema],
+            json_output: Optional[bool],
+            extra_create_args: Mapping[str, Any],
+    ) -> _Flight:
+        # The upstream call has its own token, no single caller owns it.
+        cancellation_token = CancellationToken()
+        task = asyncio.ensure_future(
+            self._client.create(
+                messages=messages,
+                tools=tools,
+                json_output=json_output,
+                extra_create_args=extra_create_args,
+                cancellation_token=cancellation_token,
+            )
+        )
+        flight = _Flight(task=task, cancellation_token=cancellation_token)
+
+        def _done(_: asyncio.Task) -> None:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+            self.metrics.set("in_flight", len(self._in_flight))
+
+        task.add_done_callback(_done)
+        self._in_flight[key] = flight
+        self.metrics.incr("upstream_calls")
+        self.metrics.set("in_flight", len(self._in_flight))
+
+        return flight
+
+    async def create(
+            self,
+            messages: Sequence[LLMMessage],
+            tools: Sequence[Tool | ToolSchema] = [],
+            json_output: Optional[bool] = None,
+            extra_create_args: Mapping[str, Any] = {},
+            cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        key = self.request_key(messages, tools, json_output, extra_create_args)
+
+        self.metrics.incr("requests")
+        flight = self._in_flight.get(key)
+        if flight is None or flight.task.cancelled():
+            # a cancelled flight is not joined, its callers are all gone
+            flight = self._start_flight(key, messages, tools, json_output, extra_create_args)
+        else:
+            self.metrics.incr("coalesced")
+
+        flight.waiters += 1
+        try:
+            waiter = asyncio.shield(flight.task)
+            if cancellation_token is not None:
+                cancellation_token.link_future(waiter)
+            result = await waiter
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # the last caller gave up waiting, a new request must not join the flight
+                # while its cancellation is pending
+                if self._in_flight.get(key) is flight:
+                    del self._in_flight[key]
+                    self.metrics.set("in_flight", len(self._in_flight))
+                flight.task.cancel()
+                flight.cancellation_token.cancel()
+                self.metrics.incr("upstream_cancelled")
+
+        # callers post-process the result in place (e.g. its list of function calls),
+        # each gets its own deep copy
+        return copy.deepcopy(result)
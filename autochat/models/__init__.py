@@ -1,7 +1,9 @@
 from .common import Memory, MemoryType, LLMResult
+from .context_window import ContextWindow
 
 __all__ = [
     "MemoryType",
     "Memory",
-    "LLMResult"
+    "LLMResult",
+    "ContextWindow"
 ]
\ No newline at end of file
@@ -0,0 +1,113 @@
+import logging
+from collections import OrderedDict
+from typing import Callable
+
+from autogen_core.components.models import (
+    AssistantMessage,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "ContextWindow",
+    "estimate_tokens",
+]
+
+
+def estimate_tokens(message: LLMMessage) -> int:
+    """Rough token count (~4 characters per token) used when the model client can't count."""
+    content = message.content
+    if isinstance(content, str):
+        length = len(content)
+    elif isinstance(content, list):
+        length = sum(len(str(item)) for item in content)
+    else:
+        length = len(str(content))
+
+    return length // 4 + 4
+
+
+class ContextWindow:
+    """Trim a conversation history to a token budget before it is sent to the model.
+
+    The newest messages are kept while they fit in ``max_tokens`` (and ``max_messages`` if set).
+    An assistant message with function calls and the function results that answer it are
+    kept or dropped together, and the newest message is always kept. Token counts are cached
+    per message object, so each turn only counts the messages that are new.
+    """
+
+    def __init__(
+            self,
+            max_tokens: int | None = None,
+            max_messages: int | None = None,
+            token_counter: Callable[[LLMMessage], int] | None = None,
+            cache_size: int = 4096,
+    ):
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.token_counter = token_counter or estimate_tokens
+        self.cache_size = cache_size
+
+        # id(message) -> (message, token count), the message reference keeps the id valid
+        self._token_cache: OrderedDict[int, tuple[LLMMessage, int]] = OrderedDict()
+
+    def count_tokens(self, message: LLMMessage) -> int:
+        entry = self._token_cache.get(id(message))
+        if entry is not None and entry[0] is message:
+            self._token_cache.move_to_end(id(message))
+            return entry[1]
+
+        try:
+            tokens = self.token_counter(message)
+        except Exception as e:
+            _logger.debug(f"Failed to count tokens, fallback to estimation: {e}")
+            tokens = estimate_tokens(message)
+
+        self._token_cache[id(message)] = (message, tokens)
+        if len(self._token_cache) > self.cache_size:
+            self._token_cache.popitem(last=False)
+
+        return tokens
+
+    @staticmethod
+    def _units(messages: list[LLMMessage]) -> list[tuple[int, int]]:
+        """Split messages into (start, end) units from the newest to the oldest."""
+        units = []
+        end = len(messages)
+        while end > 0:
+            start = end - 1
+            message = messages[start]
+            if isinstance(message, FunctionExecutionResultMessage) and start > 0:
+                previous = messages[start - 1]
+                if isinstance(previous, AssistantMessage) and isinstance(previous.content, list):
+                    start -= 1
+            units.append((start, end))
+            end = start
+
+        return units
+
+    def apply(self, messages: list[LLMMessage]) -> list[LLMMessage]:
+        if not messages or (self.max_tokens is None and self.max_messages is None):
+            return messages
+
+        units = self._units(messages)
+        first_start = units[0][0]
+        total_tokens = sum(self.count_tokens(m) for m in messages[units[0][0]:units[0][1]])
+
+        for start, end in units[1:]:
+            tokens = sum(self.count_tokens(m) for m in messages[start:end])
+            if self.max_tokens is not None and total_tokens + tokens > self.max_tokens:
+                break
+            if self.max_messages is not None and len(messages) - start > self.max_messages:
+                break
+            total_tokens += tokens
+            first_start = start
+
+        # never start the window with function results whose calls were dropped
+        while first_start < len(messages) - 1 and isinstance(messages[first_start], FunctionExecutionResultMessage):
+            first_start += 1
+
+        return messages[first_start:]
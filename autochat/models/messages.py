@@ -14,8 +14,12 @@ class BaseMessage(BaseModel):
     path: list[str] = []
 
     traces: list[Any] = []
+    """Not filled anymore, the hops of a message are recorded by the tracer (:mod:`autochat.utils.tracing`)."""
     metadata: dict[str, Any] = {}
 
+    deadline: float | None = None
+    """Unix timestamp after which the turn is abandoned, it travels with the message through the agents."""
+
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     def show_id(self):
@@ -34,6 +38,11 @@ class AssistantResponse(BaseMessage):
     inner_handle_topic: str | None = None
     outer_handle_topic: str | None = None
 
+    partial: bool = False
+    """True if the message is a streaming chunk of a response that is still being generated.
+    A partial chunk with ``metadata["retract"]`` withdraws the chunks streamed so far for the
+    response, e.g. when the agent retries it on a new conversation."""
+
 
 class HandoffMessage(BaseMessage):
     """A message requesting handoff of a conversation to another agent."""
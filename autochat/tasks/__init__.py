@@ -1,8 +1,15 @@
 from ._base import BaseTaskRunner, TaskResult
+from .checkpoint import SessionCheckpoint, SQLiteCheckpointStore
+from .eviction import EvictionPolicy
 from .group_chat_runner import GroupChatRunner
+from .sharded_runner import ShardedGroupChatRunner
 
 __all__ = [
     "TaskResult",
     "BaseTaskRunner",
-    "GroupChatRunner"
+    "GroupChatRunner",
+    "ShardedGroupChatRunner",
+    "SessionCheckpoint",
+    "SQLiteCheckpointStore",
+    "EvictionPolicy",
 ]
\ No newline at end of file
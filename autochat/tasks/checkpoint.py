@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Sequence
+
+from autogen_core.components.models import LLMMessage
+
+from autochat.utils.metrics import Metrics, get_metrics
+from autochat.utils.serialization import llm_message_from_dict, llm_message_to_dict
+
+_logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "SessionCheckpoint",
+    "SQLiteCheckpointStore",
+]
+
+
+@dataclass
+class SessionCheckpoint:
+    """The persisted state of a conversation."""
+
+    session_id: str
+    history: list[LLMMessage] = field(default_factory=list)
+    """The messages of the conversation, as sent to the agents on the last turn."""
+
+    agent_states: dict[str, dict[str, Any]] = field(default_factory=dict)
+    """The ``save_state()`` of the agents of the session, by agent type."""
+
+    updated_at: float | None = None
+
+
+@dataclass
+class _SessionMark:
+    """What is already written for a session, so a save only writes what changed."""
+
+    history_length: int = 0
+    last_message_digest: bytes | None = None
+    state_digests: dict[str, bytes] = field(default_factory=dict)
+
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+class SQLiteCheckpointStore:
+    """Session checkpoints in a SQLite database, written by :class:`GroupChatRunner` after each turn.
+
+    The history is stored one message per row, so a turn appends only its new messages, and
+    an agent state is rewritten only when it changed. Values are compact JSON, compressed
+    with zlib from ``compress_min_size`` bytes. The database file can be shared by several
+    worker processes as long as each session is served by one of them, e.g. behind
+    :class:`ShardedGroupChatRunner`. Counters are reported in ``get_metrics(f"checkpoint.{name}")``.
+    """
+
+    def __init__(self, path: str, compress_min_size: int = 512, name: str = "default"):
+        self.path = path
+        self.compress_min_size = compress_min_size
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._marks: dict[str, _SessionMark] = {}
+        self.metrics: Metrics = get_metrics(f"checkpoint.{name}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_messages ("
+                "session_id TEXT NOT NULL, seq INTEGER NOT NULL, message BLOB NOT NULL, "
+                "PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS agent_states ("
+                "session_id TEXT NOT NULL, agent_type TEXT NOT NULL, state BLOB NOT NULL, "
+                "PRIMARY KEY (session_id, agent_type)) WITHOUT ROWID"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def _encode(self, value: Any) -> bytes:
+        data = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        if len(data) >= self.compress_min_size:
+            return b"z" + zlib.compress(data)
+        return b"j" + data
+
+    @staticmethod
+    def _decode(blob: bytes) -> Any:
+        data = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+        return json.loads(data)
+
+    def _load(self, session_id: str, with_states: bool) -> SessionCheckpoint | None:
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                self._marks[session_id] = _SessionMark()
+                return None
+
+            messages = connection.execute(
+                "SELECT message FROM session_messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+            states = connection.execute(
+                "SELECT agent_type, state FROM agent_states WHERE session_id = ?", (session_id,)
+            ).fetchall() if with_states else []
+
+        mark = self._marks.setdefault(session_id, _SessionMark())
+        mark.history_length = len(messages)
+        mark.last_message_digest = _digest(messages[-1][0]) if messages else None
+        if with_states:
+            mark.state_digests = {agent_type: _digest(state) for agent_type, state in states}
+
+        return SessionCheckpoint(
+            session_id=session_id,
+            history=[llm_message_from_dict(self._decode(message)) for message, in messages],
+            agent_states={agent_type: self._decode(state) for agent_type, state in states},
+            updated_at=row[0],
+        )
+
+    def _save(
+            self,
+            session_id: str,
+            history: Sequence[LLMMessage] | None,
+            agent_states: Mapping[str, Mapping[str, Any]],
+    ) -> None:
+        with self._lock:
+            connection = self._connect()
+            mark = self._marks.get(session_id)
+            if mark is None:
+                # not loaded by this process, compare with what is on disk
+                mark = self._marks[session_id] = _SessionMark()
+                row = connection.execute(
+                    "SELECT seq, message FROM session_messages WHERE session_id = ? ORDER BY seq DESC LIMIT 1",
+                    (session_id,),
+                ).fetchone()
+                if row is not None:
+                    mark.history_length, mark.last_message_digest = row[0] + 1, _digest(row[1])
+                mark.state_digests = {
+                    agent_type: _digest(state) for agent_type, state in connection.execute(
+                        "SELECT agent_type, state FROM agent_states WHERE session_id = ?", (session_id,)
+                    )
+                }
+
+            written = 0
+            if history is not None:
+                start = mark.history_length
+                # append if the stored history is a prefix of the new one, e.g. not edited by the client
+                if start and (len(history) < start or _digest(self._encode(llm_message_to_dict(history[start - 1])))
+                              != mark.last_message_digest):
+                    connection.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+                    self.metrics.incr("history_rewrites")
+                    start = 0
+                    # nothing is stored anymore, even if the new history is empty
+                    mark.history_length = 0
+                    mark.last_message_digest = None
+
+                rows = [(session_id, seq, self._encode(llm_message_to_dict(history[seq])))
+                        for seq in range(start, len(history))]
+                if rows:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO session_messages (session_id, seq, message) VALUES (?, ?, ?)", rows
+                    )
+                    mark.history_length = len(history)
+                    mark.last_message_digest = _digest(rows[-1][2])
+                    written += sum(len(blob) for _, _, blob in rows)
+                    self.metrics.incr("messages_written", len(rows))
+
+            for agent_type, state in agent_states.items():
+                blob = self._encode(state)
+                digest = _digest(blob)
+                if mark.state_digests.get(agent_type) == digest:
+                    self.metrics.incr("states_unchanged")
+                    continue
+                connection.execute(
+                    "INSERT OR REPLACE INTO agent_states (session_id, agent_type, state) VALUES (?, ?, ?)",
+                    (session_id, agent_type, blob),
+                )
+                mark.state_digests[agent_type] = digest
+                written += len(blob)
+                self.metrics.incr("states_written")
+
+            connection.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, updated_at) VALUES (?, ?)", (session_id, time.time())
+            )
+            connection.commit()
+
+        self.metrics.incr("saves")
+        self.metrics.incr("bytes_written", written)
+
+    def _delete(self, session_id: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            for table in ("session_messages", "agent_states", "sessions"):
+                connection.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+            connection.commit()
+            self._marks.pop(session_id, None)
+
+    async def load(self, session_id: str) -> SessionCheckpoint | None:
+        """The checkpoint of a session, ``None`` if it has none."""
+        checkpoint = await asyncio.to_thread(self._load, session_id, True)
+        self.metrics.incr("loads" if checkpoint is not None else "load_misses")
+        return checkpoint
+
+    async def load_history(self, session_id: str) -> list[LLMMessage]:
+        checkpoint = await asyncio.to_thread(self._load, session_id, False)
+        return checkpoint.history if checkpoint is not None else []
+
+    async def save(
+            self,
+            session_id: str,
+            history: Sequence[LLMMessage] | None = None,
+            agent_states: Mapping[str, Mapping[str, Any]] | None = None,
+    ) -> None:
+        """Write the history (``None`` keeps the stored one) and the agent states of a session."""
+        await asyncio.to_thread(self._save, session_id, history, agent_states or {})
+
+    async def delete(self, session_id: str) -> None:
+        await asyncio.to_thread(self._delete, session_id)
+
+    def forget(self, session_id: str) -> None:
+        """Drop what is remembered of a session in this process, its checkpoint is kept."""
+        with self._lock:
+            self._marks.pop(session_id, None)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+
+__all__ = [
+    "EvictionPolicy",
+]
+
+
+class EvictionPolicy:
+    """When :class:`GroupChatRunner` releases the agents of a session.
+
+    The runtime creates the agents of a session on its first message and keeps them until
+    they are released. A released session starts with new agents on its next message,
+    restored from the checkpoint store of the runner if it has one.
+
+    :param idle_timeout: the seconds after the last turn of a session before it is released
+    :param max_sessions: the cap on sessions with live agents, the least recently used ones
+        are released first
+    :param checkpoint: save the agent states to the checkpoint store of the runner before
+        releasing them
+    :param sweep_interval: the seconds between two sweeps of the idle sessions while the runner
+        is serving, sessions are also swept at the end of each turn
+    """
+
+    def __init__(
+            self,
+            idle_timeout: float | None = 1800,
+            max_sessions: int | None = None,
+            checkpoint: bool = True,
+            sweep_interval: float = 30,
+    ):
+        if max_sessions is not None and max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.checkpoint = checkpoint
+        self.sweep_interval = sweep_interval
+
+    def select(self, sessions: OrderedDict[str, float], now: float) -> list[str]:
+        """The sessions to release, least recently used first.
+
+        :param sessions: the time of the last turn of each session, least recently used first
+        """
+        excess = len(sessions) - self.max_sessions if self.max_sessions is not None else 0
+        selected = []
+        for session_id, last_used in sessions.items():
+            if excess <= 0 and (self.idle_timeout is None or now - last_used < self.idle_timeout):
+                break
+            selected.append(session_id)
+            excess -= 1
+        return selected
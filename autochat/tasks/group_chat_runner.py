@@ -1,5 +1,9 @@
 import asyncio
+import logging
+import time
+import weakref
 
+from collections import OrderedDict
 from typing import AsyncGenerator
 
 from uuid import uuid4
@@ -17,19 +21,59 @@ from autogen_core.components.models import (
 from autochat.models.messages import BaseMessage, UserMessage, AssistantResponse, ResetMessage
 
 from autochat.agents import ProxyAgent
+from autochat.agents._base import BaseAgent
 from autochat.agent_container import ProxyContainer
 from autochat.group_chats import BaseGroupChat
 from autochat.tasks import BaseTaskRunner, TaskResult
+from autochat.tasks.checkpoint import SQLiteCheckpointStore
+from autochat.tasks.eviction import EvictionPolicy
+from autochat.utils.deadline import deadline_after
+from autochat.utils.metrics import Metrics, get_metrics
+from autochat.utils.tracing import TraceEvent, get_tracer
+
+_logger = logging.getLogger(__name__)
+
+
+class _Turn:
+    """The output of a running turn, filled by the output collector."""
+
+    def __init__(self):
+        self.queue: asyncio.Queue[AssistantResponse | None] = asyncio.Queue()
+        self.output_message: AssistantResponse | None = None
+        self.stop_reason: str | None = None
+        # set by the deadline timer, the turn was cancelled because its time budget ran out
+        self.deadline_exceeded = False
+        self._closed = False
+
+    def expire(self, cancellation_token: CancellationToken) -> None:
+        self.deadline_exceeded = True
+        cancellation_token.cancel()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.queue.put_nowait(None)
 
 
 class GroupChatRunner(BaseTaskRunner):
-    """A task runner for conversation chat"""
+    """A task runner for conversation chat
+
+    With a ``checkpoint_store`` the history and the agent states of a session are saved after
+    each complete turn and restored when the next message of the session arrives, e.g. after a
+    restart, so the agents keep routing the conversation where it was. A turn whose task is a
+    string then continues the stored history.
+
+    The agents of a session live until the ``eviction`` policy releases them, see
+    :class:`EvictionPolicy`. The live and released sessions and agents are reported in
+    ``get_metrics(f"group_chat_runner.{task_id}")``."""
     def __init__(
             self,
             master_group: BaseGroupChat,
             participants_groups: list[BaseGroupChat],
             task_id: str | None = None,
             runtime: AgentRuntime | None = None,
+            checkpoint_store: SQLiteCheckpointStore | None = None,
+            eviction: EvictionPolicy | None = None,
     ):
         self.id = task_id or str(uuid4()).replace("-", "")[:24]
         self._runtime = runtime or SingleThreadedAgentRuntime()
@@ -56,13 +100,35 @@ class GroupChatRunner(BaseTaskRunner):
 
         # Constants for the closure agent to collect the output messages.
         self._stop_reason: str | None = None
-        self._output_message: AssistantResponse | None = None
+        # the running turn of each session, by session id (the source of the topics)
+        self._turns: dict[str, _Turn] = {}
+        self._session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
         # Flag to track if the group chat has been initialized.
         self._initialized = False
 
         # Flag to track if the group chat is running.
         self._is_running = False
 
+        # Flag to track if the runtime is kept running to serve concurrent sessions, see start().
+        self._serving = False
+        self._turn_timeout: float | None = None
+
+        self.checkpoint_store = checkpoint_store
+        # the sessions whose checkpoint is loaded in this process
+        self._restored_sessions: set[str] = set()
+
+        self.eviction = eviction
+        if eviction is not None and not hasattr(self._runtime, "_instantiated_agents"):
+            raise ValueError(f"Sessions can't be evicted from a {type(self._runtime).__name__}, "
+                             f"the eviction policy needs a SingleThreadedAgentRuntime")
+        # the agent types registered by the runner and the agents created for each session
+        self._agent_types: set[str] = set()
+        self._live_agents: dict[str, dict[str, BaseAgent]] = {}
+        # the time of the last turn of each session with live agents, least recently used first
+        self._session_last_used: OrderedDict[str, float] = OrderedDict()
+        self._sweep_task: asyncio.Task | None = None
+        self.metrics: Metrics = get_metrics(f"group_chat_runner.{self.id}")
+
         self.init_topic_type()
 
     def init_topic_type(self, **kwargs):
@@ -102,16 +168,22 @@ class GroupChatRunner(BaseTaskRunner):
         *,
         task: str | BaseMessage | None = None,
         cancellation_token: CancellationToken | None = None,
+        timeout: float | None = None,
+        session_id: str | None = None,
     ) -> TaskResult:
         """Run the task and return the result.
 
         The runner is stateful and a subsequent call to this method will continue
         from where the previous call left off. If the task is not specified,
-        the runner will continue with the current task."""
+        the runner will continue with the current task.
+
+        ``timeout`` and ``session_id`` are described in :meth:`run_stream`."""
         result: TaskResult | None = None
         async for message in self.run_stream(
             task=task,
             cancellation_token=cancellation_token,
+            timeout=timeout,
+            session_id=session_id,
         ):
             if isinstance(message, TaskResult):
                 result = message
@@ -124,59 +196,183 @@ class GroupChatRunner(BaseTaskRunner):
         *,
         task: str | BaseMessage | None = None,
         cancellation_token: CancellationToken | None = None,
+        timeout: float | None = None,
+        session_id: str | None = None,
     ) -> AsyncGenerator[BaseMessage | TaskResult, None]:
         """Run the task and produces a stream of messages and the final result
         :class:`TaskResult` as the last item in the stream.
 
         The runner is stateful and a subsequent call to this method will continue
         from where the previous call left off. If the task is not specified,
-        the runner will continue with the current task."""
-        ...
+        the runner will continue with the current task.
+
+        ``timeout`` is the time budget of the turn in seconds. The deadline travels with the
+        message through the agents, each LLM and tool call gets the remaining time and the
+        in-flight calls are cancelled when it passes, the stop reason is then ``deadline_exceeded``.
+        Cancelling ``cancellation_token`` cancels the turn the same way.
+
+        ``session_id`` is the conversation the turn belongs to (the source of its topics, so each
+        session has its own agents), the task id by default. Without :meth:`start` the runtime
+        runs for this turn only and one turn runs at a time. After :meth:`start` turns of
+        different sessions run concurrently, turns of the same session run one after another
+        and a turn ends with the first complete response. A turn whose agent fails ends without
+        a response, its stop reason is ``error``.
+
+        With streaming agents, partial :class:`AssistantResponse` chunks carry the text of the
+        response as it is generated; a chunk with ``metadata["retract"]`` withdraws the chunks
+        received before it."""
+        session_id = session_id or self.id
+
+        if not self._serving:
+            if self._is_running:
+                raise ValueError("The task is already running, it cannot run again until it is stopped.")
+
+            self._is_running = True
+            # Start the runtime.
+            self._runtime.start()
+
+        try:
+            if not self._initialized:
+                await self.init()
+
+            # Run the task by publishing the start message.
+            first_chat_message: BaseMessage | None = None
+
+            if isinstance(task, str):
+                llm_user_message = LLMUserMessage(content=task, source="user")
+                first_chat_message = UserMessage(content=[llm_user_message], source="user")
+            elif isinstance(task, UserMessage):
+                first_chat_message = task
+
+            if timeout is None and self._serving:
+                timeout = self._turn_timeout
+
+            # turns of a session share its agents, so they never overlap
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = asyncio.Lock()
+
+            async with lock:
+                turn = _Turn()
+                self._turns[session_id] = turn
+                self._touch_session(session_id)
+
+                cancellation_token = cancellation_token or CancellationToken()
+                deadline = deadline_after(timeout)
+                deadline_handle: asyncio.TimerHandle | None = None
+                if deadline is not None:
+                    if first_chat_message is not None:
+                        first_chat_message.deadline = deadline
+                    deadline_handle = asyncio.get_running_loop().call_later(timeout, turn.expire, cancellation_token)
+
+                shutdown_task: asyncio.Task | None = None
+                try:
+                    if self.checkpoint_store is not None and first_chat_message is not None:
+                        await self._restore_session(session_id, continue_history=isinstance(task, str),
+                                                    message=first_chat_message)
+
+                    await self._runtime.publish_message(
+                        message=first_chat_message,
+                        topic_id=TopicId(type=self._user_proxy_topic, source=session_id),
+                        cancellation_token=cancellation_token
+                    )
+
+                    if self._serving:
+                        # the collector ends the turn with the complete response, a cancelled turn has none
+                        cancellation_token.add_callback(turn.close)
+                    else:
+                        # Start a coroutine to stop the runtime and signal the output message queue is complete.
+                        async def stop_runtime() -> None:
+                            await self._runtime.stop_when_idle()
+                            turn.close()
+
+                        shutdown_task = asyncio.create_task(stop_runtime())
+
+                    # Yield the messages (streaming chunks and responses) as they arrive.
+                    while True:
+                        message = await turn.queue.get()
+                        if message is None:
+                            break
+                        yield message
+
+                    # Wait for the shutdown task to finish.
+                    if shutdown_task is not None:
+                        await shutdown_task
+
+                    if self.checkpoint_store is not None and turn.output_message is not None:
+                        content = turn.output_message.content
+                        await self._checkpoint_session(session_id, history=content if isinstance(content, list) else None)
+                finally:
+                    if self._turns.get(session_id) is turn:
+                        del self._turns[session_id]
+                    self._touch_session(session_id)
+                    if deadline_handle is not None:
+                        deadline_handle.cancel()
+
+            if turn.output_message is None and cancellation_token.is_cancelled():
+                turn.stop_reason = "deadline_exceeded" if turn.deadline_exceeded else "cancelled"
+            self._stop_reason = turn.stop_reason
+
+            if self.eviction is not None:
+                await self.evict_sessions()
+        finally:
+            if not self._serving:
+                # Indicate that the team is no longer running.
+                self._is_running = False
 
-        if self._is_running:
-            raise ValueError("The task is already running, it cannot run again until it is stopped.")
+        # Yield the final result.
+        yield TaskResult(messages=[turn.output_message], stop_reason=turn.stop_reason)
 
-        self._is_running = True
-        # Start the runtime.
-        # TODO: The runtime should be started by a managed context.
-        self._runtime.start()
+    async def start(self, turn_timeout: float | None = None) -> None:
+        """Start serving: keep the runtime running and accept concurrent turns keyed by session id.
+
+        :param turn_timeout: the default time budget of a turn in seconds, ``None`` for no limit
+        """
+        if self._is_running or self._serving:
+            raise RuntimeError("The group chat is already running.")
 
+        self._runtime.start()
         if not self._initialized:
             await self.init()
 
-        # Run the task by publishing the start message.
-        first_chat_message: BaseMessage | None = None
+        self._turn_timeout = turn_timeout
+        self._serving = True
 
-        if isinstance(task, str):
-            llm_user_message = LLMUserMessage(content=task, source="user")
-            first_chat_message = UserMessage(content=[llm_user_message], source="user")
-        elif isinstance(task, UserMessage):
-            first_chat_message = task
+        if self.eviction is not None and self.eviction.idle_timeout is not None:
+            self._sweep_task = asyncio.create_task(self._sweep_idle_sessions())
 
-        await self._runtime.publish_message(
-            message=first_chat_message,
-            topic_id=self.user_proxy_topic
-        )
+    async def stop(self) -> None:
+        """Stop serving once the runtime is idle, the turns still waiting for a response end without one."""
+        if not self._serving:
+            raise RuntimeError("The group chat is not serving.")
 
-        # Start a coroutine to stop the runtime and signal the output message queue is complete.
-        async def stop_runtime() -> None:
-            await self._runtime.stop_when_idle()
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
 
-        shutdown_task = asyncio.create_task(stop_runtime())
-        # Wait for the shutdown task to finish.
-        await shutdown_task
+        await self._runtime.stop_when_idle()
+        self._serving = False
 
-        # Yield the final result.
-        yield TaskResult(messages=[self._output_message], stop_reason=self._stop_reason)
+        for turn in self._turns.values():
+            turn.close()
 
-        # Indicate that the team is no longer running.
-        self._is_running = False
+    async def reset(self, session_id: str | None = None) -> None:
+        """Reset the team and all its participants to its initial state.
 
-    async def reset(self) -> None:
-        """Reset the team and all its participants to its initial state."""
+        In server mode only the agents of ``session_id`` (the task id by default) are reset."""
         if not self._initialized:
             raise RuntimeError("The group chat has not been initialized. It must be run before it can be reset.")
 
+        reset_topic = TopicId(type=self._task_topic, source=session_id or self.id)
+
+        if self.checkpoint_store is not None:
+            self._restored_sessions.discard(reset_topic.source)
+            await self.checkpoint_store.delete(reset_topic.source)
+
+        if self._serving:
+            await self._runtime.publish_message(ResetMessage(), topic_id=reset_topic)
+            return
+
         if self._is_running:
             raise RuntimeError("The group chat is currently running. It must be stopped before it can be reset.")
         self._is_running = True
@@ -187,7 +383,7 @@ class GroupChatRunner(BaseTaskRunner):
         # Send a reset message to the group chat.
         await self._runtime.publish_message(
             ResetMessage(),
-            topic_id=self.task_topic,
+            topic_id=reset_topic,
         )
 
         # Stop the runtime.
@@ -199,6 +395,162 @@ class GroupChatRunner(BaseTaskRunner):
         # Indicate that the team is no longer running.
         self._is_running = False
 
+    def get_trace(self, session_id: str | None = None) -> list[TraceEvent]:
+        """The traced hops of the latest turns of a session (the task id by default),
+        see :func:`autochat.utils.tracing.configure_tracing`."""
+        return get_tracer().get_trace(session_id or self.id)
+
+    async def close(self) -> None:
+        """Release the resources of the runner, e.g. its checkpoint store.
+
+        The pooled HTTP sessions of actions and the pools of the function tools are shared by
+        all the runners of the process, they are released by calling
+        :func:`autochat.tools.action.close_http_sessions` and
+        :func:`autochat.tools.shutdown_tool_executors` when the process stops serving."""
+        if self._is_running or self._serving:
+            raise RuntimeError("The group chat is currently running. It must be stopped before it can be closed.")
+
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.close()
+
+    async def __aenter__(self) -> "GroupChatRunner":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    def _track_agent(self, agent: BaseAgent) -> None:
+        """Called with each agent the runtime creates from the types the runner registered."""
+        self._agent_types.add(agent.id.type)
+        self._live_agents.setdefault(agent.id.key, {})[agent.id.type] = agent
+        agent.on_error = self._agent_failed
+
+    def _agent_failed(self, agent: BaseAgent, error: Exception) -> None:
+        """End the running turn of the session of a failed agent, it won't get a complete response."""
+        turn = self._turns.get(agent.key)
+        if turn is not None and turn.output_message is None:
+            _logger.warning(f"End the turn of session {agent.key}, agent {agent.type} failed: {error!r}")
+            turn.stop_reason = "error"
+            turn.close()
+
+    def _session_agents(self, session_id: str) -> list[BaseAgent]:
+        """The agents of a session that the runtime has created."""
+        return list(self._live_agents.get(session_id, {}).values())
+
+    def _release_session_agents(self, session_id: str) -> int:
+        """Drop the agents of a session from the runtime, it creates new ones on the next message
+        of the session. Returns the number of agents released.
+
+        The runtime has no API to release an agent, so the agents of the types the runner
+        registered are removed from the ``_instantiated_agents`` of SingleThreadedAgentRuntime;
+        this is the only place that touches it."""
+        instantiated = getattr(self._runtime, "_instantiated_agents", None)
+        if instantiated is None:
+            raise RuntimeError(f"Can't release the agents of session {session_id} from a "
+                               f"{type(self._runtime).__name__}, it has no _instantiated_agents")
+
+        self._live_agents.pop(session_id, None)
+        released = 0
+        for agent_type in self._agent_types:
+            if instantiated.pop(AgentId(type=agent_type, key=session_id), None) is not None:
+                released += 1
+        return released
+
+    @property
+    def _live_agent_count(self) -> int:
+        return sum(len(agents) for agents in self._live_agents.values())
+
+    async def _restore_session(self, session_id: str, continue_history: bool, message: BaseMessage) -> None:
+        """Load the checkpoint of the session on its first turn in this process and put the
+        stored history before the new message of a turn that continues it."""
+        history: list = []
+        if session_id not in self._restored_sessions:
+            checkpoint = await self.checkpoint_store.load(session_id)
+            self._restored_sessions.add(session_id)
+            if checkpoint is not None:
+                for agent_type, state in checkpoint.agent_states.items():
+                    try:
+                        await self._runtime.agent_load_state(AgentId(type=agent_type, key=session_id), state)
+                    except LookupError:
+                        _logger.warning(f"Skip the checkpoint of agent {agent_type} of session {session_id}, "
+                                        f"the agent is not registered")
+                history = checkpoint.history
+                _logger.debug(f"Restored session {session_id}: {len(history)} messages, "
+                              f"{len(checkpoint.agent_states)} agents")
+        elif continue_history:
+            history = await self.checkpoint_store.load_history(session_id)
+
+        if continue_history and history:
+            message.content = history + list(message.content)
+
+    async def _checkpoint_session(self, session_id: str, history: list | None = None) -> None:
+        agent_states = {agent.type: agent.save_state() for agent in self._session_agents(session_id)}
+        try:
+            await self.checkpoint_store.save(session_id, history=history, agent_states=agent_states)
+        except Exception:
+            _logger.exception(f"Failed to checkpoint session {session_id}")
+
+    def _touch_session(self, session_id: str) -> None:
+        if self.eviction is None:
+            return
+        self._session_last_used[session_id] = time.monotonic()
+        self._session_last_used.move_to_end(session_id)
+        self.metrics.set("live_sessions", len(self._session_last_used))
+
+    async def evict_session(self, session_id: str) -> bool:
+        """Release the agents of a session, after saving their states to the checkpoint store
+        unless the eviction policy says otherwise. A session with a running turn is kept,
+        returns whether the session was released."""
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        if lock.locked():
+            return False
+
+        last_used = self._session_last_used.get(session_id)
+        async with lock:
+            # a turn that was waiting for the lock ran in between
+            if self._session_last_used.get(session_id) != last_used:
+                return False
+
+            if self.checkpoint_store is not None and (self.eviction is None or self.eviction.checkpoint):
+                await self._checkpoint_session(session_id)
+
+            released = self._release_session_agents(session_id)
+
+            self._session_last_used.pop(session_id, None)
+            self._restored_sessions.discard(session_id)
+            if self.checkpoint_store is not None:
+                self.checkpoint_store.forget(session_id)
+
+        self.metrics.incr("evicted_sessions")
+        self.metrics.incr("evicted_agents", released)
+        self.metrics.set("live_sessions", len(self._session_last_used))
+        self.metrics.set("live_agents", self._live_agent_count)
+        return True
+
+    async def evict_sessions(self) -> int:
+        """Release the sessions selected by the eviction policy, returns how many were released."""
+        if self.eviction is None:
+            return 0
+
+        evicted = 0
+        for session_id in self.eviction.select(self._session_last_used, time.monotonic()):
+            if session_id not in self._turns and await self.evict_session(session_id):
+                evicted += 1
+        self.metrics.set("live_agents", self._live_agent_count)
+        return evicted
+
+    async def _sweep_idle_sessions(self) -> None:
+        while True:
+            await asyncio.sleep(self.eviction.sweep_interval)
+            try:
+                evicted = await self.evict_sessions()
+                if evicted:
+                    _logger.debug(f"Released {evicted} idle sessions")
+            except Exception:
+                _logger.exception("Failed to release the idle sessions")
+
     async def subscribe_topic(self):
         await self.master_group.subscribe_topic(self._runtime)
 
@@ -217,10 +569,10 @@ class GroupChatRunner(BaseTaskRunner):
                 TypeSubscription(topic_type=self._task_topic, agent_type=group.proxy.agent_type))
 
     async def _register(self):
-        await self.user_proxy.register(runtime=self._runtime)
-        await self.master_group.register(self._runtime)
+        await self.user_proxy.register(runtime=self._runtime, on_create=self._track_agent)
+        await self.master_group.register(self._runtime, on_create=self._track_agent)
         for participant in self.participant_groups:
-            await participant.register(self._runtime)
+            await participant.register(self._runtime, on_create=self._track_agent)
 
     async def register(self):
         async def collect_output_messages(
@@ -229,13 +581,26 @@ class GroupChatRunner(BaseTaskRunner):
                 message: AssistantResponse,
                 ctx: MessageContext,
         ) -> None:
-            if isinstance(message, AssistantResponse):
-                self._output_message = message
+            if not isinstance(message, AssistantResponse):
+                return
+
+            turn = self._turns.get(ctx.topic_id.source) if ctx.topic_id is not None else None
+            if turn is None:
+                _logger.debug(f"Drop the response of session {ctx.topic_id} that has no running turn")
+                return
+
+            if not message.partial:
+                turn.output_message = message
+            await turn.queue.put(message)
+
+            if not message.partial and self._serving:
+                turn.close()
 
         # register for component in task
         await self._register()
 
-        # register closure agent
+        # register closure agent, released with the agents of its session
+        self._agent_types.add("closure_output")
         await ClosureAgent.register(
             self._runtime,
             type="closure_output",
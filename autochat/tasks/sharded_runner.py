@@ -0,0 +1,447 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+from typing import Any, AsyncGenerator, Callable
+
+from autogen_core.base import CancellationToken
+
+from autochat.models.messages import BaseMessage
+from autochat.tasks import TaskResult
+from autochat.tools.action import close_http_sessions
+from autochat.tools.executors import shutdown_tool_executors
+from autochat.utils.metrics import Metrics, get_metrics
+
+_logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "HashRing",
+    "ShardedGroupChatRunner",
+]
+
+
+class HashRing:
+    """Consistent hashing of keys to nodes, each node has ``virtual_nodes`` points on the ring.
+
+    Adding or removing a node only moves the keys of that node."""
+
+    def __init__(self, nodes: list[int], virtual_nodes: int = 64):
+        self.virtual_nodes = virtual_nodes
+        points = sorted(
+            (self._hash(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def get(self, key: str) -> int:
+        index = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+# ================== Worker process ==================
+
+def _worker_main(index: int, runner_factory: Callable, turn_timeout: float | None, requests, responses) -> None:
+    asyncio.run(_serve(index, runner_factory, turn_timeout, requests, responses))
+
+
+async def _serve(index: int, runner_factory: Callable, turn_timeout: float | None, requests, responses) -> None:
+    try:
+        runner = runner_factory()
+        await runner.start(turn_timeout=turn_timeout)
+    except Exception as e:
+        # reported instead of "ready", the supervisor raises it from start()
+        _logger.exception(f"Shard {index} failed to start")
+        responses.put(("error", None, f"{type(e).__name__}: {e}"))
+        return
+
+    loop = asyncio.get_running_loop()
+    inbox: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+
+    def read_requests() -> None:
+        while True:
+            request = requests.get()
+            loop.call_soon_threadsafe(inbox.put_nowait, request)
+            if request is None:
+                return
+
+    threading.Thread(target=read_requests, name=f"shard-{index}-requests", daemon=True).start()
+    responses.put(("ready", None, os.getpid()))
+
+    tokens: dict[int, CancellationToken] = {}
+    running: set[asyncio.Task] = set()
+
+    async def handle(request: dict[str, Any]) -> None:
+        request_id = request["id"]
+        try:
+            if request["op"] == "reset":
+                await runner.reset(session_id=request["session_id"])
+                responses.put(("result", request_id, None))
+                return
+
+            async for message in runner.run_stream(
+                task=request["task"],
+                session_id=request["session_id"],
+                timeout=request["timeout"],
+                cancellation_token=tokens[request_id],
+            ):
+                responses.put(("result" if isinstance(message, TaskResult) else "message", request_id, message))
+        except Exception as e:
+            _logger.exception(f"Shard {index} failed to handle a request of session {request['session_id']}")
+            responses.put(("error", request_id, f"{type(e).__name__}: {e}"))
+        finally:
+            tokens.pop(request_id, None)
+
+    while True:
+        request = await inbox.get()
+        if request is None:
+            break
+
+        if request["op"] == "cancel":
+            token = tokens.get(request["id"])
+            if token is not None:
+                token.cancel()
+            continue
+
+        tokens[request["id"]] = CancellationToken()
+        task = asyncio.create_task(handle(request))
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    # drain the running turns before stopping
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+    await runner.stop()
+    await runner.close()
+    # the worker process stops serving, release the resources shared by its runners
+    await close_http_sessions()
+    shutdown_tool_executors()
+    responses.put(("stopped", None, None))
+
+
+# ================== Supervisor ==================
+
+class _Worker:
+    """A worker process with its queues, replaced by a new one when it dies."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: multiprocessing.Process | None = None
+        self.requests = None
+        self.responses = None
+        self.ready = asyncio.Event()
+        # the error of the runner if it failed to start, set with ready
+        self.start_error: str | None = None
+        # request id -> the queue of its responses
+        self.pending: dict[int, asyncio.Queue] = {}
+        self.restarts = 0
+        self.metrics: Metrics = get_metrics(f"sharded_runner.worker{index}")
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def update_gauges(self) -> None:
+        self.metrics.set("queue_depth", len(self.pending))
+        self.metrics.set("alive", self.alive)
+        self.metrics.set("pid", self.process.pid if self.process is not None else None)
+
+
+class ShardedGroupChatRunner:
+    """Serve sessions on ``num_workers`` processes, each with its own runtime and group chat.
+
+    ``runner_factory`` builds the :class:`GroupChatRunner` of a worker, it is called in the
+    worker process so it must be picklable (a module level function). A session is routed by
+    consistent hashing of its id, so its agents and their state stay in one process. A worker
+    that dies is restarted, its running turns end with the ``worker_crashed`` stop reason and
+    the state of its sessions is lost.
+
+    The number of turns in flight on each worker is reported by :meth:`stats` and in
+    ``get_metrics(f"sharded_runner.worker{index}")``.
+
+    :param runner_factory: builds the runner of a worker
+    :param num_workers: the number of worker processes, the number of CPUs by default
+    :param turn_timeout: the default time budget of a turn, see :meth:`GroupChatRunner.start`
+    :param virtual_nodes: the points of each worker on the hash ring
+    :param mp_context: the multiprocessing start method
+    :param health_interval: seconds between the checks of the worker processes
+    :param restart_delay: seconds to wait before restarting a dead worker
+    """
+
+    def __init__(
+            self,
+            runner_factory: Callable[[], Any],
+            num_workers: int | None = None,
+            turn_timeout: float | None = None,
+            virtual_nodes: int = 64,
+            mp_context: str = "spawn",
+            health_interval: float = 0.5,
+            restart_delay: float = 1.0,
+    ):
+        self.runner_factory = runner_factory
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.turn_timeout = turn_timeout
+        self.health_interval = health_interval
+        self.restart_delay = restart_delay
+
+        self._context = multiprocessing.get_context(mp_context)
+        self._ring = HashRing(list(range(self.num_workers)), virtual_nodes=virtual_nodes)
+        self._workers = [_Worker(index) for index in range(self.num_workers)]
+        self._request_ids = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._monitor: asyncio.Task | None = None
+        self._serving = False
+
+    def worker_for(self, session_id: str) -> int:
+        return self._ring.get(session_id)
+
+    # ---------- process management ----------
+
+    def _spawn(self, worker: _Worker) -> None:
+        worker.requests = self._context.Queue()
+        worker.responses = self._context.Queue()
+        worker.ready = asyncio.Event()
+        worker.start_error = None
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker.index, self.runner_factory, self.turn_timeout, worker.requests, worker.responses),
+            name=f"autochat-shard-{worker.index}",
+            daemon=True,
+        )
+        # e.g. the runner factory can't be pickled, the worker is left without a process
+        process.start()
+        worker.process = process
+
+        responses = worker.responses
+        loop = self._loop
+
+        def read_responses() -> None:
+            while True:
+                try:
+                    item = responses.get()
+                except (EOFError, OSError):
+                    return
+                if item is None:
+                    return
+                loop.call_soon_threadsafe(self._dispatch, worker, item)
+
+        threading.Thread(target=read_responses, name=f"shard-{worker.index}-responses", daemon=True).start()
+        worker.update_gauges()
+
+    def _dispatch(self, worker: _Worker, item: tuple[str, int | None, Any]) -> None:
+        kind, request_id, payload = item
+        if kind == "ready":
+            worker.ready.set()
+            return
+        if kind == "stopped":
+            return
+        if kind == "error" and request_id is None:
+            _logger.error(f"Shard worker {worker.index} failed to start: {payload}")
+            worker.start_error = payload
+            worker.ready.set()
+            return
+
+        queue = worker.pending.get(request_id)
+        if queue is not None:
+            queue.put_nowait((kind, payload))
+            if kind != "message":
+                del worker.pending[request_id]
+                worker.update_gauges()
+
+    def _fail_pending(self, worker: _Worker) -> None:
+        for queue in worker.pending.values():
+            queue.put_nowait(("result", TaskResult(messages=[], stop_reason="worker_crashed")))
+        worker.pending.clear()
+        worker.update_gauges()
+
+    async def _watch(self) -> None:
+        while self._serving:
+            await asyncio.sleep(self.health_interval)
+            for worker in self._workers:
+                if not self._serving or worker.alive:
+                    continue
+
+                _logger.warning(f"Shard worker {worker.index} died (exit code {worker.process.exitcode}), restarting it")
+                worker.metrics.incr("crashes")
+                # stop the reader of the dead worker's queue
+                worker.responses.put(None)
+                self._fail_pending(worker)
+
+                await asyncio.sleep(self.restart_delay)
+                if self._serving:
+                    worker.restarts += 1
+                    worker.metrics.incr("restarts")
+                    self._spawn(worker)
+
+    async def start(self, ready_timeout: float | None = 60) -> None:
+        """Start the workers and wait until they are ready to serve.
+
+        A :class:`RuntimeError` is raised if a worker can't be spawned, dies or fails to build
+        or start its runner, or isn't ready within ``ready_timeout`` seconds. The workers
+        already started are then stopped."""
+        if self._serving:
+            raise RuntimeError("The sharded runner is already running.")
+
+        self._loop = asyncio.get_running_loop()
+        self._serving = True
+        try:
+            for worker in self._workers:
+                self._spawn(worker)
+            await asyncio.wait_for(self._wait_ready(), ready_timeout)
+        except Exception as e:
+            await self.stop()
+            if isinstance(e, asyncio.TimeoutError):
+                reason = f"the workers weren't ready within {ready_timeout}s"
+            else:
+                reason = str(e) or repr(e)
+            raise RuntimeError(f"The sharded runner failed to start, {reason}") from e
+
+        self._monitor = asyncio.create_task(self._watch())
+
+    async def _wait_ready(self) -> None:
+        """Wait until every worker is ready, raise if one died or failed to start its runner."""
+        pending = list(self._workers)
+        while pending:
+            waiters = [asyncio.ensure_future(worker.ready.wait()) for worker in pending]
+            await asyncio.wait(waiters, timeout=self.health_interval)
+            for waiter in waiters:
+                waiter.cancel()
+
+            pending = [worker for worker in pending if not worker.ready.is_set()]
+            dead = [worker for worker in pending if not worker.alive]
+            if dead:
+                raise RuntimeError("; ".join(
+                    f"shard {worker.index} exited with code {worker.process.exitcode} before it was ready"
+                    for worker in dead
+                ))
+
+        errors = [f"shard {worker.index}: {worker.start_error}" for worker in self._workers if worker.start_error]
+        if errors:
+            raise RuntimeError("; ".join(errors))
+
+    async def stop(self, timeout: float | None = 30) -> None:
+        """Stop the workers once their running turns are done."""
+        if not self._serving:
+            raise RuntimeError("The sharded runner is not running.")
+
+        self._serving = False
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+
+        for worker in self._workers:
+            if worker.alive:
+                worker.requests.put(None)
+
+        for worker in self._workers:
+            if worker.process is None:
+                # never spawned, e.g. start() failed before
+                continue
+            await asyncio.to_thread(worker.process.join, timeout)
+            if worker.process.is_alive():
+                _logger.warning(f"Shard worker {worker.index} didn't stop in time, terminating it")
+                worker.process.terminate()
+                await asyncio.to_thread(worker.process.join)
+            worker.responses.put(None)
+            self._fail_pending(worker)
+
+    async def __aenter__(self) -> "ShardedGroupChatRunner":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    # ---------- sessions ----------
+
+    def _submit(self, session_id: str, request: dict[str, Any]) -> tuple[_Worker, int, asyncio.Queue]:
+        if not self._serving:
+            raise RuntimeError("The sharded runner is not running, call start() first.")
+
+        worker = self._workers[self.worker_for(session_id)]
+        request_id = next(self._request_ids)
+        queue: asyncio.Queue = asyncio.Queue()
+        worker.pending[request_id] = queue
+        worker.metrics.incr("requests")
+        worker.update_gauges()
+        worker.requests.put({"id": request_id, "session_id": session_id, **request})
+        return worker, request_id, queue
+
+    async def run_stream(
+        self,
+        *,
+        task: str | BaseMessage | None = None,
+        session_id: str,
+        cancellation_token: CancellationToken | None = None,
+        timeout: float | None = None,
+    ) -> AsyncGenerator[BaseMessage | TaskResult, None]:
+        """Run a turn of a session on its worker, see :meth:`GroupChatRunner.run_stream`."""
+        worker, request_id, queue = self._submit(session_id, {"op": "run", "task": task, "timeout": timeout})
+
+        def cancel() -> None:
+            if worker.alive and request_id in worker.pending:
+                worker.requests.put({"op": "cancel", "id": request_id})
+
+        if cancellation_token is not None:
+            cancellation_token.add_callback(cancel)
+
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "error":
+                    raise RuntimeError(f"The turn of session {session_id} failed on shard {worker.index}: {payload}")
+                yield payload
+                if kind == "result":
+                    return
+        finally:
+            # the caller stopped listening, end the turn on the worker
+            cancel()
+
+    async def run(
+        self,
+        *,
+        task: str | BaseMessage | None = None,
+        session_id: str,
+        cancellation_token: CancellationToken | None = None,
+        timeout: float | None = None,
+    ) -> TaskResult:
+        result: TaskResult | None = None
+        async for message in self.run_stream(
+            task=task,
+            session_id=session_id,
+            cancellation_token=cancellation_token,
+            timeout=timeout,
+        ):
+            if isinstance(message, TaskResult):
+                result = message
+        return result
+
+    async def reset(self, session_id: str) -> None:
+        """Reset the agents of a session on its worker."""
+        _, _, queue = self._submit(session_id, {"op": "reset"})
+        kind, payload = await queue.get()
+        if kind == "error":
+            raise RuntimeError(f"Failed to reset session {session_id}: {payload}")
+
+    def stats(self) -> list[dict[str, Any]]:
+        """The state of each worker: pid, alive, queue depth (turns in flight) and restarts."""
+        return [
+            {
+                "worker": worker.index,
+                "pid": worker.process.pid if worker.process is not None else None,
+                "alive": worker.alive,
+                "queue_depth": len(worker.pending),
+                "restarts": worker.restarts,
+            }
+            for worker in self._workers
+        ]
@@ -1,9 +1,27 @@
 from autogen_core.components.tools import FunctionTool, Tool
 from autochat.tools.action import Action
+from autochat.tools.bundle import ToolBundle
+from autochat.tools.projection import ToolProjection
+from autochat.tools.selector import ToolSelector
+from autochat.tools.executors import (
+    ToolExecutorType,
+    ExecutorFunctionTool,
+    configure_tool_executors,
+    get_tool_executors,
+    shutdown_tool_executors
+)
 
 
 __all__ = [
     "Tool",
     "FunctionTool",
-    "Action"
+    "Action",
+    "ToolBundle",
+    "ToolProjection",
+    "ToolSelector",
+    "ToolExecutorType",
+    "ExecutorFunctionTool",
+    "configure_tool_executors",
+    "get_tool_executors",
+    "shutdown_tool_executors"
 ]
\ No newline at end of file
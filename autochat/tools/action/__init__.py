@@ -5,6 +5,18 @@ from .action import (
     ActionAuthentication,
     Action
 )
+from .http_session import (
+    HttpSessionPool,
+    configure_http_sessions,
+    get_http_session_pool,
+    close_http_sessions
+)
+from .host_limits import (
+    HostLimiter,
+    configure_host_limits,
+    get_host_limiter
+)
+from .response_cache import ActionResponseCache
 
 
 __all__ = [
@@ -12,5 +24,13 @@ __all__ = [
     "ActionBodyType",
     "ActionParam",
     "ActionAuthentication",
-    "Action"
+    "Action",
+    "HttpSessionPool",
+    "configure_http_sessions",
+    "get_http_session_pool",
+    "close_http_sessions",
+    "HostLimiter",
+    "configure_host_limits",
+    "get_host_limiter",
+    "ActionResponseCache"
 ]
@@ -1,16 +1,31 @@
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Any, Type, cast, Optional
-from pydantic import BaseModel, Field, create_model
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Mapping, Type, cast, Optional
+from pydantic import BaseModel, Field, ValidationError, create_model
 
 from autogen_core.components.tools import BaseTool
 from autogen_core.base import CancellationToken
 from autogen_core.components.tools import ToolSchema, ParametersSchema
 
-from autochat.models.action import ActionMethod, ActionParam, ActionBodyType
+from autochat.models.action import ActionMethod, ActionParam, ActionBodyType, ActionStruct
 from autochat.models.authentication import ActionAuthentication
 from autochat.models.chat_completion_function import ChatCompletionFunction
+from autochat.utils.deadline import current_deadline, remaining_time
 from .openapi_call import call_action_api
-from .openapi_utils import build_action_struct, split_openapi_schema, replace_openapi_refs
+from .openapi_cache import OpenAPIParseCache, get_openapi_parse_cache
+from .response_cache import ActionResponseCache
+from .response_reader import DEFAULT_MAX_RESPONSE_BYTES
+from .openapi_utils import (
+    build_action_struct,
+    build_operation_struct,
+    iter_openapi_operations,
+    split_openapi_schema,
+    replace_openapi_refs,
+    resolve_openapi_operations,
+)
 
 _logger = logging.getLogger(__name__)
 
@@ -29,6 +44,13 @@ def normalize_type_string(type_s: str):
     return str
 
 def args_base_model_from_func_def(func_def: ChatCompletionFunction) -> Type[BaseModel]:
+    # the models are shared by the actions with the same definition, e.g. reloaded documents
+    return _args_base_model_from_json(func_def.model_dump_json())
+
+
+@lru_cache(maxsize=4096)
+def _args_base_model_from_json(func_def_json: str) -> Type[BaseModel]:
+    func_def = ChatCompletionFunction.model_validate_json(func_def_json)
     fields: dict[str, tuple[Type[Any], Any]] = {}
     for name, param in func_def.parameters.properties.items():
         # This is handled externally
@@ -59,6 +81,9 @@ class Action(BaseTool[BaseModel, BaseModel]):
             headers: dict[str, Any],
             authentication: ActionAuthentication,
             function_def: ChatCompletionFunction,
+            response_cache: ActionResponseCache | dict[str, Any] | None = None,
+            max_response_bytes: int | None = DEFAULT_MAX_RESPONSE_BYTES,
+            response_fields: list[str] | None = None,
             **kwargs
     ):
         self.url = url
@@ -71,17 +96,43 @@ class Action(BaseTool[BaseModel, BaseModel]):
         self.authentication = authentication
         self.function_def = function_def
 
-        args_model = args_base_model_from_func_def(function_def)
+        # opt-in cache of the GET responses, the options of ActionResponseCache as a dict
+        if isinstance(response_cache, dict):
+            response_cache = ActionResponseCache(**{"name": name, **response_cache})
+        if response_cache is not None and method != ActionMethod.GET:
+            _logger.debug(f"The response cache of {name} is ignored, only GET responses are cached")
+            response_cache = None
+        self.response_cache = response_cache
 
+        # the body is read up to max_response_bytes, only response_fields are kept if set
+        self.max_response_bytes = max_response_bytes
+        self.response_fields = response_fields
+
+        # the argument model is built on the first call, see args_type
         super().__init__(
             name=name,
             description=description,
-            args_type=args_model,
+            args_type=None,
             return_type=None
         )
 
+        self._schema = self._build_schema()
+
+    def args_type(self) -> Type[BaseModel]:
+        # most actions of a large document are never called, building their models
+        # is the main cost of loading it
+        if self._args_type is None:
+            self._args_type = args_base_model_from_func_def(self.function_def)
+        return self._args_type
+
+    async def run_json(self, args: Mapping[str, Any], cancellation_token: CancellationToken) -> Any:
+        return await self.run(self.args_type().model_validate(args), cancellation_token)
+
     @property
     def schema(self) -> ToolSchema:
+        return self._schema
+
+    def _build_schema(self) -> ToolSchema:
         properties = {}
         for name, property in self.function_def.parameters.properties.items():
             properties[name] = property.model_dump()
@@ -99,7 +150,8 @@ class Action(BaseTool[BaseModel, BaseModel]):
         return tool_schema
 
     async def run(self, args: BaseModel, cancellation_token: CancellationToken) -> Any:
-        output = await call_action_api(
+        # the call gets the remaining time of the turn and is aborted when the turn is cancelled
+        future = asyncio.ensure_future(call_action_api(
             url=self.url,
             method=self.method,
             path_param_schema=self.path_param_schema,
@@ -108,10 +160,18 @@ class Action(BaseTool[BaseModel, BaseModel]):
             body_param_schema=self.body_param_schema,
             parameters=args.model_dump(),
             headers=self.headers,
-            authentication=self.authentication
-        )
+            authentication=self.authentication,
+            timeout=remaining_time(current_deadline()),
+            cache=self.response_cache,
+            max_response_bytes=self.max_response_bytes,
+            response_fields=self.response_fields
+        ))
+        cancellation_token.link_future(future)
+        output = await future
+        # unwrap the envelopes of the result and of the API response, e.g. {"data": {"data": ...}}
         data = output.get("data", output)
-        data = data.get("data", data)
+        if isinstance(data, dict):
+            data = data.get("data", data)
 
         return data
 
@@ -124,39 +184,129 @@ class Action(BaseTool[BaseModel, BaseModel]):
             raise Exception("Failed to parse OpenAPI schema")
 
         if len(schemas) > 1:
-            _logger.warning("Have more than one path then parse first path schema")
+            _logger.warning("Have more than one path then parse first path schema, use Action.from_openapi to load all of them")
 
         schema = schemas[0]
 
-
         action_struct = build_action_struct(schema)
 
-        path_param_dict = None
-        if action_struct.path_param_schema:
-            path_param_dict = {k: v.model_dump() for k, v in action_struct.path_param_schema.items()}
-
-        query_param_dict = None
-        if action_struct.query_param_schema:
-            query_param_dict = {k: v.model_dump() for k, v in action_struct.query_param_schema.items()}
-
-        body_param_dict = None
-        if action_struct.body_param_schema:
-            body_param_dict = {k: v.model_dump() for k, v in action_struct.body_param_schema.items()}
-
-        create_dict = {
-            "openapi_schema": action_struct.openapi_schema,
-            "authentication": authentication,
-            "name": action_struct.name,
-            "description": action_struct.description,
-            "url": action_struct.url,
-            "method": action_struct.method,
-            "path_param_schema": path_param_dict,
-            "query_param_schema": query_param_dict,
-            "body_type": action_struct.body_type,
-            "body_param_schema": body_param_dict,
-            "function_def": action_struct.function_def,
-            "headers": {}
-        }
-
-        return cls(**create_dict)
+        return cls._from_kwargs(_action_kwargs(action_struct), authentication=authentication)
+
+    @classmethod
+    def from_openapi(
+            cls,
+            openapi_schema: dict[str, Any],
+            authentication: ActionAuthentication | None = None,
+            headers: dict[str, Any] | None = None,
+            cache: OpenAPIParseCache | None = None,
+            operations: Iterable[str] | None = None,
+            response_cache: dict[str, Any] | None = None,
+            max_response_bytes: int | None = DEFAULT_MAX_RESPONSE_BYTES,
+            response_fields: dict[str, list[str]] | None = None,
+    ) -> list["Action"]:
+        """Create an action for every operation of an OpenAPI schema.
+
+        ``operations`` selects the operations to load by operationId, function name or
+        "METHOD /path", only the references that they reach are resolved. ``response_cache``
+        gives every GET action its own :class:`ActionResponseCache` with these options.
+        ``max_response_bytes`` caps the body read by every action and ``response_fields`` maps
+        an action name to the fields to extract from its JSON responses.
+
+        The operations are parsed in one pass over the document. The parsed operations are cached
+        by the hash of the document (on disk if the cache has a directory, see
+        :class:`OpenAPIParseCache`), so loading the same document again skips parsing.
+        Operations that can't be turned into a tool (e.g. unsupported parameter types) are skipped
+        with a warning.
+        """
+        authentication = authentication or ActionAuthentication(type="none")
+        cache = cache or get_openapi_parse_cache()
+
+        operations = sorted(set(operations)) if operations is not None else None
+        key = _document_hash(openapi_schema)
+        if operations is not None:
+            key = _document_hash({"document": key, "operations": operations})
+
+        actions_kwargs = cache.get(key)
+        if actions_kwargs is None:
+            actions_kwargs = []
+            for action_struct in _iter_action_structs(openapi_schema, operations):
+                actions_kwargs.append(_action_kwargs(action_struct))
+
+            if not actions_kwargs:
+                raise Exception("Failed to parse OpenAPI schema")
+
+            cache.set(key, actions_kwargs)
+
+        return [
+            cls._from_kwargs(
+                kwargs,
+                authentication=authentication,
+                headers=headers,
+                response_cache=response_cache if kwargs["method"] == ActionMethod.GET.value else None,
+                max_response_bytes=max_response_bytes,
+                response_fields=(response_fields or {}).get(kwargs["name"]),
+            )
+            for kwargs in actions_kwargs
+        ]
+
+    @classmethod
+    def _from_kwargs(
+            cls,
+            kwargs: dict[str, Any],
+            authentication: ActionAuthentication,
+            headers: dict[str, Any] | None = None,
+            **options,
+    ) -> "Action":
+        return cls(
+            **{
+                **kwargs,
+                "method": ActionMethod(kwargs["method"]),
+                "body_type": ActionBodyType(kwargs["body_type"]),
+                "function_def": ChatCompletionFunction(**kwargs["function_def"]),
+                "headers": {**kwargs["headers"], **(headers or {})},
+            },
+            authentication=authentication,
+            **options,
+        )
+
+
+def _document_hash(openapi_schema: dict[str, Any]) -> str:
+    data = json.dumps(openapi_schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _iter_action_structs(openapi_schema: dict[str, Any], operations: Iterable[str] | None = None) -> Iterator[ActionStruct]:
+    openapi_schema = resolve_openapi_operations(openapi_schema, operations)
+    for path, method, operation in iter_openapi_operations(openapi_schema):
+        try:
+            yield build_operation_struct(openapi_schema, path, method)
+        except (ValidationError, ValueError, KeyError, IndexError) as e:
+            _logger.warning(f"Skip the operation {method.upper()} {path}: {e}")
+
+
+def _action_kwargs(action_struct: ActionStruct) -> dict[str, Any]:
+    """The JSON serializable arguments of :class:`Action` for a parsed operation."""
+    path_param_dict = None
+    if action_struct.path_param_schema:
+        path_param_dict = {k: v.model_dump() for k, v in action_struct.path_param_schema.items()}
+
+    query_param_dict = None
+    if action_struct.query_param_schema:
+        query_param_dict = {k: v.model_dump() for k, v in action_struct.query_param_schema.items()}
+
+    body_param_dict = None
+    if action_struct.body_param_schema:
+        body_param_dict = {k: v.model_dump() for k, v in action_struct.body_param_schema.items()}
 
+    return {
+        "name": action_struct.name,
+        "description": action_struct.description,
+        "url": action_struct.url,
+        "method": action_struct.method.value,
+        "path_param_schema": path_param_dict,
+        "query_param_schema": query_param_dict,
+        "body_type": action_struct.body_type.value,
+        "body_param_schema": body_param_dict,
+        "function_def": action_struct.function_def.model_dump(),
+        "headers": {}
+    }
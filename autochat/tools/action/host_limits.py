@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Iterable
+
+from autochat.utils.metrics import Metrics, get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "HostOverloadedError",
+    "CircuitBreaker",
+    "RetryPolicy",
+    "HostLimits",
+    "HostGuard",
+    "HostLimiter",
+    "configure_host_limits",
+    "get_host_limiter",
+]
+
+
+class HostOverloadedError(Exception):
+    """The queue of the calls waiting for a connection to a host is full."""
+
+
+class CircuitBreaker:
+    """Fail fast when a host keeps failing.
+
+    The breaker opens after ``failure_threshold`` consecutive failures and rejects the calls
+    for ``recovery_timeout`` seconds. Then it is half open: one probe call is let through,
+    its success closes the breaker, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a probe call through."""
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Record a failed call, ``True`` if it opened the breaker."""
+        with self._lock:
+            was_probing, self._probing = self._probing, False
+            self._failures += 1
+            if was_probing or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_aborted(self) -> None:
+        """The allowed call was not completed (e.g. cancelled), let another probe through."""
+        with self._lock:
+            self._probing = False
+
+
+class RetryPolicy:
+    """Retries with full jitter backoff, only for the idempotent methods.
+
+    :param max_retries: the number of retries after the first attempt, no retry by default
+    :param backoff_base: the backoff of the first retry in seconds, doubled on each retry
+    :param backoff_max: the upper bound of the backoff in seconds
+    :param retry_statuses: the response statuses to retry, timeouts and connection errors are
+        always retried
+    :param methods: the methods that can be retried
+    """
+
+    def __init__(
+            self,
+            max_retries: int = 0,
+            backoff_base: float = 0.2,
+            backoff_max: float = 5,
+            retry_statuses: Iterable[int] = (429, 502, 503, 504),
+            methods: Iterable[str] = ("GET", "PUT", "DELETE"),
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.methods = frozenset(method.upper() for method in methods)
+
+    def should_retry(self, method: str, attempt: int, status: int, error_type: str | None) -> bool:
+        if attempt >= self.max_retries or method.upper() not in self.methods:
+            return False
+        return status in self.retry_statuses or error_type in ("timeout", "connection_failed")
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+class HostLimits:
+    """The limits of the calls to one host.
+
+    :param max_in_flight: the maximum number of concurrent calls
+    :param max_queue: the maximum number of calls waiting for a slot, more are rejected
+    :param request_timeout: the timeout of one attempt in seconds, the timeout of the session
+        by default, always bounded by the remaining time of the turn
+    :param failure_threshold: the consecutive failures that open the circuit breaker
+    :param recovery_timeout: seconds before an open breaker lets a probe call through
+    :param retry: a :class:`RetryPolicy` or its options
+    """
+
+    def __init__(
+            self,
+            max_in_flight: int = 10,
+            max_queue: int = 100,
+            request_timeout: float | None = None,
+            failure_threshold: int = 5,
+            recovery_timeout: float = 30,
+            retry: RetryPolicy | dict[str, Any] | None = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        if isinstance(retry, dict):
+            retry = RetryPolicy(**retry)
+        self.retry = retry or RetryPolicy()
+
+
+class HostGuard:
+    """In-flight limit and circuit breaker of the calls to one host.
+
+    The state is reported in ``get_metrics(f"http_host.{host}")``: the ``in_flight``,
+    ``queued`` and ``breaker_state`` gauges and the ``requests``, ``failures``, ``retries``,
+    ``rejected``, ``short_circuited`` and ``breaker_opened`` counters.
+    """
+
+    def __init__(self, host: str, limits: HostLimits):
+        self.host = host
+        self.limits = limits
+        self.breaker = CircuitBreaker(limits.failure_threshold, limits.recovery_timeout)
+        self.metrics: Metrics = get_metrics(f"http_host.{host}")
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        self.metrics.set("in_flight", self._in_flight)
+        self.metrics.set("queued", len(self._waiters))
+        self.metrics.set("breaker_state", self.breaker.state)
+
+    async def acquire(self, timeout: float | None = None) -> None:
+        """Wait for a slot, raise :class:`HostOverloadedError` if the queue is full and
+        ``asyncio.TimeoutError`` if no slot is free within ``timeout`` seconds."""
+        with self._lock:
+            if self._in_flight < self.limits.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self._update_gauges()
+                return
+
+            if len(self._waiters) >= self.limits.max_queue:
+                self.metrics.incr("rejected")
+                raise HostOverloadedError(f"{len(self._waiters)} calls to {self.host} are waiting")
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._update_gauges()
+
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException:
+            with self._lock:
+                handed_over = waiter.done() and not waiter.cancelled()
+                if not handed_over and waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self._update_gauges()
+            if handed_over:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            # the slot is handed over to the next waiter, the waiters may be on other loops
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+                    break
+            else:
+                self._in_flight -= 1
+            self._update_gauges()
+
+    def _wake(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # gave up in the meantime, pass the slot on
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    def record(self, failed: bool) -> None:
+        self.metrics.incr("requests")
+        if not failed:
+            self.breaker.record_success()
+        else:
+            self.metrics.incr("failures")
+            if self.breaker.record_failure():
+                self.metrics.incr("breaker_opened")
+                logger.warning(f"The circuit breaker of {self.host} is open for {self.limits.recovery_timeout}s")
+        self._update_gauges()
+
+
+class HostLimiter:
+    """The guards of all hosts, created on first use.
+
+    :param hosts: the options of :class:`HostLimits` by host (``netloc`` of the URL)
+    :param kwargs: the options of :class:`HostLimits` of the other hosts
+    """
+
+    def __init__(self, hosts: dict[str, dict[str, Any]] | None = None, **kwargs):
+        self.hosts = hosts or {}
+        self.defaults = kwargs
+
+        self._lock = threading.Lock()
+        self._guards: dict[str, HostGuard] = {}
+
+    def guard(self, host: str) -> HostGuard:
+        guard = self._guards.get(host)
+        if guard is None:
+            with self._lock:
+                guard = self._guards.get(host)
+                if guard is None:
+                    guard = HostGuard(host, HostLimits(**{**self.defaults, **self.hosts.get(host, {})}))
+                    self._guards[host] = guard
+        return guard
+
+
+_limiter = HostLimiter()
+
+
+def configure_host_limits(**kwargs) -> HostLimiter:
+    """Configure the process-wide limits, see :class:`HostLimiter` for the arguments.
+    Calls already waiting keep the guards of the previous limiter."""
+    global _limiter
+    _limiter = HostLimiter(**kwargs)
+    return _limiter
+
+
+def get_host_limiter() -> HostLimiter:
+    return _limiter
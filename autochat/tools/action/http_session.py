@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+import weakref
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "HttpSessionPool",
+    "configure_http_sessions",
+    "get_http_session_pool",
+    "close_http_sessions",
+]
+
+
+class HttpSessionPool:
+    """Keep-alive ``aiohttp.ClientSession`` shared by all action calls, one per event loop.
+
+    :param limit: the maximum number of open connections
+    :param limit_per_host: the maximum number of open connections to one host
+    :param ttl_dns_cache: seconds to cache DNS lookups
+    :param keepalive_timeout: seconds to keep an idle connection open
+    :param total_timeout: the total timeout of a request in seconds
+    :param connect_timeout: the timeout to acquire a connection and connect in seconds
+    :param proxy: the HTTP proxy URL, ``HTTP_PROXY_URL`` from the environment by default
+    """
+
+    def __init__(
+            self,
+            limit: int = 100,
+            limit_per_host: int = 10,
+            ttl_dns_cache: int = 300,
+            keepalive_timeout: float = 30,
+            total_timeout: float | None = 60,
+            connect_timeout: float | None = 10,
+            proxy: str | None = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout)
+        self.proxy = proxy or os.environ.get("HTTP_PROXY_URL") or None
+
+        self._sessions: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession] = weakref.WeakKeyDictionary()
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.ttl_dns_cache,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Return the session of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = self._create_session()
+            self._sessions[loop] = session
+        return session
+
+    async def close(self) -> None:
+        """Close the session of the running event loop."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+
+_pool = HttpSessionPool()
+
+
+def configure_http_sessions(**kwargs) -> HttpSessionPool:
+    """Configure the process-wide pool, see :class:`HttpSessionPool` for the arguments.
+    Call it before the first action call, sessions of the previous pool are not closed."""
+    global _pool
+    _pool = HttpSessionPool(**kwargs)
+    return _pool
+
+
+def get_http_session_pool() -> HttpSessionPool:
+    return _pool
+
+
+async def close_http_sessions() -> None:
+    await _pool.close()
@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "OpenAPIParseCache",
+    "get_openapi_parse_cache",
+]
+
+
+# bump when the parsed format changes, the entries of other versions are ignored
+PARSE_CACHE_VERSION = 1
+
+
+class OpenAPIParseCache:
+    """Cache of parsed OpenAPI documents keyed by the hash of their content.
+
+    Entries are kept in memory and, if ``cache_dir`` is set, as JSON files so a restarted
+    process skips parsing. The disk cache is best effort: read and write errors are logged
+    and the document is parsed again.
+
+    :param cache_dir: the directory of the JSON files, ``AUTOCHAT_OPENAPI_CACHE_DIR`` from
+        the environment by default, no disk cache if neither is set
+    """
+
+    def __init__(self, cache_dir: str | None = None):
+        self.cache_dir = cache_dir or os.environ.get("AUTOCHAT_OPENAPI_CACHE_DIR") or None
+        self._entries: dict[str, Any] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"openapi-v{PARSE_CACHE_VERSION}-{key}.json")
+
+    def get(self, key: str) -> Any | None:
+        if key in self._entries:
+            return self._entries[key]
+
+        if self.cache_dir is None:
+            return None
+
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read the parsed OpenAPI cache {self._path(key)}: {e}")
+            return None
+
+        self._entries[key] = value
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+
+        if self.cache_dir is None:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write then rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Failed to write the parsed OpenAPI cache {self._path(key)}: {e}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_cache = OpenAPIParseCache()
+
+
+def get_openapi_parse_cache() -> OpenAPIParseCache:
+    return _cache
@@ -1,5 +1,4 @@
-import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from autochat.models.action import (
     ActionMethod,
     ActionBodyType,
@@ -13,9 +12,16 @@ from autochat.models.authentication import (
 
 import aiohttp
 from aiohttp.client_exceptions import ClientConnectorError
+import asyncio
 import logging
+import time
 import urllib.parse
 
+from .host_limits import HostOverloadedError, get_host_limiter
+from .http_session import get_http_session_pool
+from .response_reader import DEFAULT_MAX_RESPONSE_BYTES, read_response
+from .response_cache import ActionResponseCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -91,6 +97,10 @@ async def call_action_api(
     parameters: Dict,
     headers: Dict,
     authentication: ActionAuthentication,
+    timeout: Optional[float] = None,
+    cache: Optional[ActionResponseCache] = None,
+    max_response_bytes: Optional[int] = DEFAULT_MAX_RESPONSE_BYTES,
+    response_fields: Optional[List[str]] = None,
 ) -> Dict:
     """
     Call an API according to OpenAPI schema.
@@ -103,6 +113,10 @@ async def call_action_api(
     :param parameters: the parameters input by the user
     :param headers: the extra headers to be included in the API call
     :param authentication: the authentication of the action
+    :param timeout: the total timeout of the call in seconds, the timeout of the session by default
+    :param cache: the response cache of the action, only used for GET calls
+    :param max_response_bytes: the maximum size of the body to read (32 KiB by default), ``None`` for no limit
+    :param response_fields: the dotted paths of the fields to extract from a JSON body
     :return: Response from the API call
     """
 
@@ -126,36 +140,148 @@ async def call_action_api(
     # Prepare headers
     prepared_headers = _prepare_headers(authentication, headers)
 
+    # Serve from the response cache or revalidate the cached response
+    cache_key = None
+    cached = None
+    if cache is not None and method == ActionMethod.GET:
+        cache_key = cache.make_key(method.value, url, query_params, prepared_headers)
+        cached = cache.lookup(cache_key)
+        if cached is not None and cached.is_fresh(time.time()):
+            return cache.hit(cached)
+        if cached is not None:
+            prepared_headers["If-None-Match"] = cached.etag
+        else:
+            cache.miss()
+
     # Making the API call
-    try:
-        async with aiohttp.ClientSession() as session:
-            request_kwargs = {"params": query_params, "headers": prepared_headers}
-
-            if os.environ.get("HTTP_PROXY_URL"):
-                request_kwargs["proxy"] = os.environ.get("HTTP_PROXY_URL")
-
-            if body_type == ActionBodyType.JSON:
-                request_kwargs["json"] = body_params
-                prepared_headers["Content-Type"] = "application/json"
-            elif body_type == ActionBodyType.FORM:
-                request_kwargs["data"] = body_params
-                prepared_headers["Content-Type"] = "application/x-www-form-urlencoded"
-
-            async with session.request(method.value, url, **request_kwargs) as response:
-                response_content_type = response.headers.get("Content-Type", "").lower()
-                if "application/json" in response_content_type:
-                    data = await response.json()
+    pool = get_http_session_pool()
+    request_kwargs = {"params": query_params, "headers": prepared_headers}
+
+    if pool.proxy:
+        request_kwargs["proxy"] = pool.proxy
+
+    if body_type == ActionBodyType.JSON:
+        request_kwargs["json"] = body_params
+        prepared_headers["Content-Type"] = "application/json"
+    elif body_type == ActionBodyType.FORM:
+        request_kwargs["data"] = body_params
+        prepared_headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+    # Calls to a host are limited and fail fast while its circuit breaker is open,
+    # failed calls of idempotent methods are retried within the time left
+    host = urllib.parse.urlsplit(url).netloc
+    guard = get_host_limiter().guard(host)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    attempt = 0
+
+    while True:
+        remaining = deadline - loop.time() if deadline is not None else None
+        try:
+            await guard.acquire(remaining)
+        except HostOverloadedError:
+            return _error_result(503, "host_overloaded", f"Too many calls to {host} are waiting, try again later", retry_after=1.0)
+        except asyncio.TimeoutError:
+            return _error_result(504, "timeout", f"The API call to {url} timed out waiting for a connection")
+
+        # a rejected call never took the probe of a half open breaker, it must not release it
+        allowed = guard.breaker.allow()
+        completed = False
+        try:
+            if not allowed:
+                guard.metrics.incr("short_circuited")
+                if guard.breaker.state == guard.breaker.OPEN:
+                    retry_after = round(guard.breaker.retry_after, 1)
+                    message = f"The API of {host} is failing, calls are suspended for {retry_after}s"
                 else:
-                    data = {"result": await response.text()}
-                if response.status != 200:
-                    error_message = f"API call failed with status {response.status}"
-                    if data:
-                        error_message += f": {data}"
-                    return {"status": response.status, "data": {"error": error_message}}
-                return {"status": response.status, "data": data}
-
-    except ClientConnectorError as e:
-        return {"status": 500, "data": {"error": f"Failed to connect to {url}"}}
+                    # half open, the wait is the end of the probe call in flight
+                    retry_after = 1.0
+                    message = f"The API of {host} is failing, a probe call is checking whether it recovered"
+                return _error_result(503, "circuit_open", message, retry_after=retry_after)
+
+            attempt_timeout = guard.limits.request_timeout
+            remaining = deadline - loop.time() if deadline is not None else None
+            if remaining is not None:
+                attempt_timeout = min(remaining, attempt_timeout) if attempt_timeout is not None else remaining
+            if attempt_timeout is not None:
+                request_kwargs["timeout"] = aiohttp.ClientTimeout(total=max(attempt_timeout, 0))
+
+            result = await _send_request(
+                pool.get_session(), method, url, request_kwargs,
+                revalidate=cached is not None,
+                max_response_bytes=max_response_bytes,
+                response_fields=response_fields,
+            )
+            completed = True
+        finally:
+            guard.release()
+            if allowed and not completed:
+                guard.breaker.record_aborted()
+
+        status = result["status"]
+        guard.record(failed=status >= 500 or status == 429)
+
+        if status == 304:
+            return cache.revalidated(cached, result["headers"])
+
+        error_type = result["data"].get("error_type") if isinstance(result["data"], dict) else None
+        if guard.limits.retry.should_retry(method.value, attempt, status, error_type):
+            delay = guard.limits.retry.backoff(attempt)
+            if deadline is None or loop.time() + delay < deadline:
+                guard.metrics.incr("retries")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+        if cached is not None:
+            cache.miss()
+        if cache_key is not None and status == 200:
+            cache.store(cache_key, status, result["data"], result["headers"])
+        result.pop("headers", None)
+        return result
+
+
+def _error_result(status: int, error_type: str, message: str, retry_after: Optional[float] = None) -> Dict:
+    """An error the LLM can act on: the type of error and whether to try again."""
+    error = {"error": message, "error_type": error_type, "retryable": status in (429, 502, 503, 504)}
+    if retry_after is not None:
+        error["retry_after"] = retry_after
+    return {"status": status, "data": error}
+
+
+async def _send_request(
+    session: aiohttp.ClientSession,
+    method: ActionMethod,
+    url: str,
+    request_kwargs: Dict,
+    revalidate: bool = False,
+    max_response_bytes: Optional[int] = DEFAULT_MAX_RESPONSE_BYTES,
+    response_fields: Optional[List[str]] = None,
+) -> Dict:
+    try:
+        async with session.request(method.value, url, **request_kwargs) as response:
+            if revalidate and response.status == 304:
+                return {"status": 304, "data": None, "headers": response.headers}
+
+            # the body is streamed and never read past the cap
+            data = await read_response(
+                response,
+                max_bytes=max_response_bytes,
+                fields=response_fields if response.status == 200 else None,
+            )
+            if response.status != 200:
+                error_message = f"API call failed with status {response.status}"
+                if data:
+                    error_message += f": {data}"
+                return _error_result(response.status, "http_error", error_message)
+            return {"status": response.status, "data": data, "headers": response.headers}
+
+    except ClientConnectorError:
+        return _error_result(503, "connection_failed", f"Failed to connect to {url}")
+
+    except asyncio.TimeoutError:
+        return _error_result(504, "timeout", f"The API call to {url} timed out")
 
     except Exception as e:
-        return {"status": 500, "error": {"error": "Failed to make the API call"}}
+        logger.warning(f"The API call to {url} failed: {e!r}")
+        return _error_result(500, "request_failed", "Failed to make the API call")
@@ -0,0 +1,99 @@
+import logging
+import urllib.parse
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "OpenAPIRefResolver",
+]
+
+
+class OpenAPIRefResolver:
+    """Resolve the local ``$ref`` of an OpenAPI document on demand.
+
+    Each JSON pointer is resolved once, including the references inside its target, and the
+    resolved node is shared by every place that refers to it. Subtrees without references are
+    returned as is, nothing is copied. Only the nodes passed to :meth:`resolve` and what they
+    reach are visited, so resolving a few operations of a large document is cheap.
+
+    A reference to a pointer that is being resolved (a recursive schema) is left as the
+    ``$ref`` node, as are external and unresolvable references.
+    """
+
+    def __init__(self, document: dict[str, Any]):
+        self.document = document
+        self.cycles = 0
+
+        self._resolved: dict[str, Any] = {}
+        self._resolving: set[str] = set()
+
+    def resolve(self, node: Any) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                resolved = self.resolve_ref(ref)
+                return node if resolved is None else resolved
+
+            result = None
+            for key, value in node.items():
+                resolved = self.resolve(value)
+                if resolved is not value:
+                    if result is None:
+                        result = dict(node)
+                    result[key] = resolved
+            return node if result is None else result
+
+        if isinstance(node, list):
+            result = None
+            for index, value in enumerate(node):
+                resolved = self.resolve(value)
+                if resolved is not value:
+                    if result is None:
+                        result = list(node)
+                    result[index] = resolved
+            return node if result is None else result
+
+        return node
+
+    def resolve_ref(self, ref: str) -> Any | None:
+        """The resolved target of a reference, ``None`` if it is left unresolved."""
+        if ref in self._resolved:
+            return self._resolved[ref]
+
+        if not ref.startswith("#"):
+            return None
+
+        if ref in self._resolving:
+            self.cycles += 1
+            return None
+
+        try:
+            target = self._lookup(ref)
+        except (KeyError, IndexError, ValueError, TypeError):
+            logger.warning(f"Unresolvable $ref: {ref}")
+            return None
+
+        self._resolving.add(ref)
+        try:
+            resolved = self.resolve(target)
+        finally:
+            self._resolving.discard(ref)
+
+        self._resolved[ref] = resolved
+        return resolved
+
+    def _lookup(self, ref: str) -> Any:
+        node = self.document
+        pointer = urllib.parse.unquote(ref[1:])
+        if not pointer:
+            return node
+
+        for part in pointer.lstrip("/").split("/"):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if isinstance(node, list):
+                node = node[int(part)]
+            else:
+                node = node[part]
+        return node
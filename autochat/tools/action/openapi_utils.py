@@ -1,6 +1,6 @@
 import json
 import re
-from typing import Dict, Tuple, Optional
+from typing import Dict, Iterable, Iterator, Tuple, Optional
 import copy
 import logging
 from autochat.models.action import (
@@ -11,47 +11,78 @@ from autochat.models.action import (
 )
 
 from autochat.models.chat_completion_function import ChatCompletionFunction
+from .openapi_refs import OpenAPIRefResolver
 
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
     "replace_openapi_refs",
+    "resolve_openapi_operations",
     "split_openapi_schema",
+    "iter_openapi_operations",
     "build_action_struct",
+    "build_action_structs",
+    "build_operation_struct",
 ]
 
 
-def _resolve_ref(document, ref):
-    parts = ref.split("/")
-    result = document
-    for part in parts[1:]:
-        result = result[part]
-    return result
+_HTTP_METHODS = ("get", "post", "put", "delete", "patch")
 
 
-def _replace_refs(schema, document):
-    if isinstance(schema, dict):
-        if "$ref" in schema:
-            ref_path = schema["$ref"]
-            return _resolve_ref(document, ref_path)
-        else:
-            return {k: _replace_refs(v, document) for k, v in schema.items()}
-    elif isinstance(schema, list):
-        return [_replace_refs(item, document) for item in schema]
-    else:
-        return schema
+def replace_openapi_refs(openapi_dict) -> Dict:
+    """Resolve every reference of the document, see :class:`OpenAPIRefResolver`.
+    The resolved nodes are shared, the input document is not modified."""
+    resolver = OpenAPIRefResolver(openapi_dict)
+    processed_dict = {k: resolver.resolve(v) for k, v in openapi_dict.items() if k != "components"}
+
+    return processed_dict
 
 
-def replace_openapi_refs(openapi_dict) -> Dict:
-    processed_dict = _replace_refs(openapi_dict, openapi_dict)
+def resolve_openapi_operations(
+    openapi_dict: Dict,
+    operations: Optional[Iterable[str]] = None,
+) -> Dict:
+    """
+    Resolve the references of the selected operations only, the components that they don't
+    reach are never visited.
+    :param openapi_dict: a dict of OpenAPI schema
+    :param operations: the operations to keep, by operationId, function name or "METHOD /path",
+        all of them by default
+    :return: a dict of OpenAPI schema with the resolved operations and without components
+    """
+    selected = set(operations) if operations is not None else None
+    resolver = OpenAPIRefResolver(openapi_dict)
 
-    if "components" in processed_dict:
-        del processed_dict["components"]
+    paths: Dict = {}
+    for path, method, operation in iter_openapi_operations(openapi_dict):
+        if selected is not None and not _is_selected(path, method, operation, selected):
+            continue
+
+        path_item = paths.get(path)
+        if path_item is None:
+            path_item = paths[path] = {}
+            path_parameters = openapi_dict["paths"][path].get("parameters")
+            if path_parameters:
+                path_item["parameters"] = resolver.resolve(path_parameters)
+        path_item[method] = resolver.resolve(operation)
+
+    processed_dict = {
+        k: v for k, v in openapi_dict.items()
+        if k not in ("components", "paths")
+    }
+    processed_dict["paths"] = paths
 
     return processed_dict
 
 
+def _is_selected(path: str, method: str, operation: Dict, selected: set[str]) -> bool:
+    operation_id = operation.get("operationId")
+    if operation_id in selected or f"{method.upper()} {path}" in selected:
+        return True
+    return _function_name(method, path, operation_id) in selected
+
+
 def split_openapi_schema(openapi_schema: Dict):
     # Check if the original JSON has 'paths' and 'servers' fields
     if "paths" not in openapi_schema or "servers" not in openapi_schema:
@@ -78,6 +109,14 @@ def split_openapi_schema(openapi_schema: Dict):
     return split_jsons
 
 
+def iter_openapi_operations(openapi_schema: Dict) -> Iterator[Tuple[str, str, Dict]]:
+    """Yield (path, method, operation) of every operation of the document, without copying."""
+    for path, path_item in openapi_schema.get("paths", {}).items():
+        for method, operation in path_item.items():
+            if method.lower() in _HTTP_METHODS:
+                yield path, method, operation
+
+
 def _to_snake_case(name):
     # Convert CamelCase to snake_case
     temp = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", name)
@@ -165,15 +204,6 @@ def _extract_params(
     :raises ValueError: If the path or method is not found in the OpenAPI schema.
     """
 
-    # Extract base URL from OpenAPI schema and construct final endpoint URL
-    base_url = openapi_schema["servers"][0]["url"]
-    final_url = f"{base_url}{path}"
-
-    path_param_dict = {}
-    query_param_dict = {}
-    body_param_dict = {}
-    body_type = ActionBodyType.NONE
-
     # Verify if the provided path exists in the OpenAPI schema
     path_item = openapi_schema["paths"].get(path)
     if path_item is None:
@@ -184,9 +214,43 @@ def _extract_params(
     if operation is None:
         raise ValueError(f"No operation found for method: {method} at path: {path}")
 
+    return _extract_operation_params(openapi_schema["servers"][0]["url"], path, path_item, operation)
+
+
+def _extract_operation_params(
+    base_url: str,
+    path: str,
+    path_item: Dict,
+    operation: Dict,
+) -> Tuple[
+    str,
+    Optional[Dict[str, ActionParam]],
+    Optional[Dict[str, ActionParam]],
+    ActionBodyType,
+    Optional[Dict[str, ActionParam]],
+]:
+    """Extract the parameter schemas of one operation, see :func:`_extract_params`.
+    The parameters of the path item apply to the operation unless it redefines them."""
+
+    # construct final endpoint URL
+    final_url = f"{base_url}{path}"
+
+    path_param_dict = {}
+    query_param_dict = {}
+    body_param_dict = {}
+    body_type = ActionBodyType.NONE
+
+    parameters = operation.get("parameters", [])
+    if path_item.get("parameters"):
+        operation_params = {(param.get("name"), param.get("in")) for param in parameters}
+        parameters = [
+            param for param in path_item["parameters"]
+            if (param.get("name"), param.get("in")) not in operation_params
+        ] + list(parameters)
+
     # Extract schemas for path and query parameters
-    if "parameters" in operation:
-        for param in operation["parameters"]:
+    if parameters:
+        for param in parameters:
             param_name = param["name"]
             param_in = param["in"]
             param_required = param.get("required", False)
@@ -250,6 +314,52 @@ def build_action_struct(
     path, path_info = next(iter(openapi_dict["paths"].items()))
     method, method_info = next(iter(path_info.items()))
 
+    return _build_operation_struct(openapi_dict, path, method, method_info)
+
+
+def build_action_structs(openapi_schema: Dict) -> list[ActionStruct]:
+    """
+    Extract the actions of every operation of an OpenAPI schema in one pass.
+    The operations share the nodes of the schema, nothing is copied.
+    :param openapi_schema: a dict of OpenAPI schema with resolved references
+    :return: an ActionStruct per operation, in the order of the document
+    """
+    if "paths" not in openapi_schema or "servers" not in openapi_schema:
+        return []
+
+    return [
+        build_operation_struct(openapi_schema, path, method)
+        for path, method, _ in iter_openapi_operations(openapi_schema)
+    ]
+
+
+def build_operation_struct(openapi_schema: Dict, path: str, method: str) -> ActionStruct:
+    """
+    Extract the action of one operation of an OpenAPI schema, sharing the nodes of the schema.
+    :param openapi_schema: a dict of OpenAPI schema with resolved references
+    :param path: the path of the operation
+    :param method: the method of the operation as written in the schema, e.g. "get"
+    :return: an ActionStruct of the operation
+    """
+    path_item = openapi_schema["paths"][path]
+    operation = path_item[method]
+    operation_schema = {
+        "openapi": openapi_schema.get("openapi", "3.0.0"),
+        "info": openapi_schema.get("info", {}),
+        "servers": openapi_schema.get("servers", []),
+        "security": openapi_schema.get("security", []),
+        "paths": {path: {method: operation}},
+    }
+    return _build_operation_struct(operation_schema, path, method, operation, path_item)
+
+
+def _build_operation_struct(
+    openapi_dict: Dict,
+    path: str,
+    method: str,
+    method_info: Dict,
+    path_item: Optional[Dict] = None,
+) -> ActionStruct:
     # check operationId
     operation_id = method_info.get("operationId", None)
 
@@ -265,8 +375,8 @@ def build_action_struct(
         description = f"{method.upper()} {path}: {summary}"
 
     # build function parameters schema
-    url, path_param_schema, query_param_schema, body_type, body_param_schema = _extract_params(
-        openapi_dict, method, path
+    url, path_param_schema, query_param_schema, body_type, body_param_schema = _extract_operation_params(
+        openapi_dict["servers"][0]["url"], path, path_item or openapi_dict["paths"][path], method_info
     )
 
     # build function definition
@@ -0,0 +1,160 @@
+import copy
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+from autochat.utils.metrics import Metrics, get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "ActionResponseCache",
+    "CachedResponse",
+]
+
+
+_MAX_AGE_PATTERN = re.compile(r"(?:^|,)\s*(s-maxage|max-age)\s*=\s*\"?(\d+)\"?", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    status: int
+    data: Any
+    etag: str | None
+    expires_at: float | None
+
+    def is_fresh(self, now: float) -> bool:
+        return self.expires_at is None or self.expires_at > now
+
+
+class ActionResponseCache:
+    """In-process LRU cache of the successful GET responses of one action.
+
+    Entries are keyed on the method, the final URL after path substitution, the query
+    parameters and the request headers (the authentication identity is part of them, only its
+    hash is kept). The lifetime of an entry is ``max-age`` from the ``Cache-Control`` of the
+    response if ``respect_cache_control`` is set, ``ttl`` seconds otherwise (``None`` to never
+    expire). ``no-store`` responses are not cached. An expired entry with an ``ETag`` is
+    revalidated with ``If-None-Match``, a ``304 Not Modified`` renews it without a body.
+
+    Counters and the hit ratio are reported in ``get_metrics(f"action_cache.{name}")``.
+
+    :param ttl: the lifetime of an entry in seconds when the response doesn't set one
+    :param max_size: the maximum number of entries
+    :param respect_cache_control: use ``Cache-Control`` of the response over ``ttl``
+    :param max_ttl: the upper bound of the lifetime from ``Cache-Control``
+    :param name: the name of the metrics, the action name
+    """
+
+    def __init__(
+            self,
+            ttl: float | None = 60,
+            max_size: int = 256,
+            respect_cache_control: bool = True,
+            max_ttl: float | None = None,
+            name: str = "default",
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.respect_cache_control = respect_cache_control
+        self.max_ttl = max_ttl
+        self.name = name
+
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.metrics: Metrics = get_metrics(f"action_cache.{name}")
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return self.metrics.snapshot()
+
+    @staticmethod
+    def make_key(method: str, url: str, params: Mapping[str, Any], headers: Mapping[str, Any]) -> str:
+        data = json.dumps(
+            [method.upper(), url, sorted((str(k), str(v)) for k, v in params.items()),
+             sorted((str(k).lower(), str(v)) for k, v in headers.items())],
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def _record(self, key: str) -> None:
+        self.metrics.incr(key)
+        lookups = self.metrics.get("hits") + self.metrics.get("misses") + self.metrics.get("revalidated")
+        if lookups:
+            # a revalidated entry is served from the cache, only the body transfer is saved
+            self.metrics.set("hit_ratio", (self.metrics.get("hits") + self.metrics.get("revalidated")) / lookups)
+
+    def lookup(self, key: str) -> CachedResponse | None:
+        """The entry of a request, fresh or expired with an ``ETag``, ``None`` on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if entry.is_fresh(time.time()) or entry.etag is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        del self._entries[key]
+        self.metrics.incr("expirations")
+        self.metrics.set("size", len(self._entries))
+        return None
+
+    def hit(self, entry: CachedResponse) -> dict[str, Any]:
+        self._record("hits")
+        return {"status": entry.status, "data": copy.deepcopy(entry.data)}
+
+    def miss(self) -> None:
+        self._record("misses")
+
+    def revalidated(self, entry: CachedResponse, headers: Mapping[str, str]) -> dict[str, Any]:
+        """Renew an entry after a ``304 Not Modified`` and serve it."""
+        entry.expires_at = self._expires_at(headers)
+        entry.etag = headers.get("ETag") or entry.etag
+        self._record("revalidated")
+        return {"status": entry.status, "data": copy.deepcopy(entry.data)}
+
+    def store(self, key: str, status: int, data: Any, headers: Mapping[str, str]) -> None:
+        cache_control = headers.get("Cache-Control", "").lower() if self.respect_cache_control else ""
+        if "no-store" in cache_control:
+            self._entries.pop(key, None)
+            return
+
+        etag = headers.get("ETag")
+        expires_at = self._expires_at(headers)
+        if expires_at is not None and expires_at <= time.time() and etag is None:
+            # can be neither served nor revalidated
+            return
+
+        self._entries[key] = CachedResponse(status=status, data=copy.deepcopy(data), etag=etag, expires_at=expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.metrics.incr("evictions")
+        self.metrics.incr("stores")
+        self.metrics.set("size", len(self._entries))
+
+    def _expires_at(self, headers: Mapping[str, str]) -> float | None:
+        ttl = self.ttl
+        if self.respect_cache_control:
+            cache_control = headers.get("Cache-Control", "")
+            if "no-cache" in cache_control.lower():
+                # stored, but revalidated on every use
+                ttl = 0
+            else:
+                max_ages = dict((name.lower(), int(value)) for name, value in _MAX_AGE_PATTERN.findall(cache_control))
+                if max_ages:
+                    ttl = max_ages.get("s-maxage", max_ages.get("max-age"))
+                    if self.max_ttl is not None:
+                        ttl = min(ttl, self.max_ttl)
+
+        return time.time() + ttl if ttl is not None else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.metrics.set("size", 0)
@@ -0,0 +1,326 @@
+import codecs
+import json
+import logging
+import re
+from typing import Any, Iterable
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "DEFAULT_MAX_RESPONSE_BYTES",
+    "JSONFieldExtractor",
+    "read_response",
+]
+
+
+# the body of a response is never read past this size unless the action sets its own cap,
+# the result goes into the prompt and 32 KiB is about 8k tokens
+DEFAULT_MAX_RESPONSE_BYTES = 32 * 1024
+
+_CHUNK_SIZE = 64 * 1024
+
+_NON_SPACE = re.compile(r"\S")
+_STRING_SPECIAL = re.compile(r'["\\]')
+# a run of complete strings and text without brackets, skipped in one match
+_VALUE_RUN = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+_SCALAR_END = re.compile(r"[\s,}\]]")
+
+
+class _Value:
+    """A value being skipped or captured, possibly spread over several chunks."""
+
+    __slots__ = ("path", "depth", "in_string", "scalar", "started", "parts", "start")
+
+    def __init__(self, path: str | None, start: int):
+        self.path = path
+        self.depth = 0
+        self.in_string = False
+        self.scalar = False
+        self.started = False
+        self.parts: list[str] | None = [] if path is not None else None
+        self.start = start
+
+
+class JSONFieldExtractor:
+    """Extract some fields of a JSON object from its text fed chunk by chunk.
+
+    ``fields`` are dotted paths of object keys, e.g. ``["status", "data.items"]``. Only the
+    text of the selected values is kept, the others are scanned and dropped, and
+    :attr:`done` is set once all of them are found so the rest of the body needn't be read.
+    :attr:`result` has the found values nested as in the document.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = set(fields)
+        self._prefixes = {
+            ".".join(parts[:i])
+            for parts in (field.split(".") for field in self.fields)
+            for i in range(1, len(parts))
+        }
+
+        self.result: dict[str, Any] = {}
+        self.found: set[str] = set()
+        self.done = not self.fields
+        self.error: str | None = None
+
+        self._buffer = ""
+        # open objects, [path, expected token, current key]
+        self._stack: list[list[Any]] = []
+        self._started = False
+        self._value: _Value | None = None
+
+    @property
+    def missing(self) -> set[str]:
+        return self.fields - self.found
+
+    def feed(self, text: str) -> None:
+        if self.done:
+            return
+
+        buffer = self._buffer + text
+        pos = 0
+        while not self.done:
+            if self._value is not None:
+                pos, finished = self._scan_value(buffer, pos)
+                if not finished:
+                    break
+                self._end_value(buffer, pos)
+                continue
+
+            match = _NON_SPACE.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            pos = match.start()
+            char = buffer[pos]
+
+            if not self._stack:
+                if self._started or char != "{":
+                    self._fail("the response is not a JSON object" if not self._started else None)
+                    break
+                self._started = True
+                self._stack.append(["", "key_or_end", None])
+                pos += 1
+                continue
+
+            frame = self._stack[-1]
+            expected = frame[1]
+            if expected in ("key", "key_or_end"):
+                if char == "}" and expected == "key_or_end":
+                    pos += 1
+                    self._close_object()
+                    continue
+                if char != '"':
+                    self._fail(f"unexpected {char!r} at a key")
+                    break
+                end = _string_end(buffer, pos + 1)
+                if end < 0:
+                    # the rest of the key is in the next chunk
+                    break
+                frame[2] = json.loads(buffer[pos:end + 1])
+                frame[1] = "colon"
+                pos = end + 1
+            elif expected == "colon":
+                if char != ":":
+                    self._fail(f"unexpected {char!r} after a key")
+                    break
+                frame[1] = "value"
+                pos += 1
+            elif expected == "value":
+                path = f"{frame[0]}.{frame[2]}" if frame[0] else frame[2]
+                if path in self.fields:
+                    self._value = _Value(path, pos)
+                elif path in self._prefixes and char == "{":
+                    self._stack.append([path, "key_or_end", None])
+                    pos += 1
+                else:
+                    self._value = _Value(None, pos)
+            else:
+                if char == ",":
+                    frame[1] = "key"
+                    pos += 1
+                elif char == "}":
+                    pos += 1
+                    self._close_object()
+                else:
+                    self._fail(f"unexpected {char!r} after a value")
+                    break
+
+        if self._value is not None and self._value.parts is not None:
+            self._value.parts.append(buffer[self._value.start:pos])
+            self._value.start = 0
+        self._buffer = buffer[pos:]
+
+    def _fail(self, error: str | None) -> None:
+        self.error = error
+        self.done = True
+
+    def _close_object(self) -> None:
+        self._stack.pop()
+        if self._stack:
+            self._stack[-1][1] = "comma"
+        else:
+            self.done = True
+
+    def _scan_value(self, buffer: str, pos: int) -> tuple[int, bool]:
+        """Scan the current value from ``pos``, the position reached and whether it ended."""
+        value = self._value
+        if not value.started:
+            match = _NON_SPACE.search(buffer, pos)
+            if match is None:
+                return len(buffer), False
+            pos = match.start()
+            value.start = pos
+            value.started = True
+            char = buffer[pos]
+            if char in "{[":
+                value.depth = 1
+                pos += 1
+            elif char == '"':
+                value.in_string = True
+                pos += 1
+            else:
+                value.scalar = True
+
+        while True:
+            if value.in_string:
+                match = _STRING_SPECIAL.search(buffer, pos)
+                if match is None:
+                    return len(buffer), False
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        # the escaped character is in the next chunk
+                        return match.start(), False
+                    pos = match.end() + 1
+                    continue
+                value.in_string = False
+                pos = match.end()
+                if value.depth == 0:
+                    return pos, True
+                continue
+
+            if value.scalar:
+                match = _SCALAR_END.search(buffer, pos)
+                if match is None:
+                    return len(buffer), False
+                return match.start(), True
+
+            pos = _VALUE_RUN.match(buffer, pos).end()
+            if pos >= len(buffer):
+                return pos, False
+            char = buffer[pos]
+            pos += 1
+            if char == '"':
+                # a string cut by the end of the chunk
+                value.in_string = True
+            elif char in "{[":
+                value.depth += 1
+            else:
+                value.depth -= 1
+                if value.depth == 0:
+                    return pos, True
+
+    def _end_value(self, buffer: str, pos: int) -> None:
+        value = self._value
+        self._value = None
+        self._stack[-1][1] = "comma"
+
+        if value.parts is None:
+            return
+
+        value.parts.append(buffer[value.start:pos])
+        try:
+            parsed = json.loads("".join(value.parts))
+        except ValueError as e:
+            self._fail(f"invalid value of {value.path}: {e}")
+            return
+
+        node = self.result
+        *parents, key = value.path.split(".")
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = parsed
+        self.found.add(value.path)
+        if not self.missing:
+            self.done = True
+
+
+def _string_end(text: str, pos: int) -> int:
+    """The index of the quote closing the string at ``pos``, -1 if it's not in ``text``."""
+    while True:
+        match = _STRING_SPECIAL.search(text, pos)
+        if match is None:
+            return -1
+        if match.group() == '"':
+            return match.start()
+        pos = match.end() + 1
+        if pos > len(text):
+            return -1
+
+
+def _truncation_note(max_bytes: int) -> str:
+    return f"[truncated: the response is larger than {max_bytes} bytes]"
+
+
+async def read_response(
+    response: aiohttp.ClientResponse,
+    max_bytes: int | None = DEFAULT_MAX_RESPONSE_BYTES,
+    fields: Iterable[str] | None = None,
+) -> dict[str, Any]:
+    """Read the body of a response, at most ``max_bytes`` of it (32 KiB by default).
+
+    A JSON object body is parsed, any other JSON value is returned as ``result`` and an
+    empty body as ``{}``. If ``fields`` are given, they are extracted while reading and the
+    rest of the body is neither kept nor read once they are all found. A body larger than
+    ``max_bytes`` is cut: the text read so far is returned as ``result`` (the found fields with
+    ``fields``) with ``truncated`` set and a note for the model in ``truncation``. Any other
+    body is returned as ``{"result": text}``.
+    """
+    is_json = "application/json" in response.headers.get("Content-Type", "").lower()
+    decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+
+    extractor = JSONFieldExtractor(fields) if fields and is_json else None
+    parts: list[str] = []
+    size = 0
+    truncated = False
+
+    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+        if max_bytes is not None and size + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - size]
+            truncated = True
+
+        size += len(chunk)
+        text = decoder.decode(chunk, final=truncated)
+        if extractor is not None:
+            extractor.feed(text)
+            if extractor.done:
+                break
+        else:
+            parts.append(text)
+
+        if truncated:
+            break
+
+    if extractor is not None:
+        if extractor.error:
+            logger.warning(f"Failed to extract {sorted(extractor.fields)} from {response.url}: {extractor.error}")
+        data = dict(extractor.result)
+        if extractor.missing and (truncated or extractor.error):
+            data["truncated"] = True
+            data["truncation"] = (
+                f"{_truncation_note(max_bytes) if truncated else extractor.error}, "
+                f"missing fields: {', '.join(sorted(extractor.missing))}"
+            )
+        return data
+
+    text = "".join(parts) + decoder.decode(b"", final=True)
+    if truncated:
+        return {"result": text, "truncated": True, "truncation": _truncation_note(max_bytes)}
+
+    if is_json:
+        data = json.loads(text) if text.strip() else {}
+        return data if isinstance(data, dict) else {"result": data}
+    return {"result": text}
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Iterable, Mapping, Sequence
+
+from autogen_core.components.tools import Tool, ToolSchema
+
+
+__all__ = [
+    "ToolBundle",
+]
+
+
+class ToolBundle:
+    """An immutable set of tools and handoff tools with their schemas compiled once.
+
+    The schemas are passed to the model client as is, so they are never rebuilt per call.
+    Subsets (e.g. handoff tools filtered by the message path) are built from the compiled
+    schemas and memoized.
+    """
+
+    def __init__(
+            self,
+            tools: Iterable[Tool] = (),
+            handoff_tools: Iterable[Tool] = (),
+            *,
+            subset_cache_size: int = 256,
+            _schemas: Mapping[int, ToolSchema] | None = None,
+    ):
+        self.tools: tuple[Tool, ...] = tuple(tools)
+        self.handoff_tools: tuple[Tool, ...] = tuple(handoff_tools)
+
+        self.tools_map: Mapping[str, Tool] = MappingProxyType({tool.name: tool for tool in self.tools})
+        self.handoff_tools_map: Mapping[str, Tool] = MappingProxyType({tool.name: tool for tool in self.handoff_tools})
+
+        # schemas by tool identity, shared with the subsets of this bundle
+        _schemas = _schemas or {}
+        self._schemas: dict[int, ToolSchema] = {
+            id(tool): _schemas[id(tool)] if id(tool) in _schemas else tool.schema
+            for tool in self.tools + self.handoff_tools
+        }
+
+        self.tool_schemas: tuple[ToolSchema, ...] = tuple(self._schemas[id(tool)] for tool in self.tools)
+        self.handoff_tool_schemas: tuple[ToolSchema, ...] = tuple(self._schemas[id(tool)] for tool in self.handoff_tools)
+        self.schemas: tuple[ToolSchema, ...] = self.tool_schemas + self.handoff_tool_schemas
+
+        self._key = (tuple(id(tool) for tool in self.tools), tuple(id(tool) for tool in self.handoff_tools))
+        self._subset_cache_size = subset_cache_size
+        self._subsets: OrderedDict[tuple, "ToolBundle"] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.tools) + len(self.handoff_tools)
+
+    def subset(self, tools: Sequence[Tool], handoff_tools: Sequence[Tool]) -> "ToolBundle":
+        """Return the bundle of the given tools, reusing the compiled schemas."""
+        key = (tuple(id(tool) for tool in tools), tuple(id(tool) for tool in handoff_tools))
+        if key == self._key:
+            return self
+
+        bundle = self._subsets.get(key)
+        if bundle is not None:
+            self._subsets.move_to_end(key)
+            return bundle
+
+        bundle = ToolBundle(
+            tools,
+            handoff_tools,
+            subset_cache_size=self._subset_cache_size,
+            _schemas=self._schemas
+        )
+
+        # only memoize subsets of known tools, the ids of other tools may be reused
+        if all(id(tool) in self._schemas for tool in (*tools, *handoff_tools)):
+            self._subsets[key] = bundle
+            if len(self._subsets) > self._subset_cache_size:
+                self._subsets.popitem(last=False)
+
+        return bundle
+
+    def without_handoff_tools(self, names: Iterable[str]) -> "ToolBundle":
+        names = set(names)
+        return self.subset(self.tools, [tool for tool in self.handoff_tools if tool.name not in names])
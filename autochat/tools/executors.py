@@ -0,0 +1,170 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.tools import FunctionTool
+
+from autochat.utils.deadline import current_deadline, remaining_time
+from autochat.utils.metrics import Metrics, get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "ToolExecutorType",
+    "ToolExecutors",
+    "ExecutorFunctionTool",
+    "configure_tool_executors",
+    "get_tool_executors",
+    "shutdown_tool_executors",
+]
+
+
+class ToolExecutorType(str, Enum):
+    INLINE = "inline"
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+class ToolExecutors:
+    """The pools shared by the function tools, created on first use.
+
+    :param max_threads: the size of the thread pool, ``AUTOCHAT_TOOL_THREADS`` from the
+        environment or the default of ``ThreadPoolExecutor``
+    :param max_processes: the size of the process pool, ``AUTOCHAT_TOOL_PROCESSES`` from the
+        environment or the number of CPUs
+    :param mp_context: the multiprocessing start method of the process pool, ``spawn`` by
+        default since the runtime has threads
+    """
+
+    def __init__(
+            self,
+            max_threads: int | None = None,
+            max_processes: int | None = None,
+            mp_context: str = "spawn",
+    ):
+        self.max_threads = max_threads or int(os.environ.get("AUTOCHAT_TOOL_THREADS", 0)) or None
+        self.max_processes = max_processes or int(os.environ.get("AUTOCHAT_TOOL_PROCESSES", 0)) or None
+        self.mp_context = mp_context
+
+        self._lock = threading.Lock()
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+
+    def get(self, executor: ToolExecutorType) -> Executor:
+        with self._lock:
+            if executor == ToolExecutorType.PROCESS:
+                if self._processes is None:
+                    self._processes = ProcessPoolExecutor(
+                        max_workers=self.max_processes,
+                        mp_context=multiprocessing.get_context(self.mp_context),
+                    )
+                return self._processes
+
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="autochat-tool")
+            return self._threads
+
+    def shutdown(self, wait: bool = False, cancel_futures: bool = False) -> None:
+        """Shut the pools down, the queued calls still run unless ``cancel_futures`` is set."""
+        with self._lock:
+            threads, self._threads = self._threads, None
+            processes, self._processes = self._processes, None
+        for pool in (threads, processes):
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+_executors = ToolExecutors()
+
+
+def configure_tool_executors(**kwargs) -> ToolExecutors:
+    """Configure the process-wide pools, see :class:`ToolExecutors` for the arguments.
+    The pools of the previous configuration are shut down once their calls finish."""
+    global _executors
+    previous, _executors = _executors, ToolExecutors(**kwargs)
+    previous.shutdown(wait=False)
+    return _executors
+
+
+def get_tool_executors() -> ToolExecutors:
+    return _executors
+
+
+def shutdown_tool_executors(wait: bool = False, cancel_futures: bool = False) -> None:
+    """Shut the process-wide pools down, e.g. when the process stops serving. They are shared
+    by all the runners of the process, so no runner shuts them down on its own."""
+    _executors.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+class ExecutorFunctionTool(FunctionTool):
+    """A function tool that runs a synchronous function on the chosen executor.
+
+    ``inline`` calls the function on the event loop, for functions that return at once.
+    ``thread`` runs it on the shared thread pool, for blocking I/O and code that releases the
+    GIL. ``process`` runs it on the shared process pool, for CPU-bound code, the function and
+    its arguments must be picklable and it gets no cancellation token. Coroutine functions run
+    on the event loop whatever the executor.
+
+    A call that doesn't finish within ``timeout`` seconds (and the remaining time of the
+    turn) returns an error to the model. The call is abandoned but a running thread or
+    process can't be interrupted, it holds its worker until the function returns.
+    Timeouts are counted in ``get_metrics(f"tool_executor.{name}")``.
+    """
+
+    def __init__(
+            self,
+            func: Callable[..., Any],
+            description: str,
+            name: str | None = None,
+            executor: ToolExecutorType | str = ToolExecutorType.THREAD,
+            timeout: float | None = None,
+    ):
+        super().__init__(func, description=description, name=name)
+        self.executor = ToolExecutorType(executor)
+        self.timeout = timeout
+        self.metrics: Metrics = get_metrics(f"tool_executor.{self.name}")
+
+    def _call_timeout(self) -> float | None:
+        remaining = remaining_time(current_deadline())
+        if self.timeout is None:
+            return remaining
+        return min(self.timeout, remaining) if remaining is not None else self.timeout
+
+    async def run(self, args: BaseModel, cancellation_token: CancellationToken) -> Any:
+        kwargs = args.model_dump()
+        if self._has_cancellation_support:
+            kwargs["cancellation_token"] = cancellation_token if self.executor != ToolExecutorType.PROCESS else None
+
+        self.metrics.incr("calls")
+        if asyncio.iscoroutinefunction(self._func):
+            future = asyncio.ensure_future(self._func(**kwargs))
+        elif self.executor == ToolExecutorType.INLINE:
+            return self._func(**kwargs)
+        else:
+            pool = get_tool_executors().get(self.executor)
+            future = asyncio.get_running_loop().run_in_executor(pool, functools.partial(self._func, **kwargs))
+
+        cancellation_token.link_future(future)
+        timeout = self._call_timeout()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            if not future.cancelled():
+                raise
+            self.metrics.incr("timeouts")
+            logger.warning(f"The tool {self.name} timed out after {timeout:.1f}s")
+            return {
+                "error": f"The tool {self.name} did not finish within {timeout:.1f}s",
+                "error_type": "timeout",
+                "retryable": True,
+            }
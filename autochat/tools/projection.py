@@ -0,0 +1,154 @@
+from typing import Any, Iterable
+
+from pydantic import BaseModel
+
+
+__all__ = [
+    "ToolProjection",
+]
+
+
+# the whole value at the end of a path
+_WHOLE = True
+
+
+def _parse_path(path: str) -> list[str]:
+    """``$.data.items[*].name`` -> ``["data", "items", "name"]``, lists are traversed as is."""
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    path = path.replace("[*]", ".").replace("[]", ".")
+    return [part for part in path.split(".") if part]
+
+
+def _compile(paths: Iterable[str]) -> dict[str, Any]:
+    """A trie of the paths, a leaf is :data:`_WHOLE`."""
+    root: dict[str, Any] = {}
+    for path in paths:
+        parts = _parse_path(path)
+        if not parts:
+            continue
+        node = root
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is _WHOLE:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = _WHOLE
+    return root
+
+
+_MISSING = object()
+
+
+def _include(value: Any, node: dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        items = (_include(item, node) for item in value)
+        result = [item for item in items if item is not _MISSING]
+        return result if result or not value else _MISSING
+
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            child = node.get(key, node.get("*"))
+            if child is None:
+                continue
+            if child is not _WHOLE:
+                item = _include(item, child)
+                if item is _MISSING:
+                    continue
+            result[key] = item
+        # none of the paths is in this object
+        return result if result or not value else _MISSING
+
+    # a path goes through a scalar
+    return _MISSING
+
+
+def _exclude(value: Any, node: dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_exclude(item, node) for item in value]
+
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            child = node.get(key, node.get("*"))
+            if child is _WHOLE:
+                continue
+            result[key] = _exclude(item, child) if child is not None else item
+        return result
+
+    return value
+
+
+class ToolProjection:
+    """Cut a tool result down to what the model needs before it enters the prompt.
+
+    Paths are JSONPath-like dotted keys, e.g. ``$.data.items[*].name``. ``*`` matches any key
+    and lists are traversed, so ``items.name`` selects the name of every item. With ``include``
+    only the listed paths are kept, then the ``exclude`` paths are removed. Lists longer than
+    ``max_list_items`` and strings longer than ``max_string_length`` are cut with a marker
+    telling how much was left out.
+
+    :param include: the paths to keep, everything by default
+    :param exclude: the paths to remove
+    :param max_list_items: the maximum number of items of a list
+    :param max_string_length: the maximum number of characters of a string
+    """
+
+    def __init__(
+            self,
+            include: Iterable[str] | None = None,
+            exclude: Iterable[str] | None = None,
+            max_list_items: int | None = None,
+            max_string_length: int | None = None,
+    ):
+        self.include = list(include) if include is not None else None
+        self.exclude = list(exclude or [])
+        self.max_list_items = max_list_items
+        self.max_string_length = max_string_length
+
+        self._include = _compile(self.include) if self.include is not None else None
+        self._exclude = _compile(self.exclude)
+
+    @classmethod
+    def from_config(cls, config: "ToolProjection | dict[str, Any]") -> "ToolProjection":
+        if isinstance(config, ToolProjection):
+            return config
+        return cls(**config)
+
+    def apply(self, value: Any) -> Any:
+        """The projection of a tool result, a pydantic model is projected as its dump."""
+        if isinstance(value, BaseModel):
+            value = value.model_dump(mode="json")
+
+        if not isinstance(value, (dict, list)):
+            return self._cap(value)
+
+        if self._include is not None:
+            projected = _include(value, self._include)
+            value = projected if projected is not _MISSING else type(value)()
+        if self._exclude:
+            value = _exclude(value, self._exclude)
+        if self.max_list_items is not None or self.max_string_length is not None:
+            value = self._cap(value)
+        return value
+
+    def _cap(self, value: Any) -> Any:
+        if isinstance(value, str):
+            if self.max_string_length is not None and len(value) > self.max_string_length:
+                return f"{value[:self.max_string_length]}... [{len(value) - self.max_string_length} more characters]"
+            return value
+
+        if isinstance(value, dict):
+            return {key: self._cap(item) for key, item in value.items()}
+
+        if isinstance(value, list):
+            if self.max_list_items is not None and len(value) > self.max_list_items:
+                return [self._cap(item) for item in value[:self.max_list_items]] + [
+                    f"... [{len(value) - self.max_list_items} more items]"
+                ]
+            return [self._cap(item) for item in value]
+
+        return value
@@ -0,0 +1,186 @@
+import json
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Any, Iterable, Mapping, Sequence
+
+from autogen_core.components import FunctionCall
+from autogen_core.components.models import AssistantMessage, LLMMessage, UserMessage
+from autogen_core.components.tools import Tool
+
+from autochat.utils.metrics import Metrics, get_metrics
+from autochat.utils.string_utils import no_accent_vietnamese
+
+
+__all__ = [
+    "ToolSelector",
+]
+
+
+_CAMEL_CASE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_WORD = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> list[str]:
+    """Words of a text, ``getOrderStatus`` and ``get_order_status`` give the same words."""
+    text = _CAMEL_CASE.sub(" ", text).replace("_", " ")
+    return _WORD.findall(no_accent_vietnamese(text.lower()))
+
+
+def _tool_text(tool: Tool) -> str:
+    schema = tool.schema
+    parts = [schema["name"], schema.get("description", "")]
+    for name, parameter in schema.get("parameters", {}).get("properties", {}).items():
+        parts.append(name)
+        if isinstance(parameter, Mapping):
+            parts.append(str(parameter.get("description", "")))
+    return " ".join(parts)
+
+
+class _BM25Index:
+    """Okapi BM25 over the name, description and parameters of each tool."""
+
+    def __init__(self, tools: Sequence[Tool], k1: float, b: float):
+        self.tools = tuple(tools)
+        self.k1 = k1
+        self.b = b
+
+        documents = [Counter(_tokenize(_tool_text(tool))) for tool in self.tools]
+        self.lengths = [sum(document.values()) for document in documents]
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        document_frequency = Counter(term for document in documents for term in document)
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()
+        }
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        for index, document in enumerate(documents):
+            for term, count in document.items():
+                self.postings.setdefault(term, []).append((index, count))
+
+        # an estimate of the prompt tokens of each schema, 4 characters a token
+        self.schema_tokens = [len(json.dumps(tool.schema, ensure_ascii=False)) // 4 for tool in self.tools]
+
+    def scores(self, terms: Iterable[str]) -> list[float]:
+        scores = [0.0] * len(self.tools)
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, count in self.postings[term]:
+                length_norm = 1 - self.b + self.b * self.lengths[index] / (self.average_length or 1.0)
+                scores[index] += idf * count * (self.k1 + 1) / (count + self.k1 * length_norm)
+        return scores
+
+
+class ToolSelector:
+    """Pick the tools relevant to the conversation, so the model gets fewer tool schemas.
+
+    The tools are indexed once (BM25 over their names, descriptions and parameters) and the
+    query is the text of the last ``recent_messages`` messages. The ``top_k`` best tools are
+    offered together with the ``pinned`` tools and the tools called in the recent messages.
+    When no tool matches the query, or the agent has at most ``top_k`` tools, all the tools
+    are offered. :class:`AIAgent` selects the tools for each model call of a turn, so the calls
+    after tool results are made with the tools relevant to those results. The schemas left out
+    are counted in ``get_metrics(f"tool_selector.{name}")``, ``tokens_saved`` is estimated as
+    4 characters a token.
+
+    :param top_k: the number of tools chosen by relevance
+    :param pinned: the names of the tools always offered
+    :param recent_messages: the number of last messages the query is made of
+    :param min_score: the lowest BM25 score of a chosen tool
+    """
+
+    def __init__(
+            self,
+            top_k: int = 8,
+            pinned: Iterable[str] = (),
+            recent_messages: int = 3,
+            min_score: float = 0.0,
+            k1: float = 1.5,
+            b: float = 0.75,
+            name: str = "default",
+    ):
+        self.top_k = top_k
+        self.pinned = set(pinned)
+        self.recent_messages = recent_messages
+        self.min_score = min_score
+        self.k1 = k1
+        self.b = b
+        self.name = name
+
+        # indexes by tool set, the tools of an agent are shared by the agents of all the sessions
+        self._indexes: OrderedDict[tuple[int, ...], _BM25Index] = OrderedDict()
+        self.metrics: Metrics = get_metrics(f"tool_selector.{name}")
+
+    @classmethod
+    def from_config(cls, config: "ToolSelector | Mapping[str, Any]") -> "ToolSelector":
+        """``{"top_k": 8, "pinned": [<tool name>, ...], "recent_messages": 3}``"""
+        if isinstance(config, ToolSelector):
+            return config
+        return cls(**config)
+
+    def _index(self, tools: Sequence[Tool]) -> _BM25Index:
+        key = tuple(id(tool) for tool in tools)
+        index = self._indexes.get(key)
+        if index is None:
+            # the index holds the tools, so their ids are not reused while it is cached
+            index = self._indexes[key] = _BM25Index(tools, self.k1, self.b)
+            if len(self._indexes) > 16:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(key)
+        return index
+
+    def _query(self, messages: Sequence[LLMMessage]) -> tuple[list[str], set[str]]:
+        """The words of the recent messages and the names of the tools they called."""
+        terms: list[str] = []
+        called: set[str] = set()
+        for message in messages[-self.recent_messages:] if self.recent_messages > 0 else []:
+            if not isinstance(message, (UserMessage, AssistantMessage)):
+                continue
+            content = message.content if isinstance(message.content, list) else [message.content]
+            for part in content:
+                if isinstance(part, str):
+                    terms.extend(_tokenize(part))
+                elif isinstance(part, FunctionCall):
+                    called.add(part.name)
+        return terms, called
+
+    def select(
+            self,
+            tools: Sequence[Tool],
+            messages: Sequence[LLMMessage],
+            keep: Iterable[str] = (),
+    ) -> list[Tool]:
+        """The tools to offer for the messages, in their original order.
+
+        :param keep: the names of tools to offer too, e.g. the tools called earlier in the turn
+        """
+        if len(tools) <= self.top_k:
+            return list(tools)
+
+        index = self._index(tools)
+        terms, called = self._query(messages)
+        called.update(keep)
+        scores = index.scores(terms)
+
+        self.metrics.incr("selections")
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score > self.min_score),
+            key=lambda i: scores[i],
+            reverse=True,
+        )
+        if not ranked:
+            self.metrics.incr("fallbacks")
+            return list(tools)
+
+        chosen = set(ranked[:self.top_k])
+        chosen.update(i for i, tool in enumerate(index.tools) if tool.name in self.pinned or tool.name in called)
+
+        self.metrics.incr("tools_offered", len(chosen))
+        self.metrics.incr("tools_dropped", len(tools) - len(chosen))
+        self.metrics.incr("tokens_saved", sum(
+            tokens for i, tokens in enumerate(index.schema_tokens) if i not in chosen
+        ))
+        return [tool for i, tool in enumerate(index.tools) if i in chosen]
@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+__all__ = [
+    "deadline_after",
+    "remaining_time",
+    "current_deadline",
+    "deadline_scope",
+]
+
+
+# the deadline of the turn being handled, as a unix timestamp
+_current_deadline: ContextVar[float | None] = ContextVar("autochat_deadline", default=None)
+
+
+def deadline_after(timeout: float | None) -> float | None:
+    if timeout is None:
+        return None
+    return time.time() + timeout
+
+
+def remaining_time(deadline: float | None) -> float | None:
+    """Seconds left before the deadline (never negative), ``None`` if there is no deadline."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def current_deadline() -> float | None:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: float | None) -> Iterator[None]:
+    """Make the deadline visible to the tools and model calls run inside the scope."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,49 @@
+from collections import defaultdict
+from typing import Any
+
+
+__all__ = [
+    "Metrics",
+    "get_metrics",
+    "snapshot_metrics",
+]
+
+
+class Metrics:
+    """Named counters and gauges of one component, e.g. ``get_metrics("llm_cache.default")``."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counters: dict[str, float] = defaultdict(int)
+        self.gauges: dict[str, Any] = {}
+
+    def incr(self, key: str, value: float = 1) -> None:
+        self.counters[key] += value
+
+    def set(self, key: str, value: Any) -> None:
+        self.gauges[key] = value
+
+    def get(self, key: str, default: Any = 0) -> Any:
+        if key in self.gauges:
+            return self.gauges[key]
+        return self.counters.get(key, default)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**self.counters, **self.gauges}
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.gauges.clear()
+
+
+_metrics: dict[str, Metrics] = {}
+
+
+def get_metrics(name: str) -> Metrics:
+    if name not in _metrics:
+        _metrics[name] = Metrics(name)
+    return _metrics[name]
+
+
+def snapshot_metrics(prefix: str = "") -> dict[str, dict[str, Any]]:
+    return {name: metrics.snapshot() for name, metrics in _metrics.items() if name.startswith(prefix)}
@@ -1,4 +1,3 @@
-import copy
 import time
 from collections.abc import Callable
 from typing import Any
@@ -131,8 +130,10 @@ def print_logs(
         color_source: Callable[[str], str] = color_green,
         debug: bool = True
 ):
-    message = copy.deepcopy(message)
+    """Print the newest content of a message handled by an agent.
 
+    ``trace_messages`` is not filled anymore, the hops are recorded by
+    :func:`autochat.utils.tracing.get_tracer` outside the messages."""
     if not debug:
         return
 
@@ -140,14 +141,10 @@ def print_logs(
         mes = message
     elif isinstance(message, UserMessage):
         mes = message.content[-1]
-        message.traces = []
     elif isinstance(message, HandoffMessage):
         mes = message.message.content[-1]
-        message.traces = []
-        message.message.traces = []
     else:
         mes = message.content
-        message.traces = []
 
     if isinstance(mes, list):
         mes = mes[-1]
@@ -156,6 +153,4 @@ def print_logs(
     print_fun(f"Agent {_source}:")
     print_fun(f"        {mes}")
 
-    trace_messages.append({source: message})
-
 
@@ -0,0 +1,102 @@
+import re
+from collections import OrderedDict
+from typing import Any
+
+from autogen_core.components.models import SystemMessage
+
+
+__all__ = [
+    "SystemPromptTemplate",
+]
+
+
+_VARIABLE_PATTERN = re.compile(r"{{(.*?)}}")
+
+
+def _format_value(value: Any) -> str | None:
+    if value is None:
+        return None
+    return str(value)
+
+
+class SystemPromptTemplate:
+    """A system prompt template compiled once and rendered in a single pass.
+
+    Rendering follows :func:`autochat.utils.utils.build_system_prompt`: every segment is
+    a template with ``{{variable}}`` placeholders, a segment is dropped when one of its
+    variables is missing or ``None``, and the kept segments are joined with blank lines.
+    The rendered prompt is memoized by the values of the variables the template uses,
+    so calls with unchanged variables skip rendering.
+    """
+
+    def __init__(self, templates: list[str], cache_size: int = 128):
+        self.templates = list(templates)
+        self.cache_size = cache_size
+
+        # each segment is compiled to its literal parts and the variables between them
+        self._segments: list[tuple[tuple[str, ...], tuple[str, ...]]] = []
+        for template in self.templates:
+            parts = _VARIABLE_PATTERN.split(template)
+            self._segments.append((tuple(parts[0::2]), tuple(parts[1::2])))
+
+        self.variables: tuple[str, ...] = tuple(
+            dict.fromkeys(name for _, names in self._segments for name in names)
+        )
+
+        self._cache: OrderedDict[tuple[str | None, ...], str] = OrderedDict()
+
+    @classmethod
+    def from_system_message(
+            cls,
+            system_message: "SystemPromptTemplate | SystemMessage | list[SystemMessage] | str | list[str]",
+            **kwargs
+    ) -> "SystemPromptTemplate":
+        if isinstance(system_message, SystemPromptTemplate):
+            return system_message
+
+        if not isinstance(system_message, list):
+            system_message = [system_message]
+
+        templates: list[str] = []
+        for message in system_message:
+            if isinstance(message, SystemMessage):
+                templates.append(message.content)
+            elif isinstance(message, str):
+                templates.append(message)
+            else:
+                raise TypeError(f"Expected type [str | SystemMessage] but got {type(message)}")
+
+        return cls(templates, **kwargs)
+
+    def render(self, variables: dict[str, Any] | None = None) -> str:
+        variables = variables or {}
+
+        key = tuple(_format_value(variables.get(name)) for name in self.variables)
+        prompt = self._cache.get(key)
+        if prompt is not None:
+            self._cache.move_to_end(key)
+            return prompt
+
+        values = dict(zip(self.variables, key))
+        prompts: list[str] = []
+        for literals, names in self._segments:
+            if not names:
+                prompts.append(literals[0])
+                continue
+
+            if any(values[name] is None for name in names):
+                continue
+
+            chunks = [literals[0]]
+            for name, literal in zip(names, literals[1:]):
+                chunks.append(values[name])
+                chunks.append(literal)
+            prompts.append("".join(chunks))
+
+        prompt = "\n\n".join(prompts)
+
+        self._cache[key] = prompt
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return prompt
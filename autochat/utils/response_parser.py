@@ -0,0 +1,349 @@
+import ast
+import json
+import re
+from typing import Any
+
+from autochat.utils.string_utils import jaccard_similarity
+
+
+__all__ = [
+    "AssistantResponseParser",
+    "parse_assistant_response",
+    "merge_response",
+]
+
+
+_CURLY_QUOTES = str.maketrans({"“": '"', "”": '"'})
+
+_FENCE_START = "```json"
+_FENCE_END = "```"
+
+# jump to the next character that changes the state of the scanner
+_TEXT_PATTERN = re.compile(r"\{|```json")
+_OBJECT_PATTERN = re.compile(r'[{}"]')
+_STRING_PATTERN = re.compile(r'["\\]')
+
+_TEXT, _OBJECT, _STRING, _FENCE = range(4)
+
+# the keys of the text shown to the user, the other keys are control fields
+_VISIBLE_KEYS = ("response", "message")
+# an escape sequence cut at the end of a chunk
+_PARTIAL_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{0,3})?$")
+
+
+def _decode_partial_string(raw: str) -> str:
+    """Decode the JSON string content received so far."""
+    raw = _PARTIAL_ESCAPE.sub("", raw)
+    try:
+        return json.loads(f'"{raw}"', strict=False)
+    except ValueError:
+        return raw
+
+
+def merge_response(text_1: str, text_2: str) -> str:
+    score = jaccard_similarity(text_1.lower(), text_2.lower())
+    if score >= 0.65:
+        if len(text_1) > len(text_2):
+            merge_text = text_1
+        else:
+            merge_text = text_2
+    else:
+        merge_text = f"{text_1}\n{text_2}"
+    return merge_text
+
+
+def _merge_response_chars(text_1: str, chars_1: set[str], text_2: str) -> tuple[str, set[str]]:
+    """:func:`merge_response` with the characters of ``text_1`` already known, so merging
+    many responses into one does not rescan the merged text."""
+    chars_2 = set(text_2.lower())
+    union = chars_1 | chars_2
+    score = len(chars_1 & chars_2) / len(union) if union else 1.0
+    if score >= 0.65:
+        if len(text_1) > len(text_2):
+            return text_1, chars_1
+        return text_2, chars_2
+    return f"{text_1}\n{text_2}", union | {"\n"}
+
+
+def _sub_quotes_mark(match: re.Match[Any]) -> str:
+    text = match.group().strip('"').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _parse_object(value: str) -> dict[str, Any] | None:
+    """Parse a JSON object, falling back to the lenient python literal parsing of the legacy parser."""
+    try:
+        value_dict = json.loads(value)
+    except ValueError:
+        value = re.sub('"".*?""', _sub_quotes_mark, value)
+        value = value.replace("false", "False").replace("true", "True")
+        try:
+            value_dict = ast.literal_eval(value)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            return None
+
+    if isinstance(value_dict, dict) and value_dict:
+        return value_dict
+    return None
+
+
+class AssistantResponseParser:
+    """Single pass parser of assistant completions with embedded JSON responses.
+
+    Balanced JSON objects and fenced ```json blocks are found in one scan, the text can be fed
+    in chunks as a streaming completion is generated. Objects that fail to parse are kept as
+    text. :meth:`close` returns the same output as the legacy ``parser_assistant_message``:
+    the remaining text as ``response`` merged with the keys of the parsed objects.
+
+    :meth:`take_visible` returns the text for the user as it is fed: the text outside the
+    JSON blocks and the ``response`` (or ``message``) values, streamed as they are generated
+    when they are strings of a top-level object. Control fields (e.g. ``new_conversation``,
+    ``is_exit``) are never part of it.
+    """
+
+    # settled text before the scan position is moved out of the buffer past this size
+    compact_size = 4096
+
+    def __init__(self):
+        self._text = ""
+        self._fed_length = 0
+        self._pos = 0
+        self._state = _TEXT
+        # start of the candidate being scanned and the starts of its open braces
+        self._start = 0
+        self._stack: list[int] = []
+        # balanced direct children of the open top-level object, tried if it fails to parse
+        self._children: list[tuple[int, int]] = []
+
+        self._found_candidates = False
+        self._text_parts: list[str] = []
+        self._last_end = 0
+        self._response_dicts: list[dict[str, Any]] = []
+
+        # the text for the user: the end of the text already taken, the string being scanned,
+        # the last key of the top-level object and the visible value being streamed
+        self._visible_parts: list[str] = []
+        self._visible_end = 0
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._value_start: int | None = None
+        self._value_taken = 0
+        self._streamed_keys: set[str] = set()
+
+    @property
+    def fed_length(self) -> int:
+        return self._fed_length
+
+    def feed(self, chunk: str) -> None:
+        self._fed_length += len(chunk)
+        self._text += chunk.translate(_CURLY_QUOTES)
+        self._scan()
+
+        # outside of a candidate the scanned text is settled, drop it from the buffer
+        if self._state == _TEXT and self._pos > self.compact_size:
+            self._take_text(self._pos)
+            self._text_parts.append(self._text[self._last_end:self._pos])
+            self._text = self._text[self._pos:]
+            self._pos = 0
+            self._last_end = 0
+            self._visible_end = 0
+
+    def _take_text(self, end: int) -> None:
+        if end > self._visible_end:
+            self._visible_parts.append(self._text[self._visible_end:end])
+            self._visible_end = end
+
+    def _take_value(self, end: int) -> None:
+        value = _decode_partial_string(self._text[self._value_start:end])
+        if len(value) > self._value_taken:
+            self._visible_parts.append(value[self._value_taken:])
+            self._value_taken = len(value)
+
+    def take_visible(self, final: bool = False) -> str:
+        """The text for the user fed since the last call, ``final`` once the completion ended."""
+        if self._state == _TEXT or (final and self._value_start is None):
+            # a candidate still open at the end is kept as text, as in :meth:`close`
+            self._take_text(len(self._text) if final else self._pos)
+        elif self._state in (_OBJECT, _STRING, _FENCE):
+            self._take_text(self._start)
+            if self._state == _STRING and self._value_start is not None:
+                self._take_value(self._pos)
+        visible = "".join(self._visible_parts)
+        self._visible_parts.clear()
+        return visible
+
+    def has_flag(self, key: str) -> bool:
+        """Whether a parsed object sets ``key`` to a true value, e.g. ``new_conversation``."""
+        return any(response_dict.get(key) for response_dict in self._response_dicts)
+
+    def _accept(self, start: int, end: int, value: str) -> bool:
+        value_dict = _parse_object(value)
+        if value_dict is None:
+            return False
+
+        self._text_parts.append(self._text[self._last_end:start])
+        self._last_end = end
+        self._response_dicts.append(value_dict)
+
+        self._take_text(start)
+        for key in _VISIBLE_KEYS:
+            if isinstance(value_dict.get(key), str) and key not in self._streamed_keys:
+                self._visible_parts.append(value_dict[key])
+        self._visible_end = max(self._visible_end, end)
+        return True
+
+    def _accept_object(self, start: int, end: int, children: list[tuple[int, int]]) -> None:
+        self._found_candidates = True
+        if not self._accept(start, end, self._text[start:end]):
+            for child_start, child_end in children:
+                self._accept(child_start, child_end, self._text[child_start:child_end])
+        # the text of an object that failed to parse is not shown while streaming
+        self._take_text(start)
+        self._visible_end = max(self._visible_end, end)
+        self._streamed_keys = set()
+        self._last_key = None
+
+    def _start_top_level_string(self, quote: int) -> None:
+        """A string of the top-level object starts, stream it if it's a visible value."""
+        before = quote - 1
+        while before > self._start and self._text[before].isspace():
+            before -= 1
+        if self._text[before] == ":" and self._last_key in _VISIBLE_KEYS and self._last_key not in self._streamed_keys:
+            self._take_text(self._start)
+            self._value_start = quote + 1
+            self._value_taken = 0
+
+    def _end_top_level_string(self, quote: int) -> None:
+        if self._value_start is not None:
+            self._take_value(quote)
+            self._streamed_keys.add(self._last_key)
+            self._value_start = None
+        else:
+            self._last_key = self._text[self._string_start:quote]
+
+    def _scan(self) -> None:
+        text = self._text
+        length = len(text)
+        pos = self._pos
+
+        while pos < length:
+            if self._state == _TEXT:
+                match = _TEXT_PATTERN.search(text, pos)
+                if match is None:
+                    # keep a possible partial fence at the end for the next chunk
+                    pos = max(pos, length - len(_FENCE_START) + 1)
+                    break
+                self._start = match.start()
+                if match.group() == "{":
+                    self._state = _OBJECT
+                    self._stack = [match.start()]
+                    self._children = []
+                else:
+                    self._state = _FENCE
+                pos = match.end()
+
+            elif self._state == _OBJECT:
+                match = _OBJECT_PATTERN.search(text, pos)
+                if match is None:
+                    pos = length
+                    break
+                pos = match.end()
+                char = match.group()
+                if char == '"':
+                    self._state = _STRING
+                    self._string_start = pos
+                    if len(self._stack) == 1:
+                        self._start_top_level_string(match.start())
+                elif char == "{":
+                    self._stack.append(match.start())
+                else:
+                    start = self._stack.pop()
+                    if len(self._stack) == 1:
+                        self._children.append((start, pos))
+                    elif not self._stack:
+                        self._state = _TEXT
+                        self._accept_object(start, pos, self._children)
+
+            elif self._state == _STRING:
+                match = _STRING_PATTERN.search(text, pos)
+                if match is None:
+                    pos = length
+                    break
+                if match.group() == "\\":
+                    if match.end() >= length:
+                        # the escaped character is in the next chunk
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                else:
+                    pos = match.end()
+                    self._state = _OBJECT
+                    if len(self._stack) == 1:
+                        self._end_top_level_string(match.start())
+
+            else:
+                end = text.find(_FENCE_END, pos)
+                if end < 0:
+                    pos = max(pos, length - len(_FENCE_END) + 1)
+                    break
+                pos = end + len(_FENCE_END)
+                self._state = _TEXT
+                self._found_candidates = True
+                value = text[self._start + len(_FENCE_START):end].strip()
+                self._accept(self._start, pos, value)
+                self._take_text(self._start)
+                self._visible_end = max(self._visible_end, pos)
+
+        self._pos = pos
+
+    def close(self) -> dict[str, Any]:
+        """Finish parsing and return the merged response, the parser can't be fed anymore."""
+        while self._state == _FENCE:
+            # the fence never closed, e.g. a truncated completion, scan its content as text
+            self._state = _TEXT
+            self._pos = self._start + len(_FENCE_START)
+            self._scan()
+
+        if self._state in (_OBJECT, _STRING) and self._children:
+            # the top-level object never closed, e.g. a stray brace in the text
+            self._found_candidates = True
+            for child_start, child_end in self._children:
+                self._accept(child_start, child_end, self._text[child_start:child_end])
+        self._state = None
+
+        self._text_parts.append(self._text[self._last_end:])
+        text = "".join(self._text_parts)
+        if not self._found_candidates:
+            return {"response": text}
+
+        if self._response_dicts:
+            text = text.strip(' \n\t"')
+
+        text = re.sub(" {2,}", " ", text)
+        text = re.sub("\n{3,}", "\n\n", text)
+        output: dict[str, Any] = {"response": text}
+        merged_chars: dict[str, set[str]] = {}
+
+        for res_dict in self._response_dicts:
+            for k, v in res_dict.items():
+                if k in output:
+                    if k == "response" or k == "message":
+                        if k not in merged_chars:
+                            merged_chars[k] = set(output[k].lower())
+                        output[k], merged_chars[k] = _merge_response_chars(output[k], merged_chars[k], v)
+                    elif isinstance(v, str):
+                        output[k] += "\n" + v
+                    elif isinstance(v, bool):
+                        output[k] = output[k] | v
+                    else:
+                        output[k] = v
+                else:
+                    output[k] = v
+        return output
+
+
+def parse_assistant_response(text: str) -> dict[str, Any]:
+    """Parse a complete assistant completion, see :class:`AssistantResponseParser`."""
+    parser = AssistantResponseParser()
+    parser.feed(text)
+    return parser.close()
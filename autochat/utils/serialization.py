@@ -0,0 +1,144 @@
+import hashlib
+import json
+from dataclasses import fields, is_dataclass
+from typing import Any
+
+from pydantic import BaseModel
+from autogen_core.components import FunctionCall, Image
+from autogen_core.components.models import (
+    AssistantMessage,
+    CreateResult,
+    FunctionExecutionResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    RequestUsage,
+    SystemMessage,
+    UserMessage,
+)
+from autogen_core.components.tools import Tool
+
+
+__all__ = [
+    "to_jsonable",
+    "canonical_hash",
+    "create_result_to_dict",
+    "create_result_from_dict",
+    "llm_message_to_dict",
+    "llm_message_from_dict",
+]
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert messages, tools and results to plain JSON values.
+
+    Dataclasses and pydantic models keep their type name under ``__type__`` so that
+    e.g. a user message and a system message with the same content stay different."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # plain containers first, the Tool protocol check is slow
+    if type(value) is dict:
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if type(value) is list:
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, Tool):
+        return to_jsonable(value.schema)
+    if is_dataclass(value) and not isinstance(value, type):
+        data = {f.name: to_jsonable(getattr(value, f.name)) for f in fields(value)}
+        data["__type__"] = type(value).__name__
+        return data
+    if isinstance(value, BaseModel):
+        data = {name: to_jsonable(getattr(value, name)) for name in type(value).model_fields}
+        data["__type__"] = type(value).__name__
+        return data
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [to_jsonable(v) for v in value]
+
+    return str(value)
+
+
+def canonical_hash(value: Any) -> str:
+    data = json.dumps(to_jsonable(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def create_result_to_dict(result: CreateResult) -> dict[str, Any]:
+    content = result.content
+    if isinstance(content, list):
+        content = [{"id": call.id, "arguments": call.arguments, "name": call.name} for call in content]
+
+    usage = None
+    if result.usage is not None:
+        usage = {"prompt_tokens": result.usage.prompt_tokens, "completion_tokens": result.usage.completion_tokens}
+
+    return {
+        "finish_reason": result.finish_reason,
+        "content": content,
+        "usage": usage,
+    }
+
+
+def create_result_from_dict(data: dict[str, Any], cached: bool = False) -> CreateResult:
+    content = data["content"]
+    if isinstance(content, list):
+        content = [FunctionCall(**call) for call in content]
+
+    usage = RequestUsage(**data["usage"]) if data.get("usage") else RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    return CreateResult(
+        finish_reason=data["finish_reason"],
+        content=content,
+        usage=usage,
+        cached=cached,
+        logprobs=None,
+    )
+
+
+_LLM_MESSAGE_TYPES = {
+    cls.__name__: cls
+    for cls in (
+        SystemMessage,
+        UserMessage,
+        AssistantMessage,
+        FunctionExecutionResultMessage,
+        FunctionExecutionResult,
+        FunctionCall,
+    )
+}
+
+
+def _encode_llm_value(value: Any) -> Any:
+    if isinstance(value, Image):
+        return {"__type__": "Image", "data": value.to_base64()}
+    if is_dataclass(value) and not isinstance(value, type):
+        data = {f.name: _encode_llm_value(getattr(value, f.name)) for f in fields(value)}
+        data["__type__"] = type(value).__name__
+        return data
+    if isinstance(value, list):
+        return [_encode_llm_value(v) for v in value]
+    return value
+
+
+def _decode_llm_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode_llm_value(v) for v in value]
+    if isinstance(value, dict) and "__type__" in value:
+        data = dict(value)
+        type_name = data.pop("__type__")
+        if type_name == "Image":
+            return Image.from_base64(data["data"])
+        if type_name not in _LLM_MESSAGE_TYPES:
+            raise ValueError(f"Unknown message type {type_name}")
+        return _LLM_MESSAGE_TYPES[type_name](**{k: _decode_llm_value(v) for k, v in data.items()})
+    return value
+
+
+def llm_message_to_dict(message: LLMMessage) -> dict[str, Any]:
+    """Convert a model message to plain JSON values that :func:`llm_message_from_dict` turns back
+    into the same message, images are kept as base64."""
+    return _encode_llm_value(message)
+
+
+def llm_message_from_dict(data: dict[str, Any]) -> LLMMessage:
+    return _decode_llm_value(data)
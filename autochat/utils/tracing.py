@@ -0,0 +1,222 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, TextIO
+
+from autochat.utils.print_utils import color_green
+
+_logger = logging.getLogger(__name__)
+
+
+__all__ = [
+    "TraceEvent",
+    "TraceSink",
+    "StdoutTraceSink",
+    "JsonlTraceSink",
+    "InMemoryTraceSink",
+    "Tracer",
+    "configure_tracing",
+    "get_tracer",
+]
+
+
+def _last_content(message: Any) -> Any:
+    """The newest content item of a message, what the logs show of it."""
+    inner = getattr(message, "message", None)
+    if inner is not None:
+        message = inner
+
+    content = getattr(message, "content", message)
+    if isinstance(content, list) and content:
+        return content[-1]
+    return content
+
+
+@dataclass(slots=True)
+class TraceEvent:
+    """A hop of a message through an agent.
+
+    Only a reference to the newest content item of the message is kept, it is formatted when a
+    sink writes the event, so recording an event never copies the conversation.
+    """
+    session_id: str
+    source: str
+    event: str
+    message_type: str
+    message_id: str | None
+    content: Any
+    timestamp: float = field(default_factory=time.time)
+    fields: dict[str, Any] = field(default_factory=dict)
+
+    def format(self, color_source: Callable[[str], str] | None = color_green) -> str:
+        source = f"{self.source} {self.event}"
+        if color_source is not None:
+            source = color_source(source)
+        return f"Agent {source}:\n        {self.content}"
+
+    def to_dict(self) -> dict[str, Any]:
+        # imported here, the serialization helpers pull in the model types
+        from autochat.utils.serialization import to_jsonable
+
+        return {
+            "timestamp": self.timestamp,
+            "session_id": self.session_id,
+            "source": self.source,
+            "event": self.event,
+            "message_type": self.message_type,
+            "message_id": self.message_id,
+            "content": to_jsonable(self.content),
+            **{k: to_jsonable(v) for k, v in self.fields.items()},
+        }
+
+
+class TraceSink:
+    """Receives the recorded events, subclasses write them somewhere."""
+
+    def emit(self, event: TraceEvent) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class StdoutTraceSink(TraceSink):
+    """Print the events like the agent debug logs."""
+
+    def __init__(self, print_fun: Callable[[str], None] = print, color: bool = True):
+        self.print_fun = print_fun
+        self.color = color
+
+    def emit(self, event: TraceEvent) -> None:
+        self.print_fun(event.format(color_green if self.color else None))
+
+
+class JsonlTraceSink(TraceSink):
+    """Append the events to a JSON lines file."""
+
+    def __init__(self, path: str, flush: bool = False):
+        self.path = path
+        self.flush = flush
+        self._file: TextIO | None = None
+        self._lock = threading.Lock()
+
+    def emit(self, event: TraceEvent) -> None:
+        line = json.dumps(event.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            if self.flush:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class InMemoryTraceSink(TraceSink):
+    """Keep the latest events in memory, e.g. to inspect them in tests or notebooks."""
+
+    def __init__(self, max_events: int = 10000):
+        self.events: deque[TraceEvent] = deque(maxlen=max_events)
+
+    def emit(self, event: TraceEvent) -> None:
+        self.events.append(event)
+
+    def clear(self) -> None:
+        self.events.clear()
+
+
+class Tracer:
+    """Record the hops of messages through the agents.
+
+    The latest ``buffer_size`` events of each session are kept in a ring buffer outside the
+    messages, for at most ``max_sessions`` sessions (the least recently traced are dropped).
+    A tracer without sinks and buffer is disabled and :meth:`record` returns immediately.
+
+    :param sinks: where the events are written as they are recorded
+    :param buffer_size: the number of events kept per session, 0 to keep none
+    :param max_sessions: the number of sessions with a buffer
+    """
+
+    def __init__(
+            self,
+            sinks: Iterable[TraceSink] = (),
+            buffer_size: int = 0,
+            max_sessions: int = 1024,
+    ):
+        self.sinks: list[TraceSink] = list(sinks)
+        self.buffer_size = buffer_size
+        self.max_sessions = max_sessions
+        self.enabled = bool(self.sinks) or buffer_size > 0
+
+        self._buffers: OrderedDict[str, deque[TraceEvent]] = OrderedDict()
+
+    def record(self, session_id: str, source: str, event: str, message: Any, **fields: Any) -> None:
+        if not self.enabled:
+            return
+
+        trace_event = TraceEvent(
+            session_id=session_id,
+            source=source,
+            event=event,
+            message_type=type(message).__name__,
+            message_id=getattr(message, "id", None),
+            content=_last_content(message),
+            fields=fields,
+        )
+
+        if self.buffer_size > 0:
+            buffer = self._buffers.get(session_id)
+            if buffer is None:
+                buffer = self._buffers[session_id] = deque(maxlen=self.buffer_size)
+                if len(self._buffers) > self.max_sessions:
+                    self._buffers.popitem(last=False)
+            else:
+                self._buffers.move_to_end(session_id)
+            buffer.append(trace_event)
+
+        for sink in self.sinks:
+            try:
+                sink.emit(trace_event)
+            except Exception as e:
+                _logger.warning(f"Trace sink {type(sink).__name__} failed: {e}")
+
+    def get_trace(self, session_id: str) -> list[TraceEvent]:
+        """The buffered events of a session, from the oldest to the newest."""
+        return list(self._buffers.get(session_id, ()))
+
+    def clear(self, session_id: str | None = None) -> None:
+        if session_id is None:
+            self._buffers.clear()
+        else:
+            self._buffers.pop(session_id, None)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+_tracer = Tracer()
+
+
+def configure_tracing(
+        sinks: Iterable[TraceSink] = (),
+        buffer_size: int = 256,
+        max_sessions: int = 1024,
+) -> Tracer:
+    """Set the process-wide tracer used by the agents, see :class:`Tracer` for the arguments.
+    ``configure_tracing(buffer_size=0)`` disables tracing."""
+    global _tracer
+    _tracer.close()
+    _tracer = Tracer(sinks=sinks, buffer_size=buffer_size, max_sessions=max_sessions)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    return _tracer
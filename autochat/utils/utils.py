@@ -6,7 +6,7 @@ import pytz
 import datetime
 import importlib
 import re
-from autochat.utils.string_utils import parser_string_to_json, jaccard_similarity, extract_json_from_markdown
+from autochat.utils.response_parser import parse_assistant_response
 
 
 def get_time_vn_now(strftime: str = "iso") -> Any:
@@ -68,23 +68,6 @@ def get_message_content(message: dict[str, Any], ignore_clear_msg: bool = False)
     return "\n".join(item["text"] for item in message["content"] if item["type"] == "text")
 
 
-def sub_quotes_mark(match: re.Match[Any]) -> str:
-    text = match.group().strip('"').replace('"', '\\"')
-    return f'"{text}"'
-
-
-def merge_response(text_1: str, text_2: str) -> str:
-    score = jaccard_similarity(text_1.lower(), text_2.lower())
-    if score >= 0.65:
-        if len(text_1) > len(text_2):
-            merge_text = text_1
-        else:
-            merge_text = text_2
-    else:
-        merge_text = f"{text_1}\n{text_2}"
-    return merge_text
-
-
 def parser_assistant_message(text: str) -> dict[str, Any]:
     """
     Combine multiple responses into one response
@@ -107,52 +90,7 @@ def parser_assistant_message(text: str) -> dict[str, Any]:
             "is_exit": True/False
         }
     """
-    text = text.replace("“", '"').replace("”", '"')
-
-    pattern = re.compile(r"(```json(.*?)```)|(\{.*?})", re.DOTALL)
-
-    # find all the json/dict objects in the text with response schema
-    matches = list(re.finditer(pattern, text))
-    if not matches:
-        return {"response": text}
-
-    response_dicts = []
-
-    for match in matches:
-        value = match.group()
-
-        if "json" in value:
-            value = extract_json_from_markdown(value)
-
-        value = re.sub('"".*?""', sub_quotes_mark, value)
-        value = value.replace("false", "False")
-        value = value.replace("true", "True")
-
-        value_dict = parser_string_to_json(value)
-
-        if value_dict:
-            text = text.replace(match.group(), "").strip(' \n\t"')
-            response_dicts.append(value_dict)
-
-    text = re.sub(" {2,}", " ", text)
-    text = re.sub("\n{3,}", "\n\n", text)
-    output: dict[str, Any] = {"response": text}
-
-    for res_dict in response_dicts:
-        for k, v in res_dict.items():
-            if k in output:
-                if k == "response" or k == "message":
-                    output[k] = merge_response(output[k], v)
-                elif isinstance(v, str):
-                    output[k] += "\n" + v
-                elif isinstance(v, bool):
-                    output[k] = output[k] | v
-                else:
-                    output[k] = v
-            else:
-                output[k] = v
-    return output
-
+    return parse_assistant_response(text)
 
 
 def build_system_prompt(
@@ -0,0 +1,89 @@
+"""Benchmark: action HTTP calls with a new session per call vs the pooled keep-alive session.
+
+Starts a local aiohttp stub server and calls it through ``call_action_api``.
+Run: python benchmarks/bench_action_http.py [--calls 2000] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+import aiohttp
+from aiohttp import web
+
+from autochat.models.action import ActionMethod, ActionBodyType, ActionParam
+from autochat.models.authentication import ActionAuthentication
+from autochat.tools.action.openapi_call import call_action_api
+from autochat.tools.action.http_session import close_http_sessions
+
+
+async def handle_item(request: web.Request) -> web.Response:
+    return web.json_response({"data": {"id": request.match_info["item_id"], "name": "item", "price": 10}})
+
+
+async def start_stub_server() -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_get("/items/{item_id}", handle_item)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def call_new_session(url: str) -> None:
+    # the behaviour before pooling: one session (and connection) per call
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            await response.json()
+
+
+async def call_pooled(url: str) -> None:
+    output = await call_action_api(
+        url=url,
+        method=ActionMethod.GET,
+        path_param_schema={"item_id": ActionParam(type="string", description="", required=True)},
+        query_param_schema=None,
+        body_type=ActionBodyType.NONE,
+        body_param_schema=None,
+        parameters={"item_id": "42"},
+        headers={},
+        authentication=ActionAuthentication(type="none"),
+    )
+    assert output["status"] == 200, output
+
+
+async def run(name: str, func, url: str, calls: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await func(url)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<16} {calls / elapsed:10.1f} calls/s  ({elapsed:.2f}s for {calls} calls)")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    runner, base_url = await start_stub_server()
+    try:
+        print(f"calls={args.calls} concurrency={args.concurrency}")
+        await run("new session", call_new_session, f"{base_url}/items/42", args.calls, args.concurrency)
+        await run("pooled session", call_pooled, base_url + "/items/{item_id}", args.calls, args.concurrency)
+    finally:
+        await close_http_sessions()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
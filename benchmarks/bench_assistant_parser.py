@@ -0,0 +1,196 @@
+"""Benchmark: single-pass AssistantResponseParser vs the legacy regex parser_assistant_message.
+
+Checks the outputs against the legacy parser on a golden corpus first (whole text and
+streamed in chunks), then measures the throughput on long replies with several JSON blocks.
+Run: python benchmarks/bench_assistant_parser.py [--blocks 20] [--number 200]
+"""
+import argparse
+import ast
+import json
+import re
+import timeit
+from typing import Any
+
+from autochat.utils.string_utils import jaccard_similarity
+from autochat.utils.response_parser import AssistantResponseParser, parse_assistant_response
+
+
+# ================== Legacy parser (before the single-pass scanner) ==================
+
+def legacy_merge_response(text_1: str, text_2: str) -> str:
+    score = jaccard_similarity(text_1.lower(), text_2.lower())
+    if score >= 0.65:
+        if len(text_1) > len(text_2):
+            merge_text = text_1
+        else:
+            merge_text = text_2
+    else:
+        merge_text = f"{text_1}\n{text_2}"
+    return merge_text
+
+
+def legacy_sub_quotes_mark(match: re.Match[Any]) -> str:
+    text = match.group().strip('"').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def legacy_parser_string_to_json(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return ast.literal_eval(text)
+
+
+def legacy_extract_json_from_markdown(text: str) -> str:
+    pattern = re.compile(r"```json(.*?)```", re.DOTALL)
+    match = pattern.search(text)
+    if match:
+        return match.group(1).strip()
+    else:
+        return text
+
+
+def legacy_parser_assistant_message(text: str) -> dict[str, Any]:
+    text = text.replace("“", '"').replace("”", '"')
+
+    pattern = re.compile(r"(```json(.*?)```)|(\{.*?})", re.DOTALL)
+
+    matches = list(re.finditer(pattern, text))
+    if not matches:
+        return {"response": text}
+
+    response_dicts = []
+
+    for match in matches:
+        value = match.group()
+
+        if "json" in value:
+            value = legacy_extract_json_from_markdown(value)
+
+        value = re.sub('"".*?""', legacy_sub_quotes_mark, value)
+        value = value.replace("false", "False")
+        value = value.replace("true", "True")
+
+        value_dict = legacy_parser_string_to_json(value)
+
+        if value_dict:
+            text = text.replace(match.group(), "").strip(' \n\t"')
+            response_dicts.append(value_dict)
+
+    text = re.sub(" {2,}", " ", text)
+    text = re.sub("\n{3,}", "\n\n", text)
+    output: dict[str, Any] = {"response": text}
+
+    for res_dict in response_dicts:
+        for k, v in res_dict.items():
+            if k in output:
+                if k == "response" or k == "message":
+                    output[k] = legacy_merge_response(output[k], v)
+                elif isinstance(v, str):
+                    output[k] += "\n" + v
+                elif isinstance(v, bool):
+                    output[k] = output[k] | v
+                else:
+                    output[k] = v
+            else:
+                output[k] = v
+    return output
+
+
+# ================== Golden corpus ==================
+
+GOLDEN_CORPUS = [
+    "Xin chào, tôi có thể giúp gì cho bạn?",
+    "",
+    '{"response": "Hello!", "intent": "GREETING"}',
+    '{"response": "Bye", "is_exit": true}',
+    '{"response": "Bye", "is_exit": false, "score": 0.5}',
+    "{'response': 'python style', 'is_exit': True}",
+    '```json\n{"response": "fenced", "intent": "MAIN_UC"}\n```',
+    'Some text before\n```json\n{"response": "fenced answer"}\n```\nand after',
+    '{"response": "part one"}\n\n{"response": "part two is different", "is_exit": true}',
+    '{"response": "same answer"}{"response": "same answer!"}',
+    '{"message": "a"} {"message": "b"}',
+    '{"response": "x", "note": "first"} {"note": "second"}',
+    '{"response": "x", "is_exit": false} {"is_exit": true}',
+    '{"response": "x", "count": 1} {"count": 2}',
+    'Answer:   with   spaces\n\n\n\n{"intent": "A"}',
+    '“{“response”: “curly quotes”}”',
+    '"{"response": "quoted object"}"',
+    '{"response": ""quoted""}',
+    'text with {} empty braces',
+    '{"response": "a"}\n\n\nTrailing text',
+    '{"response": "dup"} and {"response": "dup"}',
+    '```json\n{"response": "one"}\n```\n```json\n{"intent": "TWO"}\n```',
+    '{"response": "Đơn hàng của bạn đã được xác nhận", "order_id": "DH001"}',
+    'Only text but with json word',
+]
+
+# replies the legacy parser failed on (nested objects, stray braces), parsed leniently now
+TOLERATED_CORPUS = [
+    '{"response": "nested", "data": {"id": 1, "tags": ["a", "b"]}}',
+    'Use {name} to address the user. {"response": "ok"}',
+    'I like { braces. {"response": "hi"}',
+    '{"response": "a {b} c"}',
+    '```json\n{"response": "truncated fence"}',
+    '{"response": "escaped \\" quote and } brace"}',
+]
+
+
+def parse_streamed(text: str, chunk_size: int) -> dict[str, Any]:
+    parser = AssistantResponseParser()
+    for i in range(0, len(text), chunk_size):
+        parser.feed(text[i:i + chunk_size])
+    return parser.close()
+
+
+def check_golden_corpus() -> None:
+    for text in GOLDEN_CORPUS:
+        expected = legacy_parser_assistant_message(text)
+        assert parse_assistant_response(text) == expected, (text, parse_assistant_response(text), expected)
+        for chunk_size in (1, 3, 16):
+            assert parse_streamed(text, chunk_size) == expected, (text, chunk_size)
+
+    for text in TOLERATED_CORPUS:
+        output = parse_assistant_response(text)
+        assert output == parse_streamed(text, 1), text
+        assert "response" in output, text
+
+    print(f"golden corpus: {len(GOLDEN_CORPUS)} replies match the legacy parser, "
+          f"{len(TOLERATED_CORPUS)} previously failing replies parsed")
+
+
+def make_reply(num_blocks: int) -> str:
+    parts = []
+    for i in range(num_blocks):
+        parts.append(f"Paragraph {i}: " + "the assistant explains the answer in detail. " * 20)
+        parts.append(json.dumps({"response": f"answer {i} " * 30, "intent": f"INTENT_{i}", "is_exit": i % 2 == 0}))
+        if i % 3 == 0:
+            parts.append("```json\n" + json.dumps({"note": f"fenced {i}"}) + "\n```")
+    return "\n\n".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocks", type=int, default=20)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    check_golden_corpus()
+
+    text = make_reply(args.blocks)
+    assert parse_assistant_response(text) == legacy_parser_assistant_message(text)
+
+    legacy = timeit.timeit(lambda: legacy_parser_assistant_message(text), number=args.number)
+    single_pass = timeit.timeit(lambda: parse_assistant_response(text), number=args.number)
+    streamed = timeit.timeit(lambda: parse_streamed(text, 16), number=args.number)
+
+    mb = len(text) * args.number / 1e6
+    print(f"reply of {len(text)} chars with {args.blocks} JSON blocks, {args.number} runs")
+    print(f"legacy parser       {legacy / args.number * 1e6:10.1f} us/reply  {mb / legacy:8.2f} MB/s")
+    print(f"single-pass parser  {single_pass / args.number * 1e6:10.1f} us/reply  {mb / single_pass:8.2f} MB/s")
+    print(f"streamed (16 chars) {streamed / args.number * 1e6:10.1f} us/reply  {mb / streamed:8.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark: cost of checkpointing a growing conversation after each turn.
+
+Each turn appends a user message and an assistant reply to the history and saves the
+session. ``incremental`` is :class:`SQLiteCheckpointStore`, which appends the new messages,
+``full rewrite`` deletes the checkpoint before each save, so the whole history is written
+every turn as a store keeping one value per session would.
+Run: python benchmarks/bench_checkpoint.py [--turns 100] [--sessions 20]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autogen_core.components.models import AssistantMessage, UserMessage
+
+from autochat.tasks import SQLiteCheckpointStore
+
+
+async def run(store: SQLiteCheckpointStore, sessions: int, turns: int, rewrite: bool) -> float:
+    histories = {f"session-{index}": [] for index in range(sessions)}
+    start = time.perf_counter()
+    for turn in range(turns):
+        for session_id, history in histories.items():
+            history.append(UserMessage(content=f"question {turn} about the order " * 4, source="user"))
+            history.append(AssistantMessage(content=f"answer {turn} with the details " * 12, source="shop"))
+            if rewrite:
+                await store.delete(session_id)
+            await store.save(session_id, history=history, agent_states={
+                "USER_PROXY": {"inner_topic_type": "main_proxy"},
+                "main_proxy": {"inner_topic_type": "shop"},
+            })
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    saves = args.turns * args.sessions
+    print(f"{args.sessions} sessions x {args.turns} turns, {2 * args.turns} messages per session")
+    print(f"{'':<16} {'ms/save':>10} {'MiB written':>12} {'db MiB':>8}")
+    for name, rewrite in (("incremental", False), ("full rewrite", True)):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoints.db")
+            store = SQLiteCheckpointStore(path, name=f"bench_{name.replace(' ', '_')}")
+            elapsed = await run(store, args.sessions, args.turns, rewrite)
+            written = store.metrics.get("bytes_written")
+            store.close()
+            size = os.path.getsize(path)
+        print(f"{name:<16} {elapsed / saves * 1e3:10.2f} {written / 2**20:12.1f} {size / 2**20:8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
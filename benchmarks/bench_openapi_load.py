@@ -0,0 +1,121 @@
+"""Benchmark: loading every operation of an OpenAPI document as actions.
+
+Compares the legacy path (split the document with a deep copy per operation, then
+``build_action_struct`` on each part and build every argument model) with ``Action.from_openapi`` without cache, with the
+in-memory cache and with the disk cache of a restarted process.
+Run: python benchmarks/bench_openapi_load.py [--operations 300] [--number 5]
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autochat.tools.action import Action, ActionAuthentication
+from autochat.tools.action.action import _args_base_model_from_json
+from autochat.tools.action.openapi_cache import OpenAPIParseCache
+from autochat.tools.action.openapi_utils import replace_openapi_refs, split_openapi_schema, build_action_struct
+
+
+def make_spec(num_operations: int) -> dict:
+    components = {
+        f"Item{i}": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string", "description": f"name of item {i}"},
+                "price": {"type": "number", "description": "the price"},
+                "available": {"type": "boolean", "description": "in stock"},
+            },
+            "required": ["name"],
+        }
+        for i in range(num_operations)
+    }
+
+    paths = {}
+    for i in range(0, num_operations, 2):
+        paths[f"/items{i}/{{item_id}}"] = {
+            "get": {
+                "operationId": f"getItem{i}",
+                "description": f"Get an item of catalogue {i}",
+                "parameters": [
+                    {"name": "item_id", "in": "path", "required": True, "schema": {"type": "string"}},
+                    {"name": "lang", "in": "query", "schema": {"type": "string", "enum": ["vi", "en"]}},
+                ],
+                "responses": {"200": {"content": {"application/json": {"schema": {"$ref": f"#/components/schemas/Item{i}"}}}}},
+            },
+            "put": {
+                "operationId": f"updateItem{i}",
+                "description": f"Update an item of catalogue {i}",
+                "parameters": [{"name": "item_id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                "requestBody": {"content": {"application/json": {"schema": {"$ref": f"#/components/schemas/Item{i + 1}"}}}},
+                "responses": {"200": {"description": "OK"}},
+            },
+        }
+
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Catalogue", "version": "1.0"},
+        "servers": [{"url": "https://catalogue.example.com"}],
+        "paths": paths,
+        "components": {"schemas": components},
+    }
+
+
+def cold(func):
+    # a new process: the argument models are built again
+    def run():
+        _args_base_model_from_json.cache_clear()
+        return func()
+    return run
+
+
+def legacy_load(spec: dict) -> list:
+    authentication = ActionAuthentication(type="none")
+    schemas = split_openapi_schema(replace_openapi_refs(spec))
+    actions = []
+    for schema in schemas:
+        action_struct = build_action_struct(schema)
+        actions.append(Action(
+            **action_struct.model_dump(exclude={"openapi_schema", "operation_id", "function_def"}),
+            function_def=action_struct.function_def,
+            headers={},
+            authentication=authentication,
+        ))
+        # the argument models were built by the constructor
+        actions[-1].args_type()
+    return actions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--operations", type=int, default=300)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    spec = make_spec(args.operations)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        assert len(legacy_load(spec)) == len(Action.from_openapi(spec, cache=OpenAPIParseCache(cache_dir))) == args.operations
+
+        def restarted():
+            # empty memory, the disk cache is warm
+            return Action.from_openapi(spec, cache=OpenAPIParseCache(cache_dir))
+
+        memory_cache = OpenAPIParseCache()
+        Action.from_openapi(spec, cache=memory_cache)
+
+        results = {
+            "legacy split": timeit.timeit(cold(lambda: legacy_load(spec)), number=args.number),
+            "from_openapi": timeit.timeit(cold(lambda: Action.from_openapi(spec, cache=OpenAPIParseCache())), number=args.number),
+            "disk cache": timeit.timeit(cold(restarted), number=args.number),
+            "memory cache": timeit.timeit(lambda: Action.from_openapi(spec, cache=memory_cache), number=args.number),
+        }
+
+    print(f"{args.operations} operations, {args.number} runs")
+    for name, elapsed in results.items():
+        print(f"{name:<14} {elapsed / args.number * 1e3:10.1f} ms/load")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark: $ref resolution on a synthetic OpenAPI document with thousands of components.
+
+Components refer to each other (nested references, shared by many operations) and some
+are recursive. Compares the legacy splice of raw targets (on an acyclic copy, it never
+terminates on recursive schemas) with the memoized resolver on the whole document and on a
+few selected operations.
+Run: python benchmarks/bench_openapi_refs.py [--components 5000] [--operations 1000]
+"""
+import argparse
+import json
+import os
+import timeit
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autochat.tools.action.openapi_utils import replace_openapi_refs, resolve_openapi_operations
+
+
+# ================== Legacy resolution (before the memoized resolver) ==================
+
+def legacy_resolve_ref(document, ref):
+    parts = ref.split("/")
+    result = document
+    for part in parts[1:]:
+        result = result[part]
+    return result
+
+
+def legacy_replace_refs(schema, document):
+    if isinstance(schema, dict):
+        if "$ref" in schema:
+            return legacy_resolve_ref(document, schema["$ref"])
+        else:
+            return {k: legacy_replace_refs(v, document) for k, v in schema.items()}
+    elif isinstance(schema, list):
+        return [legacy_replace_refs(item, document) for item in schema]
+    else:
+        return schema
+
+
+def legacy_replace_openapi_refs(openapi_dict):
+    processed_dict = legacy_replace_refs(openapi_dict, openapi_dict)
+    processed_dict.pop("components", None)
+    return processed_dict
+
+
+# ================== Synthetic document ==================
+
+def make_spec(num_components: int, num_operations: int, recursive: bool) -> dict:
+    schemas = {}
+    for i in range(num_components):
+        properties = {
+            "id": {"type": "string", "description": f"id of {i}"},
+            "name": {"type": "string"},
+            "tags": {"type": "array", "items": {"$ref": "#/components/schemas/Tag"}},
+        }
+        # nested references, the components form a binary tree
+        for j in (1, 2):
+            if 2 * i + j < num_components:
+                properties[f"child{j}"] = {"$ref": f"#/components/schemas/Model{2 * i + j}"}
+        if recursive and i % 10 == 0:
+            properties["parent"] = {"$ref": f"#/components/schemas/Model{i}"}
+        schemas[f"Model{i}"] = {"type": "object", "properties": properties}
+    schemas["Tag"] = {"type": "object", "properties": {"label": {"type": "string"}}}
+
+    paths = {}
+    for i in range(num_operations):
+        target = (i * 7919) % num_components
+        paths[f"/models{i}"] = {
+            "post": {
+                "operationId": f"createModel{i}",
+                "parameters": [{"name": "lang", "in": "query", "schema": {"type": "string"}}],
+                "requestBody": {"content": {"application/json": {"schema": {"$ref": f"#/components/schemas/Model{target}"}}}},
+                "responses": {"200": {"content": {"application/json": {"schema": {"$ref": f"#/components/schemas/Model{target}"}}}}},
+            }
+        }
+
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Synthetic", "version": "1.0"},
+        "servers": [{"url": "https://synthetic.example.com"}],
+        "paths": paths,
+        "components": {"schemas": schemas},
+    }
+
+
+def count_refs(node) -> int:
+    return json.dumps(node).count('"$ref"')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--components", type=int, default=5000)
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--selected", type=int, default=5)
+    parser.add_argument("--number", type=int, default=3)
+    args = parser.parse_args()
+
+    acyclic = make_spec(args.components, args.operations, recursive=False)
+    recursive = make_spec(args.components, args.operations, recursive=True)
+    selected = [f"createModel{i}" for i in range(1, args.selected + 1)]
+
+    # the legacy splice leaves the nested references unresolved
+    print(f"unresolved $ref in /models0 after legacy splice: {count_refs(legacy_replace_openapi_refs(acyclic)['paths']['/models0'])}")
+    print(f"unresolved $ref in /models0 after resolver: {count_refs(replace_openapi_refs(acyclic)['paths']['/models0'])}")
+    resolved = resolve_openapi_operations(recursive, selected)
+    assert len(resolved["paths"]) == args.selected
+
+    results = {
+        "legacy splice (acyclic)": timeit.timeit(lambda: legacy_replace_openapi_refs(acyclic), number=args.number),
+        "resolver, all operations": timeit.timeit(lambda: replace_openapi_refs(recursive), number=args.number),
+        f"resolver, {args.selected} operations": timeit.timeit(
+            lambda: resolve_openapi_operations(recursive, selected), number=args.number),
+    }
+
+    print(f"{args.components} components, {args.operations} operations, {args.number} runs")
+    for name, elapsed in results.items():
+        print(f"{name:<26} {elapsed / args.number * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark: time to route a message with HandoffRouter, per matcher and number of examples.
+
+Each target has ``--examples`` utterances made of its own words and shared filler words, the
+queries are new sentences of a target's words. The output is the time per routed message and
+the share of queries routed to the right target without the model, to compare with the model
+round trip that a routed turn saves.
+Run: python benchmarks/bench_pre_router.py [--targets 20] [--examples 20] [--repeat 10]
+"""
+import argparse
+import os
+import random
+import timeit
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autochat.agents.routing import HandoffRouter
+
+FILLER = ["tôi", "muốn", "cho", "hỏi", "với", "được", "không", "ạ", "bạn", "giúp", "mình", "nhé"]
+
+
+def make_data(num_targets: int, num_examples: int, seed: int = 0):
+    rng = random.Random(seed)
+    syllables = ["ba", "ca", "da", "gi", "ha", "kho", "la", "mua", "nga", "pho", "qua", "sa", "tha", "vi", "xo"]
+    vocabulary = {
+        f"agent_{t}": [rng.choice(syllables) + rng.choice(syllables) + rng.choice(syllables) for _ in range(6)]
+        for t in range(num_targets)
+    }
+
+    def sentence(words):
+        return " ".join(rng.sample(words, 3) + rng.sample(FILLER, 3))
+
+    routes = {target: [sentence(words) for _ in range(num_examples)] for target, words in vocabulary.items()}
+    queries = [(target, sentence(words)) for target, words in vocabulary.items() for _ in range(5)]
+    return routes, queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", type=int, default=20)
+    parser.add_argument("--examples", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    routes, queries = make_data(args.targets, args.examples)
+    print(f"{args.targets} targets x {args.examples} examples, {len(queries)} queries")
+    print(f"{'':<8} {'us/route':>10} {'routed':>8} {'correct':>8}")
+    for matcher in ("tfidf", "jaro"):
+        router = HandoffRouter(routes=routes, matcher=matcher, threshold=0.5, margin=0.05)
+        texts = [text for _, text in queries]
+        elapsed = timeit.timeit(lambda: [router.route(text) for text in texts], number=args.repeat)
+        per_route = elapsed / (args.repeat * len(texts))
+
+        decisions = [(target, router.route(text)[0]) for target, text in queries]
+        routed = sum(1 for _, chosen in decisions if chosen is not None)
+        correct = sum(1 for target, chosen in decisions if chosen == target)
+        print(f"{matcher:<8} {per_route * 1e6:10.1f} {routed / len(queries):8.0%} {correct / max(routed, 1):8.0%}")
+
+
+if __name__ == "__main__":
+    main()
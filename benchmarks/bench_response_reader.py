@@ -0,0 +1,120 @@
+"""Benchmark: reading a large JSON response of an action, legacy full read vs capped streaming reads.
+
+Serves a JSON document of ``--size-mb`` from a local aiohttp server in another process. The legacy path read the
+whole body with ``response.json()``; the capped read stops at ``max_response_bytes`` and the
+field extraction keeps only the selected fields (found at the start, the middle and the end of
+the body). Peak memory is measured with tracemalloc in a second run. The result size is the
+length of the JSON text of the tool result, i.e. what is sent to the model.
+Run: python benchmarks/bench_response_reader.py [--size-mb 8] [--max-bytes 65536]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from aiohttp import web
+
+from autochat.models.action import ActionMethod, ActionBodyType
+from autochat.models.authentication import ActionAuthentication
+from autochat.tools.action import close_http_sessions
+from autochat.tools.action.openapi_call import call_action_api
+
+
+def make_document(size_mb: float) -> bytes:
+    items = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        item = {"id": len(items), "name": f"product {len(items)}", "description": "lorem ipsum dolor " * 10,
+                "tags": ["a", "b", "c"], "price": {"amount": 1.5, "currency": "VND"}}
+        items.append(item)
+        size += len(json.dumps(item))
+    document = {"status": "ok", "summary": {"total": len(items)}, "items": items[:len(items) // 2],
+                "middle": {"marker": 42}, "more_items": items[len(items) // 2:], "last": "end"}
+    return json.dumps(document).encode("utf-8")
+
+
+async def legacy_read(url: str):
+    from autochat.tools.action import get_http_session_pool
+    async with get_http_session_pool().get_session().get(url) as response:
+        return {"status": response.status, "data": await response.json()}
+
+
+async def measure(name: str, call, results: dict) -> None:
+    # tracemalloc slows down allocations, the time is measured without it
+    start = time.perf_counter()
+    await call()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    output = await call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results[name] = (elapsed, peak, len(json.dumps(output["data"], ensure_ascii=False)))
+
+
+def serve(body: bytes, ports) -> None:
+    # the server runs in its own process so its write buffers are not measured
+    async def handle(request):
+        return web.Response(body=body, content_type="application/json")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/catalogue", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        ports.put(site._server.sockets[0].getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--max-bytes", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    body = make_document(args.size_mb)
+
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(body, ports), daemon=True)
+    server.start()
+    url = f"http://127.0.0.1:{ports.get()}/catalogue"
+
+    def capped(max_bytes, fields=None):
+        return lambda: call_action_api(
+            url=url, method=ActionMethod.GET, path_param_schema=None, query_param_schema=None,
+            body_type=ActionBodyType.NONE, body_param_schema=None, parameters={}, headers={},
+            authentication=ActionAuthentication(type="none"),
+            max_response_bytes=max_bytes, response_fields=fields,
+        )
+
+    results = {}
+    try:
+        await legacy_read(url)  # warm up the connection
+        await measure("legacy full read", lambda: legacy_read(url), results)
+        await measure("uncapped read", capped(None), results)
+        await measure(f"capped {args.max_bytes} B", capped(args.max_bytes), results)
+        await measure("fields at start", capped(None, ["status", "summary.total"]), results)
+        await measure("field in middle", capped(None, ["middle.marker"]), results)
+        await measure("field at end", capped(None, ["last"]), results)
+        await measure("field past cap", capped(args.max_bytes, ["last"]), results)
+    finally:
+        await close_http_sessions()
+        server.terminate()
+
+    print(f"body {len(body) / 1024 / 1024:.1f} MiB")
+    print(f"{'':<20} {'time ms':>10} {'peak MiB':>10} {'result chars':>14}")
+    for name, (elapsed, peak, size) in results.items():
+        print(f"{name:<20} {elapsed * 1e3:10.1f} {peak / 1024 / 1024:10.2f} {size:14d}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Benchmark: memory held by the agents of finished sessions, with and without eviction.
+
+Runs ``--sessions`` one-turn sessions through a serving GroupChatRunner with a stub model
+client, then reports the live agent instances and the Python heap still allocated
+(tracemalloc), without eviction, with an LRU cap and with the cap plus checkpoints.
+Run: python benchmarks/bench_session_eviction.py [--sessions 2000] [--max-sessions 100]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autogen_core.components.models import CreateResult, RequestUsage
+
+from autochat.agents import AssistantAgent, MasterAgent, ProxyAgent
+from autochat.agent_container import AssistantContainer, MasterContainer, ProxyContainer
+from autochat.group_chats import HandoffGroupChat
+from autochat.tasks import EvictionPolicy, GroupChatRunner, SQLiteCheckpointStore
+
+
+class StubClient:
+    def __init__(self, content: str):
+        self.content = content
+
+    async def create(self, messages, tools=[], json_output=None, extra_create_args={}, cancellation_token=None):
+        return CreateResult(finish_reason="stop", content=self.content, usage=RequestUsage(1, 1), cached=False)
+
+    async def create_stream(self, *args, **kwargs):
+        yield await self.create(*args, **kwargs)
+
+    def count_tokens(self, messages, tools=[]):
+        return sum(len(str(m)) // 4 for m in messages)
+
+    def remaining_tokens(self, messages, tools=[]):
+        return 100000
+
+    def actual_usage(self):
+        return RequestUsage(0, 0)
+
+    def total_usage(self):
+        return RequestUsage(0, 0)
+
+    @property
+    def capabilities(self):
+        return {}
+
+
+def make_runner(**kwargs) -> GroupChatRunner:
+    shop = AssistantContainer(name="shop", description="shop", agent_class=AssistantAgent,
+                              model_client=StubClient('{"response": "ok", "intent": "MAIN_UC"}'),
+                              system_message="You sell things", debug=False)
+    master = MasterContainer(name="master", description="master", agent_class=MasterAgent,
+                             model_client=StubClient("hello"), system_message="route", debug=False)
+    proxy = ProxyContainer(name="main_proxy", description="proxy", agent_class=ProxyAgent, debug=False)
+    group = HandoffGroupChat(name="main", description="main", proxy=proxy, master=master, participants=[shop])
+    runner = GroupChatRunner(master_group=group, participants_groups=[], **kwargs)
+    runner.user_proxy.agent_arguments["debug"] = False
+    return runner
+
+
+async def run(runner: GroupChatRunner, sessions: int) -> tuple[float, int, int]:
+    await runner.start(turn_timeout=60)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for index in range(sessions):
+        await runner.run(task="hi", session_id=f"session-{index}")
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    live = len(runner._runtime._instantiated_agents)
+    await runner.stop()
+    return elapsed, live, held
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--max-sessions", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions of one turn")
+    print(f"{'':<22} {'ms/turn':>8} {'live agents':>12} {'held MiB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        configurations = {
+            "no eviction": {},
+            "LRU cap": {"eviction": EvictionPolicy(idle_timeout=None, max_sessions=args.max_sessions)},
+            "LRU cap + checkpoint": {
+                "eviction": EvictionPolicy(idle_timeout=None, max_sessions=args.max_sessions),
+                "checkpoint_store": SQLiteCheckpointStore(os.path.join(directory, "checkpoints.db")),
+            },
+        }
+        for name, kwargs in configurations.items():
+            runner = make_runner(**kwargs)
+            elapsed, live, held = await run(runner, args.sessions)
+            await runner.close()
+            print(f"{name:<22} {elapsed / args.sessions * 1e3:8.2f} {live:12d} {held / 2**20:9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
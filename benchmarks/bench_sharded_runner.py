@@ -0,0 +1,117 @@
+"""Benchmark: turns per second of one GroupChatRunner vs a ShardedGroupChatRunner.
+
+The model client is a stub that answers after ``--latency`` seconds and burns ``--cpu-ms`` of
+CPU per call (standing in for parsing, validation and prompt rendering), so the event loop
+of a single runtime saturates one core while the sharded runner spreads the sessions over
+worker processes. The speedup is bounded by the number of CPUs of the machine.
+Run: python benchmarks/bench_sharded_runner.py [--sessions 64] [--workers 4] [--cpu-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autogen_core.components.models import CreateResult, RequestUsage
+
+from autochat.agents import AssistantAgent, MasterAgent, ProxyAgent
+from autochat.agent_container import AssistantContainer, MasterContainer, ProxyContainer
+from autochat.group_chats import HandoffGroupChat
+from autochat.tasks import GroupChatRunner, ShardedGroupChatRunner
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", 0.05))
+CPU_SECONDS = float(os.environ.get("BENCH_CPU_MS", 20)) / 1000
+
+
+class StubClient:
+    def __init__(self, content: str):
+        self.content = content
+
+    async def create(self, messages, tools=[], json_output=None, extra_create_args={}, cancellation_token=None):
+        await asyncio.sleep(LATENCY)
+        deadline = time.process_time() + CPU_SECONDS
+        while time.process_time() < deadline:
+            pass
+        return CreateResult(finish_reason="stop", content=self.content, usage=RequestUsage(1, 1), cached=False)
+
+    async def create_stream(self, *args, **kwargs):
+        yield await self.create(*args, **kwargs)
+
+    def count_tokens(self, messages, tools=[]):
+        return sum(len(str(m)) // 4 for m in messages)
+
+    def remaining_tokens(self, messages, tools=[]):
+        return 100000
+
+    def actual_usage(self):
+        return RequestUsage(0, 0)
+
+    def total_usage(self):
+        return RequestUsage(0, 0)
+
+    @property
+    def capabilities(self):
+        return {}
+
+
+def make_runner() -> GroupChatRunner:
+    shop = AssistantContainer(name="shop", description="shop", agent_class=AssistantAgent,
+                              model_client=StubClient('{"response": "ok", "intent": "MAIN_UC"}'),
+                              system_message="You sell things", debug=False)
+    master = MasterContainer(name="master", description="master", agent_class=MasterAgent,
+                             model_client=StubClient("hello"), system_message="route", debug=False)
+    proxy = ProxyContainer(name="main_proxy", description="proxy", agent_class=ProxyAgent, debug=False)
+    group = HandoffGroupChat(name="main", description="main", proxy=proxy, master=master, participants=[shop])
+    return GroupChatRunner(master_group=group, participants_groups=[])
+
+
+async def run_sessions(runner, sessions: int, turns: int) -> float:
+    async def session(index: int) -> None:
+        for _ in range(turns):
+            await runner.run(task="hi", session_id=f"session-{index}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(index) for index in range(sessions)))
+    return time.perf_counter() - start
+
+
+async def main():
+    global LATENCY, CPU_SECONDS
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--latency", type=float, default=LATENCY)
+    parser.add_argument("--cpu-ms", type=float, default=CPU_SECONDS * 1000)
+    args = parser.parse_args()
+
+    # the workers read them from the environment when they import this module
+    os.environ["BENCH_LATENCY"] = str(args.latency)
+    os.environ["BENCH_CPU_MS"] = str(args.cpu_ms)
+    LATENCY, CPU_SECONDS = args.latency, args.cpu_ms / 1000
+
+    total = args.sessions * args.turns
+
+    single = make_runner()
+    await single.start(turn_timeout=60)
+    single_elapsed = await run_sessions(single, args.sessions, args.turns)
+    await single.stop()
+    await single.close()
+
+    sharded = ShardedGroupChatRunner(make_runner, num_workers=args.workers, turn_timeout=60)
+    await sharded.start()
+    sharded_elapsed = await run_sessions(sharded, args.sessions, args.turns)
+    stats = sharded.stats()
+    await sharded.stop()
+
+    print(f"{total} turns, {args.sessions} sessions, {os.cpu_count()} CPUs, "
+          f"{LATENCY * 1e3:.0f} ms latency + {CPU_SECONDS * 1e3:.0f} ms CPU per model call")
+    print(f"{'single runtime':<24} {total / single_elapsed:8.1f} turns/s")
+    print(f"{f'sharded, {args.workers} workers':<24} {total / sharded_elapsed:8.1f} turns/s")
+    print(f"workers: {[(s['worker'], s['restarts']) for s in stats]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
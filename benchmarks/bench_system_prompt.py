@@ -0,0 +1,60 @@
+"""Microbenchmark: SystemPromptTemplate vs build_system_prompt.
+
+Run: python benchmarks/bench_system_prompt.py [--segments 40] [--variables 5]
+"""
+import argparse
+import random
+import timeit
+
+from autochat.utils.utils import build_system_prompt
+from autochat.utils.prompt_template import SystemPromptTemplate
+
+
+def make_templates(num_segments: int, variables_per_segment: int) -> tuple[list[str], dict[str, str]]:
+    templates = []
+    variables = {}
+    for i in range(num_segments):
+        lines = [f"## Section {i}", "You are a helpful assistant. " * 8]
+        for j in range(variables_per_segment):
+            name = f"var_{i}_{j}"
+            variables[name] = f"value {i}-{j} " * random.randint(1, 4)
+            lines.append(f"- {name}: {{{{{name}}}}}")
+        templates.append("\n".join(lines))
+
+    # a few segments depend on a variable that is not set and must be dropped
+    for i in range(0, num_segments, 10):
+        templates[i] += "\n{{missing_variable}}"
+
+    return templates, variables
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, default=40)
+    parser.add_argument("--variables", type=int, default=5)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    templates, variables = make_templates(args.segments, args.variables)
+    template = SystemPromptTemplate(templates)
+
+    assert template.render(variables) == build_system_prompt(templates, variables)
+
+    def render_cold():
+        template._cache.clear()
+        template.render(variables)
+
+    benchmarks = {
+        "build_system_prompt": lambda: build_system_prompt(templates, variables),
+        "SystemPromptTemplate (cold)": render_cold,
+        "SystemPromptTemplate (memoized)": lambda: template.render(variables),
+    }
+
+    print(f"segments={args.segments} variables/segment={args.variables} calls={args.number}")
+    for name, func in benchmarks.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5))
+        print(f"{name:<34} {seconds / args.number * 1e6:10.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
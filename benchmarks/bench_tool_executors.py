@@ -0,0 +1,78 @@
+"""Benchmark: event loop stalls of synchronous function tools run inline, on threads and on processes.
+
+Runs ``--calls`` concurrent calls of a CPU-bound tool (pure Python loop) and of a blocking
+tool (``time.sleep``) while a heartbeat task measures how late the event loop wakes up,
+i.e. how long every other session of the runtime is frozen.
+Run: python benchmarks/bench_tool_executors.py [--calls 8] [--work 2000000]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autogen_core.base import CancellationToken
+
+from autochat.tools.executors import ExecutorFunctionTool, configure_tool_executors, shutdown_tool_executors
+
+
+def count_primes(limit: int) -> int:
+    """CPU-bound work."""
+    count = 0
+    for n in range(2, limit):
+        if n % 2 and n % 3 and n % 5 and n % 7:
+            count += 1
+    return count
+
+
+def read_slowly(seconds: float) -> str:
+    """Blocking I/O."""
+    time.sleep(seconds)
+    return "done"
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(tool: ExecutorFunctionTool, arguments: dict, calls: int) -> tuple[float, float]:
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    await asyncio.gather(*[tool.run_json(arguments, CancellationToken()) for _ in range(calls)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await beat
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--work", type=int, default=2_000_000)
+    parser.add_argument("--sleep", type=float, default=0.2)
+    args = parser.parse_args()
+
+    configure_tool_executors(max_threads=args.calls, max_processes=min(args.calls, os.cpu_count() or 1))
+
+    print(f"{args.calls} concurrent calls, {os.cpu_count()} CPUs")
+    print(f"{'':<18} {'total s':>10} {'worst loop stall ms':>20}")
+    for tool_func, arguments in ((count_primes, {"limit": args.work}), (read_slowly, {"seconds": args.sleep})):
+        for executor in ("inline", "thread", "process"):
+            tool = ExecutorFunctionTool(tool_func, description="bench", executor=executor)
+            # start the workers before measuring
+            await tool.run_json({"limit": 10} if tool_func is count_primes else {"seconds": 0}, CancellationToken())
+            elapsed, stall = await run(tool, arguments, args.calls)
+            print(f"{tool_func.__name__ + ' ' + executor:<18} {elapsed:10.2f} {stall * 1e3:20.1f}")
+
+    shutdown_tool_executors(wait=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
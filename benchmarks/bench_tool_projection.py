@@ -0,0 +1,68 @@
+"""Benchmark: cost of projecting a tool result and the prompt characters it saves.
+
+The result is a catalogue page as returned by an action. Each row of the output is a
+projection: its time per call and the length of the text sent to the model, which is
+sent again on every later call of the tool loop.
+Run: python benchmarks/bench_tool_projection.py [--items 200] [--number 200]
+"""
+import argparse
+import os
+import timeit
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autochat.tools.projection import ToolProjection
+
+
+def make_result(num_items: int) -> dict:
+    return {
+        "status": "ok",
+        "data": {
+            "items": [
+                {
+                    "id": i,
+                    "name": f"product {i}",
+                    "description": "a long marketing description of the product " * 8,
+                    "images": [f"https://cdn.example.com/{i}/{j}.jpg" for j in range(6)],
+                    "price": {"amount": 10000 + i, "currency": "VND"},
+                    "internal": {"sku": f"SKU{i}", "warehouse": "HN-01", "audit": list(range(10))},
+                }
+                for i in range(num_items)
+            ],
+            "total": num_items,
+        },
+        "debug": {"trace_id": "abc", "timings": {"db": 12, "render": 3}},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    result = make_result(args.items)
+    projections = {
+        "none": None,
+        "exclude internal": ToolProjection(exclude=["debug", "data.items[*].internal", "data.items.images"]),
+        "include + caps": ToolProjection(
+            include=["status", "data.total", "data.items[*].name", "data.items[*].price", "data.items.description"],
+            max_list_items=20,
+            max_string_length=80,
+        ),
+    }
+
+    print(f"{args.items} items, {args.number} runs")
+    print(f"{'':<18} {'us/call':>10} {'chars':>10}")
+    for name, projection in projections.items():
+        if projection is None:
+            elapsed = 0.0
+            projected = result
+        else:
+            elapsed = timeit.timeit(lambda: projection.apply(result), number=args.number) / args.number
+            projected = projection.apply(result)
+        print(f"{name:<18} {elapsed * 1e6:10.1f} {len(str(projected)):10d}")
+
+
+if __name__ == "__main__":
+    main()
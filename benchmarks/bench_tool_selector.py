@@ -0,0 +1,76 @@
+"""Benchmark: time to select tools with ToolSelector and the schema tokens it keeps out of the prompt.
+
+The agent has ``--tools`` function tools, one per (resource, operation) pair with a
+description and parameters as an OpenAPI action would have, and each query names the
+operation and resource of one of them. The output is the time per selection, the prompt
+tokens of the schemas sent (4 characters a token) and how often the wanted tool is offered.
+Run: python benchmarks/bench_tool_selector.py [--tools 60] [--top-k 8]
+"""
+import argparse
+import json
+import os
+import timeit
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autogen_core.components.models import UserMessage
+from autogen_core.components.tools import FunctionTool
+
+from autochat.tools.selector import ToolSelector
+
+RESOURCES = ["order", "product", "customer", "invoice", "shipment", "coupon", "review", "store", "refund",
+             "warehouse", "supplier", "category"]
+OPERATIONS = [("get", "Get the details of a {r} by its id"), ("list", "List the {r}s matching the filters"),
+              ("create", "Create a new {r}"), ("update", "Update the fields of a {r}"), ("delete", "Delete a {r}")]
+
+
+def make_tools(count: int) -> list[FunctionTool]:
+    tools = []
+    for resource in RESOURCES:
+        for operation, description in OPERATIONS:
+            def func(id: str, filters: str = "", page: int = 1) -> str:
+                """The parameters of a typical action."""
+                return ""
+
+            tools.append(FunctionTool(func, description=description.format(r=resource),
+                                      name=f"{operation}_{resource}"))
+    return tools[:count]
+
+
+def schema_tokens(tools) -> int:
+    return sum(len(json.dumps(tool.schema, ensure_ascii=False)) // 4 for tool in tools)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tools", type=int, default=60)
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+
+    tools = make_tools(args.tools)
+    selector = ToolSelector(top_k=args.top_k, name="bench")
+    queries = [
+        (tool.name, [UserMessage(content=f"please {tool.name.split('_')[0]} the {tool.name.split('_')[1]} "
+                                         f"for me, id 42", source="user")])
+        for tool in tools
+    ]
+
+    selector.select(tools, queries[0][1])
+    elapsed = timeit.timeit(lambda: selector.select(tools, queries[0][1]), number=args.number) / args.number
+
+    offered = 0
+    selected_tokens = 0
+    for name, messages in queries:
+        selected = selector.select(tools, messages)
+        offered += any(tool.name == name for tool in selected)
+        selected_tokens += schema_tokens(selected)
+
+    print(f"{len(tools)} tools, top {args.top_k}, {len(queries)} queries")
+    print(f"selection: {elapsed * 1e6:.1f} us")
+    print(f"schema tokens per call: {schema_tokens(tools)} all tools, {selected_tokens / len(queries):.0f} selected")
+    print(f"wanted tool offered: {offered / len(queries):.0%}")
+
+
+if __name__ == "__main__":
+    main()
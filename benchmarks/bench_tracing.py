@@ -0,0 +1,68 @@
+"""Benchmark: per-hop logging cost of the legacy print_logs vs the tracer, with logging off and on.
+
+The legacy print_logs deep-copied the message before checking ``debug`` and appended a
+snapshot to ``message.traces`` on every hop.
+Run: python benchmarks/bench_tracing.py [--history 50] [--hops 8] [--number 200]
+"""
+import argparse
+import copy
+import os
+import timeit
+
+os.environ.setdefault("AES_ENCRYPTION_KEY", "00" * 32)
+
+from autogen_core.components.models import UserMessage as LLMUserMessage, AssistantMessage as LLMAssistantMessage
+
+from autochat.models.messages import UserMessage
+from autochat.utils.tracing import Tracer, InMemoryTraceSink
+
+
+def legacy_print_logs(source, message, trace_messages, debug):
+    message = copy.deepcopy(message)
+    if not debug:
+        return
+    message.traces = []
+    trace_messages.append({source: message})
+
+
+def make_message(history: int) -> UserMessage:
+    content = []
+    for i in range(history):
+        content.append(LLMUserMessage(content=f"question {i} " * 20, source="user"))
+        content.append(LLMAssistantMessage(content=f"answer {i} " * 40, source="assistant"))
+    return UserMessage(content=content, source="user")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, default=50)
+    parser.add_argument("--hops", type=int, default=8)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    def legacy_turn(debug: bool):
+        message = make_message(args.history)
+        for hop in range(args.hops):
+            legacy_print_logs(f"agent_{hop} Receive message", message, message.traces, debug)
+
+    def traced_turn(tracer: Tracer):
+        message = make_message(args.history)
+        for hop in range(args.hops):
+            tracer.record("session", f"agent_{hop}", "Receive message", message)
+
+    baseline = timeit.timeit(lambda: make_message(args.history), number=args.number)
+    results = {
+        "legacy, debug off": timeit.timeit(lambda: legacy_turn(False), number=args.number),
+        "legacy, debug on": timeit.timeit(lambda: legacy_turn(True), number=args.number),
+        "tracer disabled": timeit.timeit(lambda: traced_turn(Tracer()), number=args.number),
+        "tracer enabled": timeit.timeit(
+            lambda: traced_turn(Tracer(sinks=[InMemoryTraceSink()], buffer_size=256)), number=args.number),
+    }
+
+    print(f"history={args.history} turns, hops={args.hops}, {args.number} runs (message creation excluded)")
+    for name, elapsed in results.items():
+        print(f"{name:<18} {(elapsed - baseline) / args.number * 1e6:10.1f} us/turn")
+
+
+if __name__ == "__main__":
+    main()